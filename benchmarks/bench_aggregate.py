@@ -0,0 +1,59 @@
+"""
+Benchmark composite score aggregation over a synthetic score_all result set.
+
+    python benchmarks/bench_aggregate.py [--rows 100000]
+
+Prints one JSON document with the time, in seconds, to load the NDJSON results, to compute
+the composite scores, tiers and ranks, and to produce the ranked output records.
+"""
+from threat_detection_score.aggregate import ResultTable, aggregate_records, composite_scores
+import argparse, io, json, random, time
+
+
+def make_results(rows: int) -> str:
+    generator = random.Random(0)
+    lines = []
+    for record_id in range(rows):
+        answer = generator.choice(["yes", "no"])
+        lines.append(json.dumps({
+            "id": record_id,
+            "threat_severity": {"score": generator.randint(1, 3), "reason": "r", "type": "threat severity"},
+            "detection_coverage": {"score": generator.randint(0, 2), "reason": "r", "type": "detection coverage"},
+            "org_alignment": {"score": generator.randint(0, 3), "reason": "r", "type": "organizational alignment"},
+            "exploit_eval": {"answer": answer, "reason": "r", "type": "exploit_eval"},
+            "active_exploit": {
+                "active_exploit_relevance_score": generator.randint(0, 2),
+                "active_exploit_prevalence_score": generator.randint(1, 3),
+                "reason": "r",
+                "type": "active_exploit",
+            },
+        }))
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    text = make_results(args.rows)
+
+    start = time.perf_counter()
+    table = ResultTable.from_jsonl(io.StringIO(text))
+    loaded = time.perf_counter()
+    composite_scores(table.columns())
+    scored = time.perf_counter()
+    records = sum(1 for _ in aggregate_records(table))
+    ranked = time.perf_counter()
+
+    print(json.dumps({
+        "benchmark": "aggregate",
+        "rows": records,
+        "load_seconds": round(loaded - start, 4),
+        "composite_seconds": round(scored - loaded, 4),
+        "ranked_records_seconds": round(ranked - scored, 4),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
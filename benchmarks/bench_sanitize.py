@@ -0,0 +1,68 @@
+"""
+Micro-benchmark of sanitize_input against the previous per-character implementation.
+
+    python benchmarks/bench_sanitize.py [--repeat 5]
+
+Prints one JSON document with the best time per call, in milliseconds, for valid and invalid
+inputs from 1 KB to 1 MB.
+"""
+from threat_detection_score.input_sanitizer.sanitize import sanitize_input
+import argparse, json, re, timeit, typer
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+
+def legacy_sanitize_input(input_message: str) -> str:
+    # The implementation sanitize_input replaced: one re.match per character.
+    invalid_characters = [
+        (char, idx) for idx, char in enumerate(input_message)
+        if not re.match(r"[a-zA-Z0-9\s.,-_]", char)
+    ]
+    if invalid_characters:
+        raise typer.BadParameter("invalid")
+    return input_message
+
+
+def make_input(size: int, valid: bool) -> str:
+    text = ("Detect brute-force RDP logins from foreign IP ranges, 4625 events_per host.\n" * (size // 75 + 1))[:size]
+    if not valid:
+        # A sprinkling of characters both implementations reject
+        text = text[:size // 2] + "$" + text[size // 2 + 1:-1] + "$"
+    return text
+
+
+def time_call(func, text: str, repeat: int) -> float:
+    def call():
+        try:
+            func(text)
+        except typer.BadParameter:
+            pass
+
+    number = max(1, 200_000 // len(text))
+    return min(timeit.repeat(call, number=number, repeat=repeat)) / number * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    results = []
+    for size in SIZES:
+        for valid in (True, False):
+            text = make_input(size, valid)
+            legacy_ms = time_call(legacy_sanitize_input, text, args.repeat)
+            current_ms = time_call(sanitize_input, text, args.repeat)
+            results.append({
+                "size": size,
+                "valid": valid,
+                "legacy_ms": round(legacy_ms, 4),
+                "current_ms": round(current_ms, 4),
+                "speedup": round(legacy_ms / current_ms, 1),
+            })
+
+    print(json.dumps({"benchmark": "sanitize_input", "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Similarity calibration for the semantic cache, on labelled requirement pairs.
+
+    python benchmarks/bench_semantic.py [--pairs benchmarks/semantic_pairs.jsonl] [--threshold 0.85]
+
+Every text of the pairs file is added to one cache scope, so the IDF weights come from a
+realistic corpus, and each pair's cosine similarity is computed as the cache would. It reports
+the similarities of paraphrases and of pairs that differ in meaning, the lowest threshold at
+which no pair of the second kind would be served the other's score, and the share of
+paraphrases caught at that threshold and at `--threshold`. Fails (exit code 1) when
+`--threshold` lets a pair that differs in meaning match.
+"""
+from threat_detection_score.semantic_cache import DEFAULT_THRESHOLD, SemanticCache
+import argparse, json, math, os, statistics, sys
+
+DEFAULT_PAIRS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "semantic_pairs.jsonl")
+
+
+def similarities(pairs: list) -> list:
+    cache = SemanticCache(":memory:")
+    for text in sorted({pair[side] for pair in pairs for side in ("a", "b")}):
+        cache.add("pairs", text, {})
+    index = cache._index("pairs")
+    return [
+        float(index._weigh(index.vectorizer.sparse(pair["a"])) @ index._weigh(index.vectorizer.sparse(pair["b"])))
+        for pair in pairs
+    ]
+
+
+def summary(values: list) -> dict:
+    return {"pairs": len(values), "min": round(min(values), 4), "median": round(statistics.median(values), 4), "max": round(max(values), 4)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pairs", default=DEFAULT_PAIRS, help="JSONL of {\"a\", \"b\", \"paraphrase\"} pairs.")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    with open(args.pairs, encoding="utf-8") as stream:
+        pairs = [json.loads(line) for line in stream if line.strip()]
+    scored = list(zip(pairs, similarities(pairs)))
+    paraphrases = [similarity for pair, similarity in scored if pair["paraphrase"]]
+    different = [similarity for pair, similarity in scored if not pair["paraphrase"]]
+
+    # Rounded up to two decimals, the precision a threshold is configured with
+    safe_threshold = math.floor(max(different) * 100 + 1) / 100
+    false_matches = [
+        {"a": pair["a"], "b": pair["b"], "similarity": round(similarity, 4)}
+        for pair, similarity in scored if not pair["paraphrase"] and similarity >= args.threshold
+    ]
+    report = {
+        "paraphrases": summary(paraphrases),
+        "different": summary(different),
+        "lowest_safe_threshold": safe_threshold,
+        "recall_at_lowest_safe_threshold": round(sum(value >= safe_threshold for value in paraphrases) / len(paraphrases), 4),
+        "threshold": args.threshold,
+        "recall_at_threshold": round(sum(value >= args.threshold for value in paraphrases) / len(paraphrases), 4),
+        "false_matches": false_matches,
+    }
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if false_matches else 0)
+
+
+if __name__ == "__main__":
+    main()
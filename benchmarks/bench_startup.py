@@ -0,0 +1,78 @@
+"""
+Startup regression check for the console scripts, based on ``python -X importtime``.
+
+    python benchmarks/bench_startup.py [--budget-ms 150]
+
+For every scorer module it imports the module in a fresh interpreter and fails (exit code 1)
+when the cumulative import time exceeds the budget or when a heavy dependency that should
+only load once a scorer actually runs (LangChain, the OpenAI client, rich) is imported.
+It also reports the wall time of ``--help`` and of a rejected input.
+"""
+from threat_detection_score.engine import SCORER_MODULES
+import argparse, json, os, re, subprocess, sys, time
+
+# Packages that must not be imported just to show --help or reject input.
+DEFERRED_PACKAGES = ("langchain_core", "langchain_openai", "openai", "rich")
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def import_profile(module: str) -> dict:
+    """Cumulative import time (ms) of `module` and the top-level packages it pulled in."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    cumulative_us, packages = 0, set()
+    for line in completed.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        name = match.group(4)
+        packages.add(name.split(".")[0])
+        if name == module:
+            cumulative_us = int(match.group(2))
+    return {"import_ms": cumulative_us / 1000, "packages": packages}
+
+
+def wall_ms(args: list, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], capture_output=True, env={**os.environ, "OPENAI_API_KEY": "unused"})
+        samples.append((time.perf_counter() - start) * 1000)
+    return min(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=150.0, help="Maximum cumulative import time per scorer module.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement; the best one is kept.")
+    args = parser.parse_args()
+
+    failures, results = [], {}
+    for kind, module in SCORER_MODULES.items():
+        profiles = [import_profile(module) for _ in range(args.repeat)]
+        import_ms = min(profile["import_ms"] for profile in profiles)
+        deferred = sorted(set(DEFERRED_PACKAGES) & profiles[0]["packages"])
+
+        results[kind] = {
+            "import_ms": round(import_ms, 1),
+            "help_ms": round(wall_ms(["-m", module, "--help"], args.repeat), 1),
+            "rejected_input_ms": round(wall_ms(["-m", module, "-i", "<invalid>"], args.repeat), 1),
+            "deferred_packages_imported": deferred,
+        }
+
+        if import_ms > args.budget_ms:
+            failures.append(f"{module} imports in {import_ms:.1f} ms, over the {args.budget_ms:.0f} ms budget")
+        if deferred:
+            failures.append(f"{module} imports {', '.join(deferred)} at startup")
+
+    results["interpreter_ms"] = round(wall_ms(["-c", "pass"], args.repeat), 1)
+    print(json.dumps({"benchmark": "startup", "budget_ms": args.budget_ms, "results": results, "failures": failures}, indent=2))
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Benchmark the package's own overhead with the offline stub provider.
+
+    pip install -e .
+    python benchmarks/run.py [--output results.json] [--calls 200] [--batch 1000]
+
+For every scorer it measures cold-start import time (in a fresh interpreter), chain
+construction time (the first build, cold rebuilds and warm rebuilds that reuse the cached
+prompt and tool), per-call overhead through ScoringEngine.score and batch throughput through
+the --input-file code path. Results are one JSON document, including the Python, LangChain
+and package versions, so runs can be compared across releases.
+"""
+from importlib import metadata
+from threat_detection_score.batch import score_records
+from threat_detection_score.engine import SCORER_MODULES, ScoringEngine, load_scorer, scorer_prefix, scorer_prompt, scorer_tool
+from threat_detection_score.input_sanitizer.sanitize import sanitize_input
+from threat_detection_score.stub import StubChatModel
+import argparse, asyncio, json, platform, statistics, subprocess, sys, time
+
+REQUIREMENT = (
+    "Detect brute-force RDP logins from foreign IP addresses against Windows Server 2019 hosts, "
+    "correlating 4625 failures followed by a 4624 success within ten minutes."
+)
+
+
+def version(package: str) -> str:
+    try:
+        return metadata.version(package)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def summarize(samples_ms) -> dict:
+    samples_ms = sorted(samples_ms)
+    return {
+        "min_ms": round(samples_ms[0], 4),
+        "median_ms": round(statistics.median(samples_ms), 4),
+        "p95_ms": round(samples_ms[int(0.95 * (len(samples_ms) - 1))], 4),
+    }
+
+
+def time_ms(func, repeat: int) -> list:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def bench_import(module: str, repeat: int) -> dict:
+    # Fresh interpreters, minus the cost of an interpreter that imports nothing.
+    def run(code):
+        return time_ms(lambda: subprocess.run([sys.executable, "-c", code], check=True), repeat)
+
+    baseline = statistics.median(run("pass"))
+    return summarize([sample - baseline for sample in run(f"import {module}")])
+
+
+def bench_chain_construction(kind: str, repeat: int) -> dict:
+    """
+    The first build of `kind`'s chain in this process, repeated cold builds (the per-process
+    prompt, tool and prefix caches cleared each time) and warm ones, which only bind the tool
+    to a new engine's model.
+    """
+    def build():
+        ScoringEngine(model=StubChatModel()).chain(kind)
+
+    def cold_build():
+        for cached in (scorer_prompt, scorer_tool, scorer_prefix):
+            cached.cache_clear()
+        build()
+
+    load_scorer(kind)  # the scorer module import is measured separately
+    return {
+        "first_ms": round(time_ms(build, 1)[0], 4),
+        "cold": summarize(time_ms(cold_build, repeat)),
+        "warm": summarize(time_ms(build, repeat)),
+    }
+
+
+def bench_call(kind: str, calls: int) -> dict:
+    engine = ScoringEngine(model=StubChatModel())
+    engine.score(kind, REQUIREMENT)
+    return summarize(time_ms(lambda: engine.score(kind, REQUIREMENT), calls))
+
+
+def bench_batch(kind: str, size: int, workers: int) -> dict:
+    engine = ScoringEngine(model=StubChatModel())
+    records = ((index, REQUIREMENT) for index in range(size))
+
+    async def run():
+        count = 0
+        async for _ in score_records(lambda text: engine.ascore(kind, text), records, workers=workers):
+            count += 1
+        return count
+
+    start = time.perf_counter()
+    count = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+    return {"records": count, "workers": workers, "seconds": round(elapsed, 4), "records_per_second": round(count / elapsed, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", help="Write the JSON results here instead of stdout.")
+    parser.add_argument("--scorers", nargs="*", default=list(SCORER_MODULES), choices=list(SCORER_MODULES))
+    parser.add_argument("--imports", type=int, default=5, help="Fresh interpreters per import measurement.")
+    parser.add_argument("--repeat", type=int, default=50, help="Repetitions of chain construction.")
+    parser.add_argument("--calls", type=int, default=200, help="Calls per per-call overhead measurement.")
+    parser.add_argument("--batch", type=int, default=1000, help="Records per batch throughput measurement.")
+    parser.add_argument("--workers", type=int, default=16)
+    args = parser.parse_args()
+
+    results = {
+        "environment": {
+            "python": platform.python_version(),
+            "threat_detection_score": version("threat_detection_score"),
+            "langchain_core": version("langchain-core"),
+            "langchain_openai": version("langchain-openai"),
+        },
+        "sanitize": summarize(time_ms(lambda: sanitize_input(REQUIREMENT), 10_000)),
+        "scorers": {},
+    }
+
+    for kind in args.scorers:
+        results["scorers"][kind] = {
+            "import": bench_import(SCORER_MODULES[kind], args.imports),
+            "chain_construction": bench_chain_construction(kind, args.repeat),
+            "call_overhead": bench_call(kind, args.calls),
+            "batch": bench_batch(kind, args.batch, args.workers),
+        }
+
+    document = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(document + "\n")
+    else:
+        print(document)
+
+
+if __name__ == "__main__":
+    main()
@@ -13,13 +13,23 @@ setup(
         "langchain-openai",
         "python-dotenv",
     ],
+    extras_require={
+        "server": ["uvicorn"],
+        "semantic": ["numpy"],
+        "msgpack": ["msgpack"],
+        "aggregate": ["numpy"],
+        "preclassify": ["numpy"],
+    },
     entry_points={
         "console_scripts": [
             "detection_coverage=threat_detection_score.langchain_detection_coverage_openai:app",
             "org_alignment=threat_detection_score.langchain_organizational_alignment_openai:app",
             "threat_severity=threat_detection_score.threat_severity_openai_chain:app",
             "exploit_eval=threat_detection_score.langchain_exploit_eval_openai:app",
-            "active_exploit=threat_detection_score.langchain_active_exploit_openai:app"
+            "active_exploit=threat_detection_score.langchain_active_exploit_openai:app",
+            "exploit_assessment=threat_detection_score.langchain_exploit_assessment_openai:app",
+            "score_all=threat_detection_score.cli:score_all_app",
+            "threat_detection_score=threat_detection_score.cli:app"
         ]
     },
     classifiers=[
@@ -0,0 +1,11 @@
+from threat_detection_score.engine import ScoringEngine, get_engine
+from threat_detection_score.results import ScoreResult, ToolCallError
+from threat_detection_score.api import (
+    score_active_exploit,
+    score_all,
+    score_detection_coverage,
+    score_exploit_assessment,
+    score_exploit_eval,
+    score_org_alignment,
+    score_threat_severity,
+)
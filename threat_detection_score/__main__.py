@@ -0,0 +1,4 @@
+from threat_detection_score.cli import app
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,171 @@
+from threat_detection_score.results import ScoreResult, to_plain
+import json
+
+# Component -> (result section, field, lowest score, highest score). A higher normalized value
+# always means a higher priority: detection coverage 2 is "no coverage exists".
+COMPONENTS = {
+    "threat_severity": ("threat_severity", "score", 1, 3),
+    "org_alignment": ("org_alignment", "score", 0, 3),
+    "detection_coverage": ("detection_coverage", "score", 0, 2),
+    "active_exploit_relevance": ("active_exploit", "active_exploit_relevance_score", 0, 2),
+    "active_exploit_prevalence": ("active_exploit", "active_exploit_prevalence_score", 1, 3),
+}
+
+DEFAULT_WEIGHTS = {
+    "threat_severity": 0.30,
+    "org_alignment": 0.25,
+    "detection_coverage": 0.15,
+    "active_exploit_relevance": 0.15,
+    "active_exploit_prevalence": 0.15,
+}
+
+# Lower bounds of the composite score (0-100) for tiers P1, P2, P3; anything lower is P4.
+DEFAULT_TIERS = (75.0, 50.0, 25.0)
+
+# The `type` of a single scorer's result line -> the section it fills.
+_SECTIONS_BY_TYPE = {
+    "threat severity": "threat_severity",
+    "organizational alignment": "org_alignment",
+    "detection coverage": "detection_coverage",
+    "exploit_eval": "exploit_eval",
+    "active_exploit": "active_exploit",
+}
+
+
+def _require_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("Aggregation requires numpy: pip install threat_detection_score[aggregate]")
+    return numpy
+
+
+def _sections(record: dict) -> dict:
+    """The scorer sections of one result record, whatever command produced it."""
+    section = _SECTIONS_BY_TYPE.get(record.get("type"))
+    if section is not None:
+        return {section: record}
+    # score_all and exploit_assessment records hold one nested result per scorer
+    return record
+
+
+class ResultTable:
+    """
+    Raw component scores of a result set as NumPy columns, one row per id.
+
+    Missing scores are NaN. `exploit` is 1 where exploit_eval answered yes, 0 for no and NaN
+    when it is unknown.
+    """
+
+    def __init__(self):
+        self.ids = []
+        self.errors = 0
+        self._rows = {}
+        self._values = {name: [] for name in COMPONENTS}
+        self._values["exploit"] = []
+
+    def add(self, record) -> None:
+        """Merge one result record (a dict or a typed result from the engine) into the table."""
+        if not isinstance(record, dict) or any(isinstance(value, ScoreResult) for value in record.values()):
+            record = to_plain(record)
+        if "error" in record:
+            self.errors += 1
+            return
+
+        record_id = record.get("id", len(self.ids) + 1)
+        row = self._rows.get(record_id)
+        if row is None:
+            row = self._rows[record_id] = len(self.ids)
+            self.ids.append(record_id)
+            for values in self._values.values():
+                values.append(None)
+
+        sections = _sections(record)
+        for name, (section, field, _, _) in COMPONENTS.items():
+            value = (sections.get(section) or {}).get(field)
+            if value is not None:
+                self._values[name][row] = value
+
+        answer = (sections.get("exploit_eval") or {}).get("answer")
+        if answer is not None:
+            self._values["exploit"][row] = 1.0 if answer == "yes" else 0.0
+
+    def columns(self) -> dict:
+        np = _require_numpy()
+        # None becomes NaN in a float array
+        return {name: np.array(values, dtype=np.float64) for name, values in self._values.items()}
+
+    @classmethod
+    def from_jsonl(cls, stream) -> "ResultTable":
+        """Build a table from NDJSON result lines, e.g. the --input-file output of any scorer."""
+        table = cls()
+        for line in stream:
+            if line.strip():
+                table.add(json.loads(line))
+        return table
+
+
+def composite_scores(columns: dict, weights: dict = None, tiers=DEFAULT_TIERS) -> dict:
+    """
+    Weighted composite scores (0-100), tiers and ranks for whole columns at once.
+
+    Each component is scaled to 0-1 over its score range. Active exploit components count as 0
+    where exploit_eval answered no. Components missing from a row are left out and the remaining
+    weights renormalized; rows with no component at all get a NaN composite and no tier.
+    Returns arrays `composite`, `tier` (1 for P1, 0 for none), `rank` (1 is the highest
+    priority) and `order`, the row indices sorted by rank.
+    """
+    np = _require_numpy()
+    weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+    unknown = set(weights) - set(COMPONENTS)
+    if unknown:
+        raise ValueError(f"Unknown weight(s): {', '.join(sorted(unknown))}. Expected: {', '.join(COMPONENTS)}.")
+
+    normalized = np.column_stack([
+        (columns[name] - low) / (high - low) for name, (_, _, low, high) in COMPONENTS.items()
+    ])
+    no_exploit = columns["exploit"] == 0
+    exploit_columns = [index for index, name in enumerate(COMPONENTS) if name.startswith("active_exploit")]
+    normalized[np.ix_(no_exploit, exploit_columns)] = 0.0
+
+    weight_vector = np.array([weights[name] for name in COMPONENTS], dtype=np.float64)
+    present = ~np.isnan(normalized)
+    total_weight = present @ weight_vector
+    with np.errstate(invalid="ignore", divide="ignore"):
+        composite = 100 * (np.where(present, normalized, 0.0) @ weight_vector) / total_weight
+    composite[total_weight == 0] = np.nan
+
+    thresholds = np.asarray(sorted(tiers, reverse=True), dtype=np.float64)
+    tier = (composite[:, None] < thresholds[None, :]).sum(axis=1) + 1
+    tier[np.isnan(composite)] = 0
+
+    # Descending by composite, NaN last, ties keep input order
+    order = np.argsort(np.where(np.isnan(composite), np.inf, -composite), kind="stable")
+    rank = np.empty(len(composite), dtype=np.int64)
+    rank[order] = np.arange(1, len(composite) + 1)
+
+    return {"composite": composite, "tier": tier, "rank": rank, "order": order}
+
+
+def aggregate_records(table: ResultTable, weights: dict = None, tiers=DEFAULT_TIERS, top: int = None):
+    """Compute the composite scores and return an iterator of one summary dict per id, highest priority first."""
+    np = _require_numpy()
+    columns = table.columns()
+    scores = composite_scores(columns, weights, tiers)
+
+    order = scores["order"][:top] if top else scores["order"]
+    # Plain lists, so the per-row loop does no NumPy scalar boxing
+    composite = np.round(scores["composite"], 2).tolist()
+    tier = scores["tier"].tolist()
+    rank = scores["rank"].tolist()
+    raw = {name: columns[name].tolist() for name in COMPONENTS}
+    return (
+        {
+            "id": table.ids[row],
+            "rank": rank[row],
+            "tier": f"P{tier[row]}" if tier[row] else None,
+            "composite": None if composite[row] != composite[row] else composite[row],
+            **{name: None if values[row] != values[row] else int(values[row]) for name, values in raw.items()},
+        }
+        for row in order.tolist()
+    )
@@ -0,0 +1,123 @@
+"""
+Async API for running the scorers inside an asyncio service.
+
+    from threat_detection_score import score_threat_severity
+
+    result = await score_threat_severity("some text", timeout=30)
+
+Every function awaits the engine's `ascore`, so calls never block the event loop on the LLM
+and never write to stdout. All calls share the engine's single chat model client and its HTTP
+connection pool, so thousands of scorings can run concurrently on one loop. The default engine
+is `get_engine()` unless `configure` picked another; any call can also pass its own `engine`.
+
+A `timeout` (seconds) cancels the call when it expires and raises `TimeoutError`. Cancelling the
+awaiting task cancels the HTTP request in flight.
+
+`stream` and `stream_all` are async iterators of events yielded while the model is still writing
+(see `ScoringEngine.astream`); bound them with `asyncio.timeout` around the `async for`.
+"""
+from threat_detection_score.engine import ScoringEngine, get_engine
+from threat_detection_score.results import (
+    ActiveExploitResult,
+    DetectionCoverageResult,
+    ExploitAssessmentResult,
+    ExploitEvalResult,
+    OrgAlignmentResult,
+    ScoreResult,
+    ThreatSeverityResult,
+)
+
+_engine = None
+
+
+def configure(**kwargs) -> ScoringEngine:
+    """Make `get_engine(**kwargs)` the engine of calls that do not pass one, and return it."""
+    global _engine
+
+    _engine = get_engine(**kwargs)
+    return _engine
+
+
+def default_engine() -> ScoringEngine:
+    return _engine if _engine is not None else get_engine()
+
+
+async def _with_timeout(awaitable, timeout: float = None):
+    import asyncio
+
+    if timeout is None:
+        return await awaitable
+    return await asyncio.wait_for(awaitable, timeout)
+
+
+async def score(kind: str, human_message_input: str, *, timeout: float = None, refresh: bool = False, samples: int = 1, engine: ScoringEngine = None) -> ScoreResult:
+    """Score a detection requirement with the `kind` scorer; `samples` above 1 vote as in `ScoringEngine.ascore_consensus`."""
+    engine = engine or default_engine()
+    if samples > 1:
+        return await _with_timeout(engine.ascore_consensus(kind, human_message_input, samples), timeout)
+    return await _with_timeout(engine.ascore(kind, human_message_input, refresh), timeout)
+
+
+async def score_threat_severity(human_message_input: str, *, timeout: float = None, refresh: bool = False, engine: ScoringEngine = None) -> ThreatSeverityResult:
+    return await score("threat_severity", human_message_input, timeout=timeout, refresh=refresh, engine=engine)
+
+
+async def score_detection_coverage(human_message_input: str, *, timeout: float = None, refresh: bool = False, engine: ScoringEngine = None) -> DetectionCoverageResult:
+    return await score("detection_coverage", human_message_input, timeout=timeout, refresh=refresh, engine=engine)
+
+
+async def score_org_alignment(human_message_input: str, *, timeout: float = None, refresh: bool = False, engine: ScoringEngine = None) -> OrgAlignmentResult:
+    return await score("org_alignment", human_message_input, timeout=timeout, refresh=refresh, engine=engine)
+
+
+async def score_exploit_eval(human_message_input: str, *, timeout: float = None, refresh: bool = False, engine: ScoringEngine = None) -> ExploitEvalResult:
+    return await score("exploit_eval", human_message_input, timeout=timeout, refresh=refresh, engine=engine)
+
+
+async def score_active_exploit(human_message_input: str, *, timeout: float = None, refresh: bool = False, engine: ScoringEngine = None) -> ActiveExploitResult:
+    return await score("active_exploit", human_message_input, timeout=timeout, refresh=refresh, engine=engine)
+
+
+async def score_exploit_assessment(human_message_input: str, *, timeout: float = None, refresh: bool = False, engine: ScoringEngine = None) -> ExploitAssessmentResult:
+    return await score("exploit_assessment", human_message_input, timeout=timeout, refresh=refresh, engine=engine)
+
+
+async def score_all(human_message_input: str, *, kinds=None, timeout: float = None, refresh: bool = False, samples: int = 1, engine: ScoringEngine = None) -> dict:
+    """Run every score_all scorer (or just `kinds`) concurrently; `timeout` covers all of them."""
+    engine = engine or default_engine()
+    return await _with_timeout(engine.ascore_all(human_message_input, kinds, refresh, samples), timeout)
+
+
+async def score_many(kind: str, texts, *, pack_size: int = None, timeout: float = None, refresh: bool = False, return_exceptions: bool = False, engine: ScoringEngine = None) -> list:
+    """
+    Score many requirements with the `kind` scorer, in input order.
+
+    With a `pack_size` above 1, up to that many share each LLM request (see
+    `ScoringEngine.ascore_many`); otherwise every requirement is its own concurrent call.
+    """
+    import asyncio
+
+    engine = engine or default_engine()
+    if pack_size and pack_size > 1:
+        awaitable = engine.ascore_many(kind, texts, refresh=refresh, pack_size=pack_size, return_exceptions=return_exceptions)
+    else:
+        awaitable = asyncio.gather(*(engine.ascore(kind, text, refresh) for text in texts), return_exceptions=return_exceptions)
+    return list(await _with_timeout(awaitable, timeout))
+
+
+def stream(kind: str, human_message_input: str, *, refresh: bool = False, engine: ScoringEngine = None):
+    """
+    Async iterator of `kind`'s streaming events for a detection requirement.
+
+        async for event in stream("threat_severity", "some text"):
+            if event["event"] == "field":
+                ...
+    """
+    engine = engine or default_engine()
+    return engine.astream(kind, human_message_input, refresh)
+
+
+def stream_all(human_message_input: str, *, kinds=None, refresh: bool = False, engine: ScoringEngine = None):
+    """Async iterator of the streaming events of every score_all scorer (or just `kinds`), each with its "kind"."""
+    engine = engine or default_engine()
+    return engine.astream_all(human_message_input, kinds, refresh)
@@ -0,0 +1,366 @@
+from threat_detection_score.batch import error_record, parse_record
+import json, os, shutil, time, typer
+
+# A backfill shards a JSONL input file by byte ranges across worker processes. Each worker has
+# its own engine (and so its own warm chains and HTTP pool) and scores its range with the same
+# bounded concurrency as run_batch. A worker appends "offset<TAB>status<TAB>result" lines to its
+# shard file as records finish and periodically checkpoints the input offset below which every
+# record is done; a re-run resumes each shard from its checkpoint and skips the records already
+# in its shard file, but first retries the records whose scoring failed for a reason other than
+# their input. The merge writes the results in input order.
+
+PLAN_FILE = "plan.json"
+
+# Shard file status of a record: scored, an error record for invalid input (final, as in
+# run_batch), or an error record for a failed call, retried by the next run
+_OK, _FAILED, _RETRY = b"+", b"!", b"?"
+
+
+def plan_shards(path: str, shards: int) -> list:
+    """
+    Split `path` into up to `shards` byte ranges that start on line boundaries.
+
+    Returns [{"start", "end", "line_number"}], where line_number is the 1-based line number of
+    the range's first line, used to number records without an id as run_batch does.
+    """
+    size = os.path.getsize(path)
+    starts = [0]
+    with open(path, "rb") as stream:
+        for index in range(1, shards):
+            stream.seek(size * index // shards)
+            stream.readline()
+            if starts[-1] < stream.tell() < size:
+                starts.append(stream.tell())
+
+        # Line numbers of the starts, from one counting pass over the file
+        line_numbers, counted = [], 0
+        stream.seek(0)
+        for start in starts:
+            counted += stream.read(start - stream.tell()).count(b"\n")
+            line_numbers.append(counted + 1)
+
+    ends = starts[1:] + [size]
+    return [{"start": start, "end": end, "line_number": line_number} for start, end, line_number in zip(starts, ends, line_numbers)]
+
+
+class ShardState:
+    """
+    A shard's output file and checkpoint.
+
+    The checkpoint holds the input offset (and its line number) before which every record is
+    done or to be retried, the records done beyond it, the (offset, line number) of the records
+    to retry before it, and the size of the output file at that moment. Loading it scans only
+    the output written since, so resuming costs O(unsaved records).
+    """
+
+    def __init__(self, directory: str, index: int, shard: dict):
+        self.output_path = os.path.join(directory, f"shard-{index:04d}.tsv")
+        self.checkpoint_path = os.path.join(directory, f"shard-{index:04d}.checkpoint.json")
+        self.shard = shard
+        self.checkpoint = {
+            "input_offset": shard["start"], "line_number": shard["line_number"], "done_after": [], "retry": [],
+            "output_size": 0, "records": 0, "errors": 0,
+        }
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, encoding="utf-8") as handle:
+                self.checkpoint = json.load(handle)
+        self.done = set(self.checkpoint["done_after"])
+        self.retry = dict(self.checkpoint.get("retry", []))
+        self.records = self.checkpoint["records"]
+        self.errors = self.checkpoint["errors"]
+
+    @property
+    def scanned(self) -> bool:
+        """Whether every record of the shard was scored once."""
+        return self.checkpoint["input_offset"] >= self.shard["end"]
+
+    @property
+    def finished(self) -> bool:
+        return self.scanned and not self.retry
+
+    def open(self):
+        """Open the output for appending, recovering the records written after the checkpoint."""
+        mode = "r+b" if os.path.exists(self.output_path) else "w+b"
+        self.output = open(self.output_path, mode)
+        self.output.seek(self.checkpoint["output_size"])
+        kept = self.checkpoint["output_size"]
+        for line in self.output:
+            if not line.endswith(b"\n"):
+                break  # Cut off by a crash mid-write
+            offset, status, _ = line.split(b"\t", 2)
+            # A record failed again stays to retry; one beyond the checkpoint is read again anyway
+            if status != _RETRY:
+                self.done.add(int(offset))
+                self.retry.pop(int(offset), None)
+            self.records += 1
+            self.errors += status != _OK
+            kept += len(line)
+        self.output.truncate(kept)
+        self.output.seek(kept)
+
+    def write(self, offset: int, line_number: int, result: dict, retry: bool = False) -> None:
+        """Append the result of the record at `offset`; with `retry`, the next run scores it again."""
+        failed = "error" in result
+        status = _RETRY if retry else _FAILED if failed else _OK
+        self.output.write(b"%d\t%s\t%s\n" % (offset, status, json.dumps(result).encode("utf-8")))
+        if retry:
+            self.retry[offset] = line_number
+        else:
+            self.done.add(offset)
+            self.retry.pop(offset, None)
+        self.records += 1
+        self.errors += failed
+
+    def save(self, input_offset: int, line_number: int) -> None:
+        """Checkpoint: every record before `input_offset` is done or to retry, and its result is on disk."""
+        self.output.flush()
+        os.fsync(self.output.fileno())
+        self.done = {offset for offset in self.done if offset >= input_offset}
+        # Those beyond it are read again on resume anyway
+        retry = sorted([offset, number] for offset, number in self.retry.items() if offset < input_offset)
+        self.checkpoint = {
+            "input_offset": input_offset, "line_number": line_number, "done_after": sorted(self.done), "retry": retry,
+            "output_size": self.output.tell(), "records": self.records, "errors": self.errors,
+        }
+        temporary = self.checkpoint_path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as handle:
+            json.dump(self.checkpoint, handle)
+        os.replace(temporary, self.checkpoint_path)
+
+    def close(self) -> None:
+        self.output.close()
+
+
+def _is_input_error(exc: BaseException) -> bool:
+    """Whether `exc` rejects the record itself (sanitizer or JSON parse), so scoring it again cannot help."""
+    from threat_detection_score.results import ToolCallError
+
+    return isinstance(exc, (typer.BadParameter, ValueError)) and not isinstance(exc, ToolCallError)
+
+
+async def _score_line(score, record_id, text):
+    """The output record of one input record, and whether it failed for a reason worth retrying."""
+    from threat_detection_score.results import to_plain
+
+    try:
+        if isinstance(text, Exception):
+            raise text
+        result = await score(text)
+    except Exception as exc:
+        return error_record(record_id, exc), not _is_input_error(exc)
+    return {"id": record_id, **to_plain(result)}, False
+
+
+def _read_shard(path: str, state: ShardState):
+    """
+    Yield (start, end, line_number, id, text, retried) of the shard's records not yet done: first
+    those to retry, then the rest from the checkpoint on.
+    """
+    with open(path, "rb") as stream:
+        for start, line_number in sorted(state.retry.items()):
+            stream.seek(start)
+            line = stream.readline()
+            record_id, text = parse_record(line, line_number)
+            yield start, start + len(line), line_number, record_id, text, True
+
+        stream.seek(state.checkpoint["input_offset"])
+        line_number = state.checkpoint["line_number"]
+        start = stream.tell()
+        while start < state.shard["end"]:
+            line = stream.readline()
+            if not line:
+                break
+            end = start + len(line)
+            if line.strip() and start not in state.done:
+                record_id, text = parse_record(line, line_number)
+                yield start, end, line_number, record_id, text, False
+            start, line_number = end, line_number + 1
+    state.read_to = (start, line_number)
+
+
+async def _score_shard(score, path: str, state: ShardState, workers: int, checkpoint_seconds: float) -> None:
+    import asyncio
+
+    state.read_to = (state.checkpoint["input_offset"], state.checkpoint["line_number"])
+    records = _read_shard(path, state)
+    pending = {}
+    exhausted = False
+    saved = time.monotonic()
+
+    def _checkpoint():
+        # The earliest record still in flight bounds what is done; without one, all that was read is.
+        # Records being retried lie before the checkpoint already and stay listed until written.
+        in_flight = [(start, line_number) for start, line_number, retried in pending.values() if not retried]
+        state.save(*(min(in_flight) if in_flight else state.read_to))
+
+    try:
+        while pending or not exhausted:
+            while not exhausted and len(pending) < workers:
+                try:
+                    start, end, line_number, record_id, text, retried = next(records)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[asyncio.ensure_future(_score_line(score, record_id, text))] = (start, line_number, retried)
+                if not retried:
+                    # Everything before this record is done, to retry or in flight
+                    state.read_to = (end, line_number + 1)
+
+            if not pending:
+                break
+
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                start, line_number, _ = pending.pop(task)
+                state.write(start, line_number, *task.result())
+
+            if time.monotonic() - saved >= checkpoint_seconds:
+                _checkpoint()
+                saved = time.monotonic()
+    finally:
+        # Also on cancellation (Ctrl-C): in-flight records are simply redone by the next run
+        _checkpoint()
+        for task in pending:
+            task.cancel()
+
+
+def run_shard(path: str, directory: str, index: int, shard: dict, kinds: list, engine_options: dict, workers: int = 8, pack: int = 1, pack_token_budget: int = None, rate_limiter=None, checkpoint_seconds: float = 1.0) -> None:
+    """Score one shard of `path`, resuming from its checkpoint; the target of a worker process."""
+    import asyncio
+    from threat_detection_score import engine as engine_module
+    from threat_detection_score.packing import DEFAULT_PACK_TOKEN_BUDGET, Packer
+
+    if rate_limiter is not None:
+        # get_engine picks up the limiter shared with the other workers instead of creating its own
+        key = (engine_options.get("provider", "openai"), engine_options.get("model_name", "gpt-4o-mini"), engine_options.get("base_url"))
+        engine_module._rate_limiters[key] = rate_limiter
+    engine = engine_module.get_engine(**engine_options)
+
+    state = ShardState(directory, index, shard)
+    if state.finished:
+        return
+    state.open()
+
+    async def _run():
+        if pack > 1:
+            packers = {kind: Packer(engine, kind, pack, pack_token_budget or DEFAULT_PACK_TOKEN_BUDGET) for kind in kinds}
+            concurrency = workers * pack
+        else:
+            packers, concurrency = None, workers
+
+        async def score(text):
+            if packers is None:
+                results = await asyncio.gather(*(engine.ascore(kind, text) for kind in kinds))
+            else:
+                results = await asyncio.gather(*(packers[kind].score(text) for kind in kinds))
+            # One scorer gives its result, several give the score_all layout
+            return results[0] if len(kinds) == 1 else dict(zip(kinds, results))
+
+        await _score_shard(score, path, state, concurrency, checkpoint_seconds)
+
+    try:
+        asyncio.run(_run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        state.close()
+
+
+def merge_shards(directory: str, shards: list, output: str) -> dict:
+    """Write the latest result of every record to `output` as NDJSON in input order."""
+    records = errors = 0
+    temporary = output + ".tmp"
+    with open(temporary, "wb") as target:
+        for index in range(len(shards)):
+            path = os.path.join(directory, f"shard-{index:04d}.tsv")
+            if not os.path.exists(path):
+                continue
+            with open(path, "rb") as source:
+                # Input offset -> position of its line; a record redone after a crash keeps its last result
+                positions = {}
+                position = 0
+                for line in source:
+                    positions[int(line.split(b"\t", 1)[0])] = (position, line.split(b"\t", 2)[1] != _OK)
+                    position += len(line)
+                for offset in sorted(positions):
+                    position, failed = positions[offset]
+                    source.seek(position)
+                    target.write(source.readline().split(b"\t", 2)[2])
+                    records += 1
+                    errors += failed
+    os.replace(temporary, output)
+    return {"records": records, "errors": errors}
+
+
+def run_backfill(input_file: str, output: str, kinds, processes: int = 4, engine_options: dict = None, workers: int = 8, pack: int = 1, pack_token_budget: int = None, requests_per_minute: float = None, tokens_per_minute: float = None, restart: bool = False, keep_shards: bool = False) -> dict:
+    """
+    Score `input_file` with `kinds` across `processes` worker processes and merge to `output`.
+
+    Progress is kept in `<output>.shards/`. Running the same command again after a crash or
+    interruption resumes it; the shard layout is fixed by the first run. The requests and
+    tokens per minute are one budget for all workers. Raises RuntimeError when a worker fails,
+    leaving the shards in place for the next run. Records whose call failed are merged as error
+    records and counted as "retryable"; the shards are then kept too, so the next run scores
+    only those again.
+    """
+    import multiprocessing
+    from threat_detection_score.ratelimit import SharedRateLimiter
+
+    kinds = list(kinds)
+    engine_options = dict(engine_options or {})
+    directory = output + ".shards"
+    stat = os.stat(input_file)
+    identity = {"input": os.path.abspath(input_file), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "kinds": kinds}
+
+    plan_path = os.path.join(directory, PLAN_FILE)
+    if restart and os.path.exists(directory):
+        shutil.rmtree(directory)
+    if os.path.exists(plan_path):
+        with open(plan_path, encoding="utf-8") as handle:
+            plan = json.load(handle)
+        if plan["identity"] != identity:
+            raise ValueError(f"{directory} belongs to another input file or scorer selection; pass --restart to start over.")
+    else:
+        os.makedirs(directory, exist_ok=True)
+        plan = {"identity": identity, "shards": plan_shards(input_file, processes)}
+        with open(plan_path, "w", encoding="utf-8") as handle:
+            json.dump(plan, handle)
+
+    # Spawned rather than forked: the parent may already hold threads and open connections
+    context = multiprocessing.get_context("spawn")
+    rate_limiter = None
+    if requests_per_minute or tokens_per_minute:
+        rate_limiter = SharedRateLimiter(requests_per_minute, tokens_per_minute, context=context)
+        engine_options.update(requests_per_minute=requests_per_minute, tokens_per_minute=tokens_per_minute)
+
+    workers_started = []
+    for index, shard in enumerate(plan["shards"]):
+        if ShardState(directory, index, shard).finished:
+            continue
+        process = context.Process(
+            target=run_shard,
+            args=(input_file, directory, index, shard, kinds, engine_options, workers, pack, pack_token_budget, rate_limiter),
+        )
+        process.start()
+        workers_started.append(process)
+
+    try:
+        for process in workers_started:
+            process.join()
+    except KeyboardInterrupt:
+        # The workers got the interrupt too and checkpoint on their way out
+        for process in workers_started:
+            process.join()
+        raise
+
+    states = [ShardState(directory, index, shard) for index, shard in enumerate(plan["shards"])]
+    unfinished = [state for state in states if not state.scanned]
+    if unfinished:
+        raise RuntimeError(f"{len(unfinished)} shard(s) did not finish; run the same command again to resume.")
+
+    summary = merge_shards(directory, plan["shards"], output)
+    summary["shards"] = len(plan["shards"])
+    summary["retryable"] = sum(len(state.retry) for state in states)
+    if not keep_shards and not summary["retryable"]:
+        shutil.rmtree(directory)
+    return summary
@@ -0,0 +1,99 @@
+from threat_detection_score.output import ResultWriter
+from threat_detection_score.results import to_plain
+import json, typer
+
+
+def read_records(stream):
+    """
+    Yield (id, text) pairs from a JSONL stream, one line at a time.
+
+    Each line is a JSON object with a `text` (or `human_message_input`) field and an optional
+    `id`; lines without an id are numbered from 1. Malformed lines are yielded with the
+    exception in place of the text so the caller can report them against their id.
+    """
+    for line_number, line in enumerate(stream, start=1):
+        if line.strip():
+            yield parse_record(line, line_number)
+
+
+def parse_record(line, line_number: int):
+    """The (id, text) of one JSONL input line, with the exception in place of a malformed line's text."""
+    try:
+        record = json.loads(line)
+        text = record.get("text", record.get("human_message_input"))
+        record_id = record.get("id", line_number)
+    except (ValueError, AttributeError) as exc:
+        return line_number, ValueError(f"Line {line_number} is not a JSON object: {exc}")
+    return record_id, text
+
+
+def error_record(record_id, exc: BaseException) -> dict:
+    """The output record of a failed record: invalid input as its message, anything else with its type."""
+    if isinstance(exc, (typer.BadParameter, ValueError)):
+        return {"id": record_id, "error": str(exc)}
+    return {"id": record_id, "error": f"{type(exc).__name__}: {exc}"}
+
+
+async def _score_record(score, record_id, text) -> dict:
+    try:
+        if isinstance(text, Exception):
+            raise text
+        # The engine sanitizes the text, and its rejection becomes the error record
+        result = await score(text)
+    except Exception as exc:
+        return error_record(record_id, exc)
+
+    return {"id": record_id, **to_plain(result)}
+
+
+async def score_records(score, records, workers: int = 8):
+    """
+    Score `records` with the `score` coroutine function, at most `workers` at a time. `score`
+    gets the raw text and is expected to validate it, as every engine method does.
+
+    Results are yielded as soon as they finish, so output order follows completion rather than
+    input order. Only `workers` records are held in memory at once.
+    """
+    import asyncio
+
+    if workers < 1:
+        raise ValueError("workers must be at least 1.")
+
+    records = iter(records)
+    pending = set()
+    exhausted = False
+
+    while pending or not exhausted:
+        while not exhausted and len(pending) < workers:
+            try:
+                record_id, text = next(records)
+            except StopIteration:
+                exhausted = True
+                break
+            pending.add(asyncio.ensure_future(_score_record(score, record_id, text)))
+
+        if not pending:
+            break
+
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            yield task.result()
+
+
+def run_batch(score, input_file: str, workers: int = 8, output=None, output_format: str = "ndjson"):
+    """Score every record of a JSONL file ("-" for stdin) and write each result as it finishes."""
+    import asyncio, sys
+
+    writer = ResultWriter(output_format, output, many=True)
+
+    async def _run():
+        stream = sys.stdin if input_file == "-" else open(input_file, encoding="utf-8")
+        try:
+            async for result in score_records(score, read_records(stream), workers=workers):
+                writer.write(result)
+        finally:
+            writer.close()
+            if stream is not sys.stdin:
+                stream.close()
+
+    asyncio.run(_run())
@@ -0,0 +1,114 @@
+import hashlib, json, os, sqlite3, threading, time
+
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+    "threat_detection_score",
+    "results.sqlite3",
+)
+
+
+def normalize_input(human_message_input: str) -> str:
+    """Collapse whitespace and case so trivially re-edited requirements share a cache entry."""
+    return " ".join(human_message_input.split()).casefold()
+
+
+def cache_key(kind: str, prefix: str, model_name: str, temperature: float, human_message_input: str) -> str:
+    """
+    Hash everything that determines a score.
+
+    `prefix` is the scorer's full system prompt and tool schema (engine.scorer_prefix), so
+    editing either leaves the old entries unreachable and they age out through TTL/LRU eviction.
+    """
+    material = json.dumps(
+        [kind, prefix, model_name, float(temperature), normalize_input(human_message_input)],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def scorer_scope(kind: str, prefix: str, model_name: str, temperature: float) -> str:
+    """Hash of everything that determines a score except the input itself."""
+    material = json.dumps([kind, prefix, model_name, float(temperature)], ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    On-disk SQLite cache of scorer tool-call arguments, shared by all five scorers.
+
+    Entries older than `ttl` seconds are ignored and removed; once more than `max_entries`
+    are stored, the least recently used ones are evicted. Eviction runs every
+    `evict_interval` writes so a put stays a single-row insert in the common case.
+    """
+
+    def __init__(self, path: str = None, ttl: float = 30 * 24 * 3600, max_entries: int = 100_000, evict_interval: int = 1000):
+        self.path = path or os.environ.get("THREAT_DETECTION_SCORE_CACHE", DEFAULT_CACHE_PATH)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.evict_interval = evict_interval
+        self._puts_since_evict = 0
+
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                args TEXT NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+
+    def get(self, key: str):
+        """Return the stored tool-call args for `key`, or None on a miss or expired entry."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT args, created FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if self.ttl is not None and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def put(self, key: str, kind: str, args: dict) -> None:
+        """Store tool-call args under `key` and evict the least recently used overflow."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, kind, args, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, kind, json.dumps(args), now, now),
+            )
+            self._puts_since_evict += 1
+            if self.max_entries is not None and self._puts_since_evict >= self.evict_interval:
+                self._puts_since_evict = 0
+                self._conn.execute(
+                    """
+                    DELETE FROM results WHERE key IN (
+                        SELECT key FROM results ORDER BY accessed DESC LIMIT -1 OFFSET ?
+                    )
+                    """,
+                    (self.max_entries,),
+                )
+
+    def purge_expired(self) -> int:
+        """Delete every entry older than the TTL and return how many were removed."""
+        if self.ttl is None:
+            return 0
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM results WHERE created < ?", (time.time() - self.ttl,))
+        return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,1078 @@
+from threat_detection_score.batch import run_batch
+from threat_detection_score.engine import get_engine
+from threat_detection_score.input_sanitizer.sanitize import sanitize_input
+from threat_detection_score.output import ResultWriter, check_output_format
+from threat_detection_score.packing import Packer
+from threat_detection_score.providers import PROVIDERS, model_id
+from contextlib import contextmanager
+from typing import List, Optional
+import importlib.util, json, os, sys, typer
+
+
+def _sanitize_optional_input(input_message: Optional[str]) -> Optional[str]:
+    # --human-message-input may be omitted in favour of --input-file
+    if input_message is None:
+        return None
+    return sanitize_input(input_message)
+
+
+def _check_provider(provider: str) -> str:
+    if provider not in PROVIDERS:
+        raise typer.BadParameter(f"Unknown provider '{provider}'. Expected one of: {', '.join(PROVIDERS)}.")
+    return provider
+
+
+def _require_input(human_message_input: Optional[str], input_file: Optional[str]) -> None:
+    if human_message_input is None and input_file is None:
+        raise typer.BadParameter("Either --human-message-input or --input-file is required.")
+    if human_message_input is not None and input_file is not None:
+        raise typer.BadParameter("--human-message-input and --input-file cannot be used together.")
+
+
+# Options shared by every console script.
+HUMAN_MESSAGE_INPUT_OPTION = typer.Option(
+    None,  # Required unless --input-file is given
+    "--human-message-input",  # Specify the flag name
+    "-i",  # Optional shorthand flag
+    help="The input message describing the cybersecurity detection scenario.",
+    callback=_sanitize_optional_input  # Use the sanitize_input function for validation
+)
+
+TEMPERATURE_OPTION = typer.Option(
+    0.0,  # Default value
+    "--temperature",  # Specify the flag name
+    help="The temperature of the LLM."
+)
+
+MODEL_NAME_OPTION = typer.Option(
+    "gpt-4o-mini",  # Default value
+    "--model-name",  # Specify the flag name
+    help="The LLM model used."
+)
+
+MAX_RETRIES_OPTION = typer.Option(
+    3,  # Default value
+    "--max-retries",  # Specify the flag name
+    help="The maximum number of retries for the LLM."
+)
+
+PROVIDER_OPTION = typer.Option(
+    "openai",  # Default value
+    "--provider",  # Specify the flag name
+    help="The chat model backend: openai, openai-compatible (a local or self-hosted server at --base-url) or stub (deterministic, offline).",
+    callback=_check_provider
+)
+
+BASE_URL_OPTION = typer.Option(
+    None,  # Default value
+    "--base-url",  # Specify the flag name
+    help="Base URL of an OpenAI-compatible API to use instead of api.openai.com."
+)
+
+INPUT_FILE_OPTION = typer.Option(
+    None,  # Default value
+    "--input-file",  # Specify the flag name
+    help="JSONL file of {\"id\": ..., \"text\": ...} records to score, or - for stdin. "
+         "One JSON result line is written per record as it finishes."
+)
+
+WORKERS_OPTION = typer.Option(
+    8,  # Default value
+    "--workers",  # Specify the flag name
+    min=1,
+    help="The maximum number of concurrent LLM calls in --input-file mode."
+)
+
+PACK_OPTION = typer.Option(
+    1,  # Default value
+    "--pack",  # Specify the flag name
+    min=1,
+    help="In --input-file mode, score up to this many requirements in one LLM request (1 disables packing)."
+)
+
+PACK_TOKEN_BUDGET_OPTION = typer.Option(
+    8192,  # Default value
+    "--pack-token-budget",  # Specify the flag name
+    min=1,
+    help="Split --pack requests so their requirements and expected answers stay within this many estimated tokens."
+)
+
+SAMPLES_OPTION = typer.Option(
+    1,  # Default value
+    "--samples",  # Specify the flag name
+    min=1,
+    help="Score each requirement up to this many times with concurrent calls (use a non-zero --temperature) and "
+         "return the majority answer with its agreement and score distribution; stops as soon as the majority is certain."
+)
+
+STREAM_OPTION = typer.Option(
+    False,  # Default value
+    "--stream",  # Specify the flag name
+    help="Print NDJSON events as the model writes its answer: each score as soon as it is complete, then the result."
+)
+
+OUTPUT_FORMAT_OPTION = typer.Option(
+    None,  # Default value
+    "--output-format",  # Specify the flag name
+    help="json, pretty (wrapped text for reading), ndjson or msgpack. Defaults to json, or ndjson with --input-file."
+)
+
+REQUESTS_PER_MINUTE_OPTION = typer.Option(
+    None,  # Default value
+    "--requests-per-minute",  # Specify the flag name
+    min=1,
+    help="Pace LLM requests, including retries, to this many per minute across all scorers."
+)
+
+TOKENS_PER_MINUTE_OPTION = typer.Option(
+    None,  # Default value
+    "--tokens-per-minute",  # Specify the flag name
+    min=1,
+    help="Pace LLM requests to this many estimated prompt and completion tokens per minute across all scorers."
+)
+
+NO_CACHE_OPTION = typer.Option(
+    False,  # Default value
+    "--no-cache",  # Specify the flag name
+    help="Do not read or write the local result cache."
+)
+
+REFRESH_OPTION = typer.Option(
+    False,  # Default value
+    "--refresh",  # Specify the flag name
+    help="Ignore cached results and overwrite them with fresh LLM scores."
+)
+
+SEMANTIC_CACHE_OPTION = typer.Option(
+    False,  # Default value
+    "--semantic-cache",  # Specify the flag name
+    help="Reuse the result of a near-duplicate earlier input (requires numpy)."
+)
+
+SIMILARITY_THRESHOLD_OPTION = typer.Option(
+    0.85,  # Default value
+    "--similarity-threshold",  # Specify the flag name
+    min=0.0,
+    max=1.0,
+    help="The cosine similarity at or above which --semantic-cache reuses a result."
+)
+
+PRECLASSIFY_OPTION = typer.Option(
+    False,  # Default value
+    "--preclassify",  # Specify the flag name
+    help="Answer obvious cases with local keyword rules (and --preclassifier models) instead of the LLM."
+)
+
+PRECLASSIFIER_OPTION = typer.Option(
+    [],  # Default value
+    "--preclassifier",  # Specify the flag name
+    help="A .json rules file or .npz linear model (see preclassify train) to add to --preclassify, repeatable. Implies --preclassify."
+)
+
+PRECLASSIFY_THRESHOLD_OPTION = typer.Option(
+    0.9,  # Default value
+    "--preclassify-threshold",  # Specify the flag name
+    min=0.0,
+    max=1.0,
+    help="The confidence at or above which a pre-classifier answer is used instead of the LLM."
+)
+
+RECORD_OPTION = typer.Option(
+    None,  # Default value
+    "--record",  # Specify the flag name
+    help="Store every LLM request and response in this archive file, for --replay."
+)
+
+REPLAY_OPTION = typer.Option(
+    None,  # Default value
+    "--replay",  # Specify the flag name
+    help="Answer LLM requests from this --record archive instead of the provider, without network access."
+)
+
+REPLAY_LATENCY_OPTION = typer.Option(
+    None,  # Default value
+    "--replay-latency",  # Specify the flag name
+    min=0.0,
+    help="With --replay, the seconds every call takes (default: as long as it took when recorded)."
+)
+
+REPLAY_ERROR_RATE_OPTION = typer.Option(
+    0.0,  # Default value
+    "--replay-error-rate",  # Specify the flag name
+    min=0.0,
+    max=1.0,
+    help="With --replay, the share of calls that fail with a retryable server error (HTTP 503)."
+)
+
+PROMPT_CACHE_STATS_OPTION = typer.Option(
+    False,  # Default value
+    "--prompt-cache-stats",  # Specify the flag name
+    help="Print provider-cached versus uncached prompt token counts to stderr when done."
+)
+
+
+METRICS_OPTION = typer.Option(
+    False,  # Default value
+    "--metrics",  # Specify the flag name
+    help="Report per-call stage timings, token usage, retries and model name."
+)
+
+METRICS_FORMAT_OPTION = typer.Option(
+    "jsonl",  # Default value
+    "--metrics-format",  # Specify the flag name
+    help="jsonl (one JSON line per call) or prometheus (text exposition format, written when done)."
+)
+
+METRICS_FILE_OPTION = typer.Option(
+    None,  # Default value
+    "--metrics-file",  # Specify the flag name
+    help="Write --metrics output to this file instead of stderr."
+)
+
+
+def _semantic_threshold(semantic_cache: bool, similarity_threshold: float) -> Optional[float]:
+    """The engine's semantic_threshold: None unless --semantic-cache is given."""
+    if not semantic_cache:
+        return None
+    if importlib.util.find_spec("numpy") is None:
+        raise typer.BadParameter("--semantic-cache requires numpy: pip install threat_detection_score[semantic]")
+    return similarity_threshold
+
+
+def _preclassifiers(preclassify: bool, preclassifier: List[str]) -> Optional[tuple]:
+    """The engine's preclassifiers: None unless --preclassify or --preclassifier is given."""
+    if not preclassify and not preclassifier:
+        return None
+    if any(path.endswith(".npz") for path in preclassifier) and importlib.util.find_spec("numpy") is None:
+        raise typer.BadParameter("--preclassifier models require numpy: pip install threat_detection_score[preclassify]")
+    return tuple(preclassifier)
+
+
+def _replay_options(record: Optional[str], replay: Optional[str], replay_latency: Optional[float], replay_error_rate: float) -> dict:
+    """The get_engine arguments of the --record/--replay options."""
+    if record is not None and replay is not None:
+        raise typer.BadParameter("--record and --replay cannot be used together.")
+    if replay is not None and not os.path.exists(replay):
+        raise typer.BadParameter(f"No --replay archive at {replay}; create one with --record.")
+    return dict(record=record, replay=replay, replay_latency=replay_latency, replay_error_rate=replay_error_rate)
+
+
+def _output_format(output_format: Optional[str], input_file: Optional[str]) -> str:
+    """The --output-format value, defaulting to json for one input and ndjson for a batch."""
+    output_format = output_format or ("ndjson" if input_file is not None else "json")
+    try:
+        check_output_format(output_format)
+    except ValueError as exc:
+        raise typer.BadParameter(str(exc))
+    return output_format
+
+
+def _get_engine(**kwargs):
+    """get_engine, reporting a provider or pre-classifier configuration error as a bad parameter."""
+    try:
+        return get_engine(**kwargs)
+    except (OSError, ValueError) as exc:
+        raise typer.BadParameter(str(exc))
+
+
+def _print_prompt_cache_stats(engine) -> None:
+    print(json.dumps({"prompt_cache": engine.prompt_cache_report()}), file=sys.stderr)
+
+
+@contextmanager
+def _metrics_reporting(engine, metrics: bool, metrics_format: str, metrics_file: Optional[str]):
+    """Attach a metrics exporter to `engine` for the duration of one command."""
+    if not metrics:
+        yield
+        return
+
+    from threat_detection_score.metrics import JsonLinesExporter, PrometheusExporter
+
+    stream = None
+    if metrics_format == "prometheus":
+        exporter = PrometheusExporter(metrics_file)
+    elif metrics_format == "jsonl":
+        stream = open(metrics_file, "a", encoding="utf-8") if metrics_file else None
+        exporter = JsonLinesExporter(stream)
+    else:
+        raise typer.BadParameter("--metrics-format must be jsonl or prometheus.")
+
+    engine.metrics_hooks.append(exporter)
+    try:
+        yield
+    finally:
+        engine.metrics_hooks.remove(exporter)
+        exporter.close()
+        if stream is not None:
+            stream.close()
+
+
+@contextmanager
+def _tool_call_errors():
+    """Report a response without a well-formed tool call as a one-line error and exit with status 1."""
+    from threat_detection_score.results import ToolCallError
+
+    try:
+        yield
+    except ToolCallError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        raise typer.Exit(1)
+
+
+def _check_samples(samples: int, pack: int, stream: bool) -> None:
+    if samples > 1 and (pack > 1 or stream):
+        raise typer.BadParameter("--samples cannot be combined with --pack or --stream.")
+
+
+def _check_stream(stream: bool, input_file: Optional[str]) -> None:
+    if stream and input_file is not None:
+        raise typer.BadParameter("--stream scores a single --human-message-input, not an --input-file.")
+
+
+def _print_events(events) -> None:
+    """Run an async iterator of streaming events, printing each as an NDJSON line the moment it arrives."""
+    import asyncio
+
+    async def _print():
+        async for event in events:
+            if event["event"] == "result":
+                event = {**event, "result": event["result"].to_dict()}
+            sys.stdout.write(json.dumps(event) + "\n")
+            sys.stdout.flush()
+
+    asyncio.run(_print())
+
+
+def make_app(kind: str) -> typer.Typer:
+    """Build the Typer app for the `kind` console script on top of the shared scoring engine."""
+    app = typer.Typer(rich_markup_mode=None)
+
+    @app.command()
+    def main(
+        human_message_input: Optional[str] = HUMAN_MESSAGE_INPUT_OPTION,
+        temperature: str = TEMPERATURE_OPTION,
+        model_name: str = MODEL_NAME_OPTION,
+        max_retries: str = MAX_RETRIES_OPTION,
+        provider: str = PROVIDER_OPTION,
+        base_url: Optional[str] = BASE_URL_OPTION,
+        input_file: Optional[str] = INPUT_FILE_OPTION,
+        workers: int = WORKERS_OPTION,
+        pack: int = PACK_OPTION,
+        pack_token_budget: int = PACK_TOKEN_BUDGET_OPTION,
+        stream: bool = STREAM_OPTION,
+        samples: int = SAMPLES_OPTION,
+        output_format: Optional[str] = OUTPUT_FORMAT_OPTION,
+        requests_per_minute: Optional[int] = REQUESTS_PER_MINUTE_OPTION,
+        tokens_per_minute: Optional[int] = TOKENS_PER_MINUTE_OPTION,
+        no_cache: bool = NO_CACHE_OPTION,
+        refresh: bool = REFRESH_OPTION,
+        semantic_cache: bool = SEMANTIC_CACHE_OPTION,
+        similarity_threshold: float = SIMILARITY_THRESHOLD_OPTION,
+        preclassify: bool = PRECLASSIFY_OPTION,
+        preclassifier: List[str] = PRECLASSIFIER_OPTION,
+        preclassify_threshold: float = PRECLASSIFY_THRESHOLD_OPTION,
+        record: Optional[str] = RECORD_OPTION,
+        replay: Optional[str] = REPLAY_OPTION,
+        replay_latency: Optional[float] = REPLAY_LATENCY_OPTION,
+        replay_error_rate: float = REPLAY_ERROR_RATE_OPTION,
+        prompt_cache_stats: bool = PROMPT_CACHE_STATS_OPTION,
+        metrics: bool = METRICS_OPTION,
+        metrics_format: str = METRICS_FORMAT_OPTION,
+        metrics_file: Optional[str] = METRICS_FILE_OPTION
+    ):
+        _require_input(human_message_input, input_file)
+        _check_stream(stream, input_file)
+        _check_samples(samples, pack, stream)
+        output_format = _output_format(output_format, input_file)
+
+        engine = _get_engine(model_name=model_name, temperature=temperature, max_retries=max_retries, cache=not no_cache,
+                              provider=provider, base_url=base_url,
+                              semantic_threshold=_semantic_threshold(semantic_cache, similarity_threshold),
+                              requests_per_minute=requests_per_minute, tokens_per_minute=tokens_per_minute,
+                              preclassifiers=_preclassifiers(preclassify, preclassifier), preclassify_threshold=preclassify_threshold,
+                              **_replay_options(record, replay, replay_latency, replay_error_rate))
+
+        with _tool_call_errors(), _metrics_reporting(engine, metrics, metrics_format, metrics_file):
+            if input_file is not None and pack > 1:
+                packer = Packer(engine, kind, pack, pack_token_budget, refresh=refresh)
+                # `workers` packed requests in flight
+                run_batch(packer.score, input_file, workers=workers * pack, output_format=output_format)
+            elif input_file is not None and samples > 1:
+                run_batch(lambda text: engine.ascore_consensus(kind, text, samples), input_file, workers=workers, output_format=output_format)
+            elif input_file is not None:
+                run_batch(lambda text: engine.ascore(kind, text, refresh=refresh), input_file, workers=workers, output_format=output_format)
+            elif stream:
+                _print_events(engine.astream(kind, human_message_input, refresh=refresh))
+            elif samples > 1:
+                import asyncio
+
+                result = asyncio.run(engine.ascore_consensus(kind, human_message_input, samples))
+
+                ResultWriter(output_format).write(result)
+            else:
+                result = engine.score(kind, human_message_input, refresh=refresh)
+
+                ResultWriter(output_format).write(result)
+
+        if prompt_cache_stats:
+            _print_prompt_cache_stats(engine)
+
+    return app
+
+
+score_all_app = typer.Typer(rich_markup_mode=None)
+
+
+def _packed_score_all(engine, pack: int, pack_token_budget: int, refresh: bool):
+    """A score_all coroutine function that packs each scorer's requests across records."""
+    import asyncio
+    from threat_detection_score.engine import SCORE_ALL_KINDS
+
+    packers = {kind: Packer(engine, kind, pack, pack_token_budget, refresh=refresh) for kind in SCORE_ALL_KINDS}
+
+    async def score(text):
+        results = await asyncio.gather(*(packer.score(text) for packer in packers.values()))
+        return dict(zip(packers, results))
+
+    return score
+
+
+@score_all_app.command()
+def score_all(
+    human_message_input: Optional[str] = HUMAN_MESSAGE_INPUT_OPTION,
+    temperature: str = TEMPERATURE_OPTION,
+    model_name: str = MODEL_NAME_OPTION,
+    max_retries: str = MAX_RETRIES_OPTION,
+    provider: str = PROVIDER_OPTION,
+    base_url: Optional[str] = BASE_URL_OPTION,
+    input_file: Optional[str] = INPUT_FILE_OPTION,
+    workers: int = WORKERS_OPTION,
+    pack: int = PACK_OPTION,
+    pack_token_budget: int = PACK_TOKEN_BUDGET_OPTION,
+    stream: bool = STREAM_OPTION,
+    samples: int = SAMPLES_OPTION,
+    output_format: Optional[str] = OUTPUT_FORMAT_OPTION,
+    requests_per_minute: Optional[int] = REQUESTS_PER_MINUTE_OPTION,
+    tokens_per_minute: Optional[int] = TOKENS_PER_MINUTE_OPTION,
+    no_cache: bool = NO_CACHE_OPTION,
+    refresh: bool = REFRESH_OPTION,
+    semantic_cache: bool = SEMANTIC_CACHE_OPTION,
+    similarity_threshold: float = SIMILARITY_THRESHOLD_OPTION,
+    preclassify: bool = PRECLASSIFY_OPTION,
+    preclassifier: List[str] = PRECLASSIFIER_OPTION,
+    preclassify_threshold: float = PRECLASSIFY_THRESHOLD_OPTION,
+    record: Optional[str] = RECORD_OPTION,
+    replay: Optional[str] = REPLAY_OPTION,
+    replay_latency: Optional[float] = REPLAY_LATENCY_OPTION,
+    replay_error_rate: float = REPLAY_ERROR_RATE_OPTION,
+    prompt_cache_stats: bool = PROMPT_CACHE_STATS_OPTION,
+    metrics: bool = METRICS_OPTION,
+    metrics_format: str = METRICS_FORMAT_OPTION,
+    metrics_file: Optional[str] = METRICS_FILE_OPTION
+):
+    """Score the input with all five scorers concurrently and print one merged JSON document."""
+    _require_input(human_message_input, input_file)
+    _check_stream(stream, input_file)
+    _check_samples(samples, pack, stream)
+    output_format = _output_format(output_format, input_file)
+
+    engine = _get_engine(model_name=model_name, temperature=temperature, max_retries=max_retries, cache=not no_cache,
+                          provider=provider, base_url=base_url,
+                          semantic_threshold=_semantic_threshold(semantic_cache, similarity_threshold),
+                          requests_per_minute=requests_per_minute, tokens_per_minute=tokens_per_minute,
+                          preclassifiers=_preclassifiers(preclassify, preclassifier), preclassify_threshold=preclassify_threshold,
+                          **_replay_options(record, replay, replay_latency, replay_error_rate))
+
+    with _tool_call_errors(), _metrics_reporting(engine, metrics, metrics_format, metrics_file):
+        if input_file is not None and pack > 1:
+            run_batch(_packed_score_all(engine, pack, pack_token_budget, refresh), input_file, workers=workers * pack, output_format=output_format)
+        elif input_file is not None:
+            run_batch(lambda text: engine.ascore_all(text, refresh=refresh, samples=samples), input_file, workers=workers, output_format=output_format)
+        elif stream:
+            _print_events(engine.astream_all(human_message_input, refresh=refresh))
+        elif samples > 1:
+            import asyncio
+
+            result = asyncio.run(engine.ascore_all(human_message_input, samples=samples))
+
+            ResultWriter(output_format).write(result)
+        else:
+            result = engine.score_all(human_message_input, refresh=refresh)
+
+            ResultWriter(output_format).write(result)
+
+    if prompt_cache_stats:
+        _print_prompt_cache_stats(engine)
+
+
+app = typer.Typer(help="Threat detection scoring services.", rich_markup_mode=None)
+
+
+@app.callback()
+def services():
+    """Threat detection scoring services."""
+
+
+@app.command()
+def serve(
+    host: str = typer.Option("127.0.0.1", "--host", help="The interface to bind."),
+    port: int = typer.Option(8000, "--port", help="The port to listen on."),
+    temperature: str = TEMPERATURE_OPTION,
+    model_name: str = MODEL_NAME_OPTION,
+    max_retries: str = MAX_RETRIES_OPTION,
+    provider: str = PROVIDER_OPTION,
+    base_url: Optional[str] = BASE_URL_OPTION,
+    max_concurrency: int = typer.Option(
+        8,  # Default value
+        "--max-concurrency",  # Specify the flag name
+        min=1,
+        help="The maximum number of concurrent LLM calls per scorer."
+    ),
+    max_queue: int = typer.Option(
+        64,  # Default value
+        "--max-queue",  # Specify the flag name
+        min=0,
+        help="Requests allowed to wait per scorer before new ones are rejected with 503."
+    ),
+    requests_per_minute: Optional[int] = REQUESTS_PER_MINUTE_OPTION,
+    tokens_per_minute: Optional[int] = TOKENS_PER_MINUTE_OPTION,
+    no_cache: bool = NO_CACHE_OPTION,
+    semantic_cache: bool = SEMANTIC_CACHE_OPTION,
+    similarity_threshold: float = SIMILARITY_THRESHOLD_OPTION,
+    preclassify: bool = PRECLASSIFY_OPTION,
+    preclassifier: List[str] = PRECLASSIFIER_OPTION,
+    preclassify_threshold: float = PRECLASSIFY_THRESHOLD_OPTION,
+    record: Optional[str] = RECORD_OPTION,
+    replay: Optional[str] = REPLAY_OPTION,
+    replay_latency: Optional[float] = REPLAY_LATENCY_OPTION,
+    replay_error_rate: float = REPLAY_ERROR_RATE_OPTION
+):
+    """Serve the five scorers over a local HTTP/JSON API."""
+    try:
+        import uvicorn
+    except ImportError:
+        raise typer.BadParameter("serve requires uvicorn: pip install threat_detection_score[server]")
+
+    from threat_detection_score.server import ScoringServer
+
+    engine = _get_engine(model_name=model_name, temperature=temperature, max_retries=max_retries, cache=not no_cache, provider=provider, base_url=base_url,
+                          semantic_threshold=_semantic_threshold(semantic_cache, similarity_threshold),
+                          requests_per_minute=requests_per_minute, tokens_per_minute=tokens_per_minute,
+                          preclassifiers=_preclassifiers(preclassify, preclassifier), preclassify_threshold=preclassify_threshold,
+                          **_replay_options(record, replay, replay_latency, replay_error_rate))
+
+    uvicorn.run(ScoringServer(engine, max_concurrency=max_concurrency, max_queue=max_queue), host=host, port=port)
+
+
+@app.command()
+def aggregate(
+    results_file: str = typer.Argument(..., help="NDJSON results from --input-file runs of any scorers or score_all; \"-\" reads stdin."),
+    weight: List[str] = typer.Option(
+        [],  # Default value
+        "--weight",  # Specify the flag name
+        help="component=weight, repeatable. Components: threat_severity, org_alignment, detection_coverage, active_exploit_relevance, active_exploit_prevalence."
+    ),
+    tiers: str = typer.Option(
+        "75,50,25",  # Default value
+        "--tiers",  # Specify the flag name
+        help="Comma-separated lowest composite scores (0-100) of tiers P1, P2, ...; lower scores fall in the last tier."
+    ),
+    top: Optional[int] = typer.Option(
+        None,  # Default value
+        "--top",  # Specify the flag name
+        min=1,
+        help="Only output the highest-priority N ids."
+    ),
+    output_format: str = typer.Option(
+        "ndjson",  # Default value
+        "--output-format",  # Specify the flag name
+        help="json, pretty, ndjson or msgpack."
+    )
+):
+    """Combine scorer results per id into a weighted composite score, priority tier and rank."""
+    from threat_detection_score.aggregate import ResultTable, aggregate_records
+
+    try:
+        weights = {name.strip(): float(value) for name, value in (item.split("=", 1) for item in weight)}
+        thresholds = [float(value) for value in tiers.split(",") if value.strip()]
+    except ValueError:
+        raise typer.BadParameter("--weight must be component=number and --tiers comma-separated numbers.")
+    output_format = _output_format(output_format, results_file)
+
+    stream = sys.stdin if results_file == "-" else open(results_file, encoding="utf-8")
+    try:
+        table = ResultTable.from_jsonl(stream)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+    try:
+        records = aggregate_records(table, weights, thresholds, top)
+    except (ImportError, ValueError) as exc:
+        raise typer.BadParameter(str(exc))
+
+    writer = ResultWriter(output_format, many=True)
+    try:
+        for record in records:
+            writer.write(record)
+    finally:
+        writer.close()
+
+    if table.errors:
+        print(f"Skipped {table.errors} error record(s).", file=sys.stderr)
+
+
+@app.command()
+def rescore(
+    store_path: Optional[str] = typer.Option(
+        None,  # Default value
+        "--store",  # Specify the flag name
+        help="The score store (default ~/.cache/threat_detection_score/scores.sqlite3, or THREAT_DETECTION_SCORE_STORE)."
+    ),
+    input_file: Optional[str] = typer.Option(
+        None,  # Default value
+        "--input-file",  # Specify the flag name
+        help="Add or update requirements from a JSONL file of {\"id\": ..., \"text\": ...} objects (\"-\" for stdin) before re-scoring."
+    ),
+    kind: List[str] = typer.Option(
+        [],  # Default value
+        "--kind",  # Specify the flag name
+        help="A scorer to re-score, repeatable. Defaults to the five score_all scorers."
+    ),
+    temperature: str = TEMPERATURE_OPTION,
+    model_name: str = MODEL_NAME_OPTION,
+    max_retries: str = MAX_RETRIES_OPTION,
+    provider: str = PROVIDER_OPTION,
+    base_url: Optional[str] = BASE_URL_OPTION,
+    workers: int = WORKERS_OPTION,
+    requests_per_minute: Optional[int] = REQUESTS_PER_MINUTE_OPTION,
+    tokens_per_minute: Optional[int] = TOKENS_PER_MINUTE_OPTION,
+    no_cache: bool = NO_CACHE_OPTION,
+    dry_run: bool = typer.Option(
+        False,  # Default value
+        "--dry-run",  # Specify the flag name
+        help="Only report how many records each scorer would re-score."
+    ),
+    changes: bool = typer.Option(
+        False,  # Default value
+        "--changes",  # Specify the flag name
+        help="Print the score changes recorded for the current prompts and model, without re-scoring."
+    ),
+    export: bool = typer.Option(
+        False,  # Default value
+        "--export",  # Specify the flag name
+        help="Print the stored results as score_all-style NDJSON, without re-scoring."
+    )
+):
+    """Re-score only the stored requirements whose prompt, tool schema or model changed since they were scored."""
+    from threat_detection_score.batch import read_records
+    from threat_detection_score.engine import SCORE_ALL_KINDS, SCORER_MODULES
+    from threat_detection_score.store import ScoreStore, rescore as rescore_store, scorer_fingerprint
+
+    kinds = kind or list(SCORE_ALL_KINDS)
+    unknown = [name for name in kinds if name not in SCORER_MODULES]
+    if unknown:
+        raise typer.BadParameter(f"Unknown scorer(s): {', '.join(unknown)}. Expected one of: {', '.join(SCORER_MODULES)}.")
+
+    store = ScoreStore(store_path)
+    writer = ResultWriter("ndjson", many=True)
+    try:
+        if input_file is not None:
+            stream = sys.stdin if input_file == "-" else open(input_file, encoding="utf-8")
+            try:
+                records = ((record_id, text) for record_id, text in read_records(stream) if isinstance(text, str))
+                print(json.dumps({"requirements_added_or_changed": store.add_requirements(records)}), file=sys.stderr)
+            finally:
+                if stream is not sys.stdin:
+                    stream.close()
+
+        if export:
+            for record in store.export(kinds):
+                writer.write(record)
+            return
+
+        fingerprints = {name: scorer_fingerprint(name, model_id(provider, model_name, base_url), float(temperature)) for name in kinds}
+        if changes:
+            for name in kinds:
+                for change in store.changes(name, fingerprints[name]):
+                    writer.write(change)
+            return
+        if dry_run:
+            summary = {name: {"fingerprint": fingerprints[name], "stale": store.count_stale(name, fingerprints[name])} for name in kinds}
+            print(json.dumps({"rescore": summary}), file=sys.stderr)
+            return
+
+        engine = _get_engine(model_name=model_name, temperature=temperature, max_retries=max_retries, cache=not no_cache,
+                              provider=provider, base_url=base_url,
+                              requests_per_minute=requests_per_minute, tokens_per_minute=tokens_per_minute)
+        summary = rescore_store(engine, store, kinds, workers=workers, on_change=writer.write)
+        print(json.dumps({"rescore": summary}), file=sys.stderr)
+    finally:
+        writer.close()
+        store.close()
+
+
+preclassify_app = typer.Typer(help="Train and evaluate the local pre-classifier.", rich_markup_mode=None)
+app.add_typer(preclassify_app, name="preclassify")
+
+
+def _read_labelled(labels_file: str, input_file: Optional[str]) -> list:
+    """Labelled (text, results) pairs, taking texts missing from the results from `input_file`."""
+    from threat_detection_score.batch import read_records
+    from threat_detection_score.preclassify import read_labelled
+
+    texts = None
+    if input_file is not None:
+        with open(input_file, encoding="utf-8") as stream:
+            texts = {record_id: text for record_id, text in read_records(stream) if isinstance(text, str)}
+
+    stream = sys.stdin if labels_file == "-" else open(labels_file, encoding="utf-8")
+    try:
+        return list(read_labelled(stream, texts))
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+LABELS_FILE_ARGUMENT = typer.Argument(
+    ...,
+    help="NDJSON results of any scorer or score_all (e.g. rescore --export), used as labels; \"-\" reads stdin."
+)
+
+LABELS_INPUT_FILE_OPTION = typer.Option(
+    None,  # Default value
+    "--input-file",  # Specify the flag name
+    help="The JSONL {\"id\": ..., \"text\": ...} records the results were scored from, for results without a text."
+)
+
+
+@preclassify_app.command()
+def train(
+    labels_file: str = LABELS_FILE_ARGUMENT,
+    kind: str = typer.Option(..., "--kind", help="The scorer to train a model for: threat_severity, detection_coverage, org_alignment or exploit_eval."),
+    output: str = typer.Option(..., "--output", help="The .npz file to write the model to."),
+    input_file: Optional[str] = LABELS_INPUT_FILE_OPTION,
+    epochs: int = typer.Option(
+        300,  # Default value
+        "--epochs",  # Specify the flag name
+        min=1,
+        help="Gradient descent passes over the labelled set."
+    )
+):
+    """Train a linear pre-classifier model for one scorer on labelled results."""
+    from threat_detection_score.preclassify import LABEL_FIELDS, LinearModel
+
+    if kind not in LABEL_FIELDS:
+        raise typer.BadParameter(f"No linear model for '{kind}'. Expected one of: {', '.join(LABEL_FIELDS)}.")
+
+    examples = [(text, results[kind][LABEL_FIELDS[kind]]) for text, results in _read_labelled(labels_file, input_file) if kind in results]
+    if len({label for _, label in examples}) < 2:
+        raise typer.BadParameter(f"Need labelled {kind} results with at least two different answers, found {len(examples)} result(s).")
+
+    try:
+        model = LinearModel.train(kind, [text for text, _ in examples], [label for _, label in examples], epochs=epochs)
+    except ImportError as exc:
+        raise typer.BadParameter(str(exc))
+    model.save(output)
+    print(json.dumps({"kind": kind, "examples": len(examples), "classes": model.classes, "output": output}), file=sys.stderr)
+
+
+@preclassify_app.command("eval")
+def evaluate(
+    labels_file: str = LABELS_FILE_ARGUMENT,
+    input_file: Optional[str] = LABELS_INPUT_FILE_OPTION,
+    kind: List[str] = typer.Option(
+        [],  # Default value
+        "--kind",  # Specify the flag name
+        help="A scorer to evaluate, repeatable. Defaults to every scorer with rules or a model."
+    ),
+    preclassifier: List[str] = PRECLASSIFIER_OPTION,
+    preclassify_threshold: float = PRECLASSIFY_THRESHOLD_OPTION
+):
+    """Measure how often the pre-classifier answers, and agrees with, labelled LLM results."""
+    from threat_detection_score.preclassify import Preclassifier, evaluate as evaluate_preclassifier
+
+    try:
+        classifier = Preclassifier.from_files(_preclassifiers(True, preclassifier), preclassify_threshold)
+    except (ImportError, OSError, ValueError) as exc:
+        raise typer.BadParameter(str(exc))
+
+    kinds = kind or sorted(set(classifier.rules) | set(classifier.models))
+    report = evaluate_preclassifier(classifier, _read_labelled(labels_file, input_file), kinds)
+    print(json.dumps({"threshold": preclassify_threshold, "scorers": report}, indent=2))
+
+
+@app.command()
+def backfill(
+    input_file: str = typer.Argument(..., help="JSONL file of {\"id\": ..., \"text\": ...} records (a file, not stdin, so it can be sharded)."),
+    output: str = typer.Option(..., "--output", help="The NDJSON file to write the results to, in input order. Progress is kept in <output>.shards/."),
+    processes: int = typer.Option(
+        4,  # Default value
+        "--processes",  # Specify the flag name
+        min=1,
+        help="Worker processes, one shard of the input each. Fixed by the first run of a backfill."
+    ),
+    kind: List[str] = typer.Option(
+        [],  # Default value
+        "--kind",  # Specify the flag name
+        help="A scorer to run, repeatable. Defaults to the five score_all scorers, written in the score_all layout."
+    ),
+    temperature: str = TEMPERATURE_OPTION,
+    model_name: str = MODEL_NAME_OPTION,
+    max_retries: str = MAX_RETRIES_OPTION,
+    provider: str = PROVIDER_OPTION,
+    base_url: Optional[str] = BASE_URL_OPTION,
+    workers: int = typer.Option(
+        8,  # Default value
+        "--workers",  # Specify the flag name
+        min=1,
+        help="The maximum number of concurrent LLM calls per process."
+    ),
+    pack: int = PACK_OPTION,
+    pack_token_budget: int = PACK_TOKEN_BUDGET_OPTION,
+    requests_per_minute: Optional[int] = REQUESTS_PER_MINUTE_OPTION,
+    tokens_per_minute: Optional[int] = TOKENS_PER_MINUTE_OPTION,
+    no_cache: bool = NO_CACHE_OPTION,
+    restart: bool = typer.Option(
+        False,  # Default value
+        "--restart",  # Specify the flag name
+        help="Discard the progress of an earlier run instead of resuming it."
+    ),
+    keep_shards: bool = typer.Option(
+        False,  # Default value
+        "--keep-shards",  # Specify the flag name
+        help="Keep <output>.shards/ after the merge."
+    )
+):
+    """Score a large JSONL file across worker processes, resumably, and merge the results in input order."""
+    from threat_detection_score.backfill import run_backfill
+    from threat_detection_score.engine import SCORE_ALL_KINDS, SCORER_MODULES
+
+    kinds = kind or list(SCORE_ALL_KINDS)
+    unknown = [name for name in kinds if name not in SCORER_MODULES]
+    if unknown:
+        raise typer.BadParameter(f"Unknown scorer(s): {', '.join(unknown)}. Expected one of: {', '.join(SCORER_MODULES)}.")
+    if input_file == "-":
+        raise typer.BadParameter("backfill needs an input file it can seek in, not stdin.")
+
+    engine_options = dict(model_name=model_name, temperature=float(temperature), max_retries=int(max_retries), cache=not no_cache, provider=provider, base_url=base_url)
+    # Fail on a provider misconfiguration here rather than in every worker
+    _get_engine(**engine_options)
+
+    try:
+        summary = run_backfill(input_file, output, kinds, processes=processes, engine_options=engine_options, workers=workers,
+                               pack=pack, pack_token_budget=pack_token_budget,
+                               requests_per_minute=requests_per_minute, tokens_per_minute=tokens_per_minute,
+                               restart=restart, keep_shards=keep_shards)
+    except (OSError, ValueError) as exc:
+        raise typer.BadParameter(str(exc))
+    except RuntimeError as exc:
+        print(str(exc), file=sys.stderr)
+        raise typer.Exit(1)
+    print(json.dumps({"backfill": summary}), file=sys.stderr)
+    if summary["retryable"]:
+        print(f"{summary['retryable']} record(s) failed on the model call; run the same command again to retry them.", file=sys.stderr)
+
+
+@app.command()
+def loadgen(
+    input_file: str = typer.Argument(..., help="JSONL file of {\"id\": ..., \"text\": ...} records, sent in turn and repeated as needed."),
+    qps: float = typer.Option(
+        10.0,  # Default value
+        "--qps",  # Specify the flag name
+        min=0.001,
+        help="Requests started per second, each scoring one record with every selected scorer."
+    ),
+    duration: float = typer.Option(
+        30.0,  # Default value
+        "--duration",  # Specify the flag name
+        min=0.001,
+        help="Seconds to keep starting requests for."
+    ),
+    kind: List[str] = typer.Option(
+        [],  # Default value
+        "--kind",  # Specify the flag name
+        help="A scorer to drive, repeatable. Defaults to the five score_all scorers."
+    ),
+    temperature: str = TEMPERATURE_OPTION,
+    model_name: str = MODEL_NAME_OPTION,
+    max_retries: str = MAX_RETRIES_OPTION,
+    provider: str = PROVIDER_OPTION,
+    base_url: Optional[str] = BASE_URL_OPTION,
+    requests_per_minute: Optional[int] = REQUESTS_PER_MINUTE_OPTION,
+    tokens_per_minute: Optional[int] = TOKENS_PER_MINUTE_OPTION,
+    record: Optional[str] = RECORD_OPTION,
+    replay: Optional[str] = REPLAY_OPTION,
+    replay_latency: Optional[float] = REPLAY_LATENCY_OPTION,
+    replay_error_rate: float = REPLAY_ERROR_RATE_OPTION
+):
+    """Drive the scorers at a fixed request rate, without the result cache, and report latency percentiles and throughput."""
+    import asyncio
+    from threat_detection_score.batch import read_records
+    from threat_detection_score.engine import SCORE_ALL_KINDS, SCORER_MODULES
+    from threat_detection_score.loadgen import run_load
+
+    kinds = kind or list(SCORE_ALL_KINDS)
+    unknown = [name for name in kinds if name not in SCORER_MODULES]
+    if unknown:
+        raise typer.BadParameter(f"Unknown scorer(s): {', '.join(unknown)}. Expected one of: {', '.join(SCORER_MODULES)}.")
+
+    try:
+        stream = sys.stdin if input_file == "-" else open(input_file, encoding="utf-8")
+    except OSError as exc:
+        raise typer.BadParameter(str(exc))
+    try:
+        texts = [text for _, text in read_records(stream) if isinstance(text, str)]
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    if not texts:
+        raise typer.BadParameter(f"No records with a text in {input_file}.")
+
+    engine = _get_engine(model_name=model_name, temperature=temperature, max_retries=max_retries, cache=False, provider=provider, base_url=base_url,
+                          requests_per_minute=requests_per_minute, tokens_per_minute=tokens_per_minute,
+                          **_replay_options(record, replay, replay_latency, replay_error_rate))
+
+    report = asyncio.run(run_load(engine, texts, kinds, qps, duration))
+    print(json.dumps(report, indent=2))
+
+
+@app.command()
+def worker(
+    queue: str = typer.Argument(..., help="Where to read requirements from: sqlite:PATH (see enqueue), spool:DIRECTORY of .jsonl files, or - for stdin."),
+    output: str = typer.Option(
+        "-",  # Default value
+        "--output",  # Specify the flag name
+        help="Where to write results: - for stdout, store:PATH for a score store (see rescore), or an NDJSON file to append to."
+    ),
+    kind: List[str] = typer.Option(
+        [],  # Default value
+        "--kind",  # Specify the flag name
+        help="A scorer to run, repeatable. Defaults to the five score_all scorers, written in the score_all layout."
+    ),
+    temperature: str = TEMPERATURE_OPTION,
+    model_name: str = MODEL_NAME_OPTION,
+    max_retries: str = MAX_RETRIES_OPTION,
+    provider: str = PROVIDER_OPTION,
+    base_url: Optional[str] = BASE_URL_OPTION,
+    batch_size: int = typer.Option(
+        20,  # Default value
+        "--batch-size",  # Specify the flag name
+        min=1,
+        help="Requirements taken from the backlog at a time."
+    ),
+    pack: int = PACK_OPTION,
+    pack_token_budget: int = PACK_TOKEN_BUDGET_OPTION,
+    workers: int = typer.Option(
+        4,  # Default value
+        "--workers",  # Specify the flag name
+        min=1,
+        help="Micro-batches scored at a time."
+    ),
+    linger: float = typer.Option(
+        0.2,  # Default value
+        "--linger",  # Specify the flag name
+        min=0.0,
+        help="Seconds a partial micro-batch may wait for more requirements while the queue keeps delivering."
+    ),
+    dedupe_window: float = typer.Option(
+        600.0,  # Default value
+        "--dedupe-window",  # Specify the flag name
+        min=0.0,
+        help="Seconds after scoring a requirement during which the same normalized text reuses its result."
+    ),
+    max_backlog: int = typer.Option(
+        1000,  # Default value
+        "--max-backlog",  # Specify the flag name
+        min=1,
+        help="Requirements held in memory; the rest wait in the queue."
+    ),
+    poll_interval: float = typer.Option(
+        0.5,  # Default value
+        "--poll-interval",  # Specify the flag name
+        min=0.01,
+        help="Seconds between polls of an empty queue."
+    ),
+    drain: bool = typer.Option(
+        False,  # Default value
+        "--drain",  # Specify the flag name
+        help="Exit once the queue is empty instead of waiting for more."
+    ),
+    requests_per_minute: Optional[int] = REQUESTS_PER_MINUTE_OPTION,
+    tokens_per_minute: Optional[int] = TOKENS_PER_MINUTE_OPTION,
+    no_cache: bool = NO_CACHE_OPTION,
+    record: Optional[str] = RECORD_OPTION,
+    replay: Optional[str] = REPLAY_OPTION,
+    replay_latency: Optional[float] = REPLAY_LATENCY_OPTION,
+    replay_error_rate: float = REPLAY_ERROR_RATE_OPTION
+):
+    """Score requirements from a queue continuously: deduplicated, highest priority first, in micro-batches."""
+    import asyncio
+    from threat_detection_score.engine import SCORE_ALL_KINDS, SCORER_MODULES
+    from threat_detection_score.worker import Worker, open_queue, open_sink
+
+    kinds = kind or list(SCORE_ALL_KINDS)
+    unknown = [name for name in kinds if name not in SCORER_MODULES]
+    if unknown:
+        raise typer.BadParameter(f"Unknown scorer(s): {', '.join(unknown)}. Expected one of: {', '.join(SCORER_MODULES)}.")
+
+    engine = _get_engine(model_name=model_name, temperature=temperature, max_retries=max_retries, cache=not no_cache, provider=provider, base_url=base_url,
+                          requests_per_minute=requests_per_minute, tokens_per_minute=tokens_per_minute,
+                          **_replay_options(record, replay, replay_latency, replay_error_rate))
+    try:
+        source = open_queue(queue)
+        sink = open_sink(output, engine, kinds, packed=pack > 1)
+    except (OSError, ValueError) as exc:
+        raise typer.BadParameter(str(exc))
+
+    runner = Worker(engine, source, sink, kinds, batch_size=batch_size, pack=pack, token_budget=pack_token_budget, workers=workers, linger=linger,
+                    dedupe_window=dedupe_window, max_backlog=max_backlog, poll_interval=poll_interval, drain=drain)
+    try:
+        asyncio.run(runner.run())
+    except KeyboardInterrupt:
+        pass
+    print(json.dumps({"worker": runner.stats}), file=sys.stderr)
+
+
+@app.command()
+def enqueue(
+    queue: str = typer.Argument(..., help="The queue to add to, as given to the worker: sqlite:PATH (created if missing) or spool:DIRECTORY."),
+    input_file: str = typer.Argument("-", help="JSONL {\"id\": ..., \"text\": ..., \"priority\": ...} records to add; - reads stdin."),
+    priority: float = typer.Option(
+        0.0,  # Default value
+        "--priority",  # Specify the flag name
+        help="The priority of records without one; higher is scored first."
+    )
+):
+    """Add requirements to a work queue for threat_detection_score worker."""
+    from threat_detection_score.worker import SqliteQueue, open_queue, parse_item
+
+    if queue == "-":
+        raise typer.BadParameter("enqueue needs a durable queue: sqlite:PATH or spool:DIRECTORY.")
+
+    try:
+        stream = sys.stdin if input_file == "-" else open(input_file, encoding="utf-8")
+    except OSError as exc:
+        raise typer.BadParameter(str(exc))
+    try:
+        # Records without an id are numbered by line, as in --input-file mode
+        items = [parse_item(line, line_number, default_priority=priority) for line_number, line in enumerate(stream, start=1) if line.strip()]
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    invalid = [item for item in items if not isinstance(item.text, str)]
+    if invalid:
+        raise typer.BadParameter(str(invalid[0].text) if isinstance(invalid[0].text, Exception) else f"Record {invalid[0].id} has no text.")
+
+    try:
+        work_queue = open_queue(queue)
+    except (OSError, ValueError) as exc:
+        raise typer.BadParameter(str(exc))
+    try:
+        count = work_queue.put((item.id, item.text, item.priority) for item in items)
+        summary = {"enqueued": count}
+        if isinstance(work_queue, SqliteQueue):
+            summary["queued"] = len(work_queue)
+    finally:
+        work_queue.close()
+    print(json.dumps(summary), file=sys.stderr)
@@ -0,0 +1,84 @@
+from threat_detection_score.store import score_fields
+import json
+
+# Consensus mode scores a requirement several times, at a non-zero temperature, and keeps the
+# modal answer. Samples are sent in concurrent waves, each just large enough to settle the vote
+# if all of its samples agree with the current leader, and the vote stops as soon as no
+# outstanding sample could change the winner. When the first wave agrees, that is a majority of
+# the requested samples for the latency of one call.
+
+
+class Vote:
+    """
+    Tally of up to `samples` sampled results, voting on their score fields (the reason is not
+    compared). Ties go to the answer that was given first.
+    """
+
+    def __init__(self, samples: int):
+        self.samples = samples
+        self.counts = {}
+        self.results = {}
+        # The tool-call arguments each answer was first given with, which is what gets cached
+        self.args = {}
+        self.errors = []
+
+    @staticmethod
+    def key(result) -> str:
+        # Without the reasons of nested results too, or no two exploit_assessment samples would agree
+        return json.dumps(score_fields(result.to_dict()), sort_keys=True)
+
+    def add(self, result, args: dict = None) -> None:
+        key = self.key(result)
+        self.counts[key] = self.counts.get(key, 0) + 1
+        self.results.setdefault(key, result)
+        self.args.setdefault(key, args)
+
+    def fail(self, exc: Exception) -> None:
+        self.errors.append(exc)
+
+    @property
+    def votes(self) -> int:
+        return sum(self.counts.values())
+
+    @property
+    def remaining(self) -> int:
+        """Samples not yet answered, in flight or still to be sent."""
+        return self.samples - self.votes - len(self.errors)
+
+    def _top(self):
+        """(leading answer, its votes, the runner-up's votes)."""
+        ranked = sorted(self.counts.items(), key=lambda item: -item[1])
+        leader, first = ranked[0] if ranked else (None, 0)
+        return leader, first, ranked[1][1] if len(ranked) > 1 else 0
+
+    def decided(self) -> bool:
+        """True once the leader would still lead if every remaining sample went to the runner-up."""
+        _, first, second = self._top()
+        return first > 0 and first > second + self.remaining
+
+    def needed(self, in_flight: int) -> int:
+        """Samples to send now so that the vote is decided if every one in flight or sent agrees with the leader."""
+        _, first, second = self._top()
+        # Smallest x with first + in_flight + x > second + (remaining - in_flight - x)
+        shortfall = second + self.remaining - 2 * in_flight - first
+        return min(max(0, shortfall // 2 + 1), self.remaining - in_flight)
+
+    def outcome(self):
+        """The modal result, with the `consensus` of the vote attached."""
+        leader, first, _ = self._top()
+        result = self.results[leader]
+        result.consensus = {
+            "samples": self.votes,
+            "requested": self.samples,
+            "failed": len(self.errors),
+            "agreement": round(first / self.votes, 4),
+            "distribution": [
+                {**score_fields(self.results[key].to_dict()), "count": count}
+                for key, count in sorted(self.counts.items(), key=lambda item: -item[1])
+            ],
+        }
+        return result
+
+    def outcome_args(self) -> dict:
+        """The tool-call arguments of the modal result."""
+        return self.args[self._top()[0]]
@@ -0,0 +1,822 @@
+from threat_detection_score.cache import ResultCache, cache_key, scorer_scope
+from threat_detection_score.input_sanitizer.sanitize import sanitize_input
+from threat_detection_score.metrics import ScoreMetrics, StageTimer, token_usage
+from threat_detection_score.packing import DEFAULT_PACK_SIZE, DEFAULT_PACK_TOKEN_BUDGET, format_packed, packed_prefix, packed_prompt, packed_tool, split_packs
+from threat_detection_score.providers import create_chat_model, model_id
+from threat_detection_score.ratelimit import COMPLETION_TOKENS_ESTIMATE, RateLimiter, estimate_tokens
+from threat_detection_score.results import ScoreResult, ToolCallError
+from threat_detection_score.retry import is_retryable, retry_delay
+from threat_detection_score.streaming import ArgumentStream, argument_events
+import functools, importlib, itertools, json, threading, time
+
+# LangChain, the OpenAI client and asyncio are imported inside the functions that need them, so
+# that importing a console script (for --help or input validation) stays cheap.
+
+
+# Console script name -> module that defines the scorer's SYSTEM_PROMPT, TOOL and build_result.
+# TOOL is a plain annotated function; it becomes a LangChain tool when the chain is built.
+SCORER_MODULES = {
+    "threat_severity": "threat_detection_score.threat_severity_openai_chain",
+    "detection_coverage": "threat_detection_score.langchain_detection_coverage_openai",
+    "org_alignment": "threat_detection_score.langchain_organizational_alignment_openai",
+    "exploit_eval": "threat_detection_score.langchain_exploit_eval_openai",
+    "active_exploit": "threat_detection_score.langchain_active_exploit_openai",
+    "exploit_assessment": "threat_detection_score.langchain_exploit_assessment_openai",
+}
+
+# The five scoring dimensions run by score_all. exploit_assessment is left out because it
+# answers exploit_eval and active_exploit together in one call.
+SCORE_ALL_KINDS = ("threat_severity", "detection_coverage", "org_alignment", "exploit_eval", "active_exploit")
+
+
+def compile_prompt(system_prompt: str):
+    """
+    Build a scorer's prompt with the system prompt as a pre-rendered leading message.
+
+    The system message is never re-templated, so it is byte-identical on every call and,
+    together with the tool schema, forms a stable prefix for the provider's prompt caching.
+    Only the trailing human message varies between requests.
+    """
+    from langchain_core.messages import SystemMessage
+    from langchain_core.prompts import ChatPromptTemplate
+
+    return ChatPromptTemplate.from_messages(
+        [
+            SystemMessage(content=system_prompt),
+            ("human", "{detection_requirement}"),
+        ]
+    )
+
+
+def load_scorer(kind: str):
+    """Import and return the scorer module registered for `kind`."""
+    if kind not in SCORER_MODULES:
+        raise ValueError(
+            f"Unknown scorer '{kind}'. Expected one of: {', '.join(SCORER_MODULES)}."
+        )
+    return importlib.import_module(SCORER_MODULES[kind])
+
+
+@functools.lru_cache(maxsize=None)
+def scorer_prompt(kind: str):
+    """The compiled prompt for `kind`, built once per process and shared by every engine."""
+    return compile_prompt(load_scorer(kind).SYSTEM_PROMPT)
+
+
+@functools.lru_cache(maxsize=None)
+def scorer_tool(kind: str):
+    """The LangChain tool for `kind`'s TOOL function, built once per process."""
+    from langchain_core.tools import tool
+
+    return tool(load_scorer(kind).TOOL)
+
+
+@functools.lru_cache(maxsize=None)
+def scorer_prefix(kind: str) -> str:
+    """The fixed part of every `kind` request: its system prompt and tool schema."""
+    from langchain_core.utils.function_calling import convert_to_openai_tool
+
+    return load_scorer(kind).SYSTEM_PROMPT + json.dumps(convert_to_openai_tool(scorer_tool(kind)))
+
+
+class ScoringEngine:
+    """
+    Holds one chat model client (ChatOpenAI unless another `provider` is chosen) and the
+    compiled chain of every scorer.
+
+    Chains are built the first time a scorer is used and reused afterwards, so repeated
+    calls only pay for the LLM round trip. With a `ResultCache`, identical requests are
+    answered from disk without calling the LLM at all. With a `SemanticCache`, requests that
+    are near-duplicates of an earlier one (cosine similarity of at least `semantic_threshold`,
+    by default the cache's own threshold) reuse its result as well. With a `RateLimiter`,
+    every LLM call and retry waits for its share of the requests and tokens per minute. With a
+    `Preclassifier`, cache misses it is confident about are answered locally, and marked so.
+    """
+
+    def __init__(self, model_name: str = "gpt-4o-mini", temperature: float = 0.0, max_retries: int = 3, cache: ResultCache = None, base_url: str = None, model=None, metrics_hooks=None, semantic_cache=None, semantic_threshold: float = None, rate_limiter: RateLimiter = None, provider: str = "openai", preclassifier=None):
+        self.model_name = model_name
+        self.temperature = float(temperature)
+        self.max_retries = int(max_retries)
+        self.cache = cache
+        self.base_url = base_url
+        self.provider = provider
+        # Cached results are only shared between engines of the same provider, model and endpoint
+        self.model_id = model_id(provider, model_name, base_url)
+        self.semantic_cache = semantic_cache
+        self.semantic_threshold = semantic_threshold
+        self.rate_limiter = rate_limiter
+        self.preclassifier = preclassifier
+
+        # Called with a ScoreMetrics after every score call, successful or not.
+        self.metrics_hooks = list(metrics_hooks or [])
+
+        # One client for the engine's lifetime: its HTTP connection pool is shared by every scorer.
+        # Any chat model supporting bind_tools can be passed in instead of a `provider` backend.
+        # Retries are done by the engine (see _invoke) so they can be counted and rate limited.
+        # Response headers carry the x-ratelimit-* values the limiter adapts to.
+        if model is None:
+            model = create_chat_model(
+                self.provider, self.model_name, self.temperature, base_url=self.base_url, include_response_headers=rate_limiter is not None
+            )
+        self.model = model
+
+        self._bound_models = {}
+        self._lock = threading.Lock()
+        self._prompt_cache_stats = {}
+
+    def bound_model(self, kind: str, packed: bool = False):
+        """Return the model with `kind`'s tool (or packed tool) bound and forced, building it on first use."""
+        bound_model = self._bound_models.get((kind, packed))
+        if bound_model is None:
+            if packed:
+                tool = packed_tool(kind)
+                name = tool["function"]["name"]
+            else:
+                tool = scorer_tool(kind)
+                name = tool.name
+            with self._lock:
+                bound_model = self._bound_models.get((kind, packed))
+                if bound_model is None:
+                    bound_model = self._bound_models[(kind, packed)] = self.model.bind_tools([tool], tool_choice=name)
+        return bound_model
+
+    def chain(self, kind: str):
+        """Return the prompt | model chain for `kind`."""
+        return scorer_prompt(kind) | self.bound_model(kind)
+
+    def _record_usage(self, kind: str, metrics: ScoreMetrics) -> None:
+        with self._lock:
+            stats = self._prompt_cache_stats.setdefault(
+                kind, {"calls": 0, "prompt_tokens": 0, "cached_prompt_tokens": 0, "uncached_prompt_tokens": 0}
+            )
+            stats["calls"] += 1
+            stats["prompt_tokens"] += metrics.prompt_tokens
+            stats["cached_prompt_tokens"] += metrics.cached_prompt_tokens
+            stats["uncached_prompt_tokens"] += metrics.prompt_tokens - metrics.cached_prompt_tokens
+
+    def _emit_metrics(self, metrics: ScoreMetrics) -> None:
+        for hook in list(self.metrics_hooks):
+            hook(metrics)
+
+    def prompt_cache_report(self) -> dict:
+        """Per-scorer totals of provider-cached versus uncached prompt tokens for LLM calls so far."""
+        with self._lock:
+            report = {kind: dict(stats) for kind, stats in self._prompt_cache_stats.items()}
+        for stats in report.values():
+            stats["cached_ratio"] = (
+                round(stats["cached_prompt_tokens"] / stats["prompt_tokens"], 4) if stats["prompt_tokens"] else 0.0
+            )
+        return report
+
+    def _prefix(self, kind: str, packed: bool) -> str:
+        # A packed answer comes from another prompt and tool, so it is cached apart from single-call ones
+        return packed_prefix(kind) if packed else scorer_prefix(kind)
+
+    def _cache_key(self, kind: str, human_message_input: str, packed: bool = False):
+        if self.cache is None:
+            return None
+        return cache_key(kind, self._prefix(kind, packed), self.model_id, self.temperature, human_message_input)
+
+    def _cached_args(self, key, refresh: bool):
+        if key is None or refresh:
+            return None
+        return self.cache.get(key)
+
+    def _store_args(self, key, kind: str, human_message_input: str, args: dict, packed: bool = False) -> None:
+        if key is not None:
+            self.cache.put(key, kind, args)
+        if self.semantic_cache is not None:
+            self.semantic_cache.add(self._semantic_scope(kind, packed), human_message_input, args)
+
+    def _semantic_scope(self, kind: str, packed: bool = False) -> str:
+        return scorer_scope(kind, self._prefix(kind, packed), self.model_id, self.temperature)
+
+    def _semantic_match(self, kind: str, human_message_input: str, refresh: bool, packed: bool = False):
+        """Tool-call args and match details of a near-duplicate earlier input, or (None, None)."""
+        if self.semantic_cache is None or refresh:
+            return None, None
+        match = self.semantic_cache.lookup(self._semantic_scope(kind, packed), human_message_input, self.semantic_threshold)
+        if match is None:
+            return None, None
+        args, similarity, matched_text = match
+        return args, {"type": "semantic", "similarity": round(similarity, 4), "matched_text": matched_text}
+
+    def _begin(self, kind: str, human_message_input: str, refresh: bool, metrics: ScoreMetrics, timer: StageTimer, packed: bool = False):
+        """With `packed`, the caches are looked up (and the key returned) for answers of packed requests."""
+        with timer("sanitize"):
+            human_message_input = sanitize_input(human_message_input)
+
+        with timer("cache_lookup"):
+            key = self._cache_key(kind, human_message_input, packed)
+            args = self._cached_args(key, refresh)
+            match = None
+            if args is None:
+                args, match = self._semantic_match(kind, human_message_input, refresh, packed)
+        metrics.cache_hit = args is not None
+        if match is not None:
+            metrics.semantic_similarity = match["similarity"]
+
+        if args is None and self.preclassifier is not None and not refresh:
+            with timer("preclassify"):
+                answer = self.preclassifier.classify(kind, human_message_input)
+            if answer is not None:
+                # Never cached: a later run without the pre-classifier should ask the LLM
+                args, details = answer
+                match = {"type": "preclassified", **details}
+                metrics.preclassified = True
+
+        return human_message_input, key, args, match
+
+    def _parse(self, kind: str, human_message_input: str, llm_result, key, metrics: ScoreMetrics, store: bool = True) -> ScoreResult:
+        """Build the result from the response's tool call; only well-formed calls are cached (with `store`)."""
+        for name, value in token_usage(llm_result).items():
+            setattr(metrics, name, value)
+        self._record_usage(kind, metrics)
+
+        tool_calls = getattr(llm_result, "tool_calls", None)
+        if not tool_calls:
+            invalid_tool_calls = getattr(llm_result, "invalid_tool_calls", None)
+            if invalid_tool_calls:
+                raise ToolCallError(f"{kind}: the model's tool call could not be parsed: {invalid_tool_calls[0].get('error')}")
+            raise ToolCallError(f"{kind}: the model returned no tool call.")
+
+        args = tool_calls[0].get("args")
+        result = load_scorer(kind).build_result(args)
+        if store:
+            self._store_args(key, kind, human_message_input, args)
+        return result
+
+    def _result(self, kind: str, args: dict, match) -> ScoreResult:
+        result = load_scorer(kind).build_result(args)
+        if match is None:
+            return result
+        if match["type"] == "preclassified":
+            result.preclassified = {name: value for name, value in match.items() if name != "type"}
+        else:
+            # Answered from a similar, not identical, input: say so and show which one
+            result.cache_hit = match
+        return result
+
+    def _estimated_tokens(self, kind: str, prompt_value, packed: int = 0) -> int:
+        if packed:
+            return estimate_tokens(packed_prefix(kind), prompt_value.to_messages()[-1].content, completion_tokens=COMPLETION_TOKENS_ESTIMATE * packed)
+        return estimate_tokens(scorer_prefix(kind), prompt_value.to_messages()[-1].content)
+
+    def _after_call(self, llm_result, estimated_tokens: int) -> None:
+        if self.rate_limiter is not None:
+            usage = token_usage(llm_result)
+            self.rate_limiter.observe_headers((getattr(llm_result, "response_metadata", None) or {}).get("headers"))
+            self.rate_limiter.settle(estimated_tokens, usage["prompt_tokens"] + usage["completion_tokens"])
+
+    def _after_failure(self, exc: Exception, delay: float) -> float:
+        """Return how long this caller should sleep before retrying after `exc`."""
+        if self.rate_limiter is None:
+            return delay
+        self.rate_limiter.observe_headers(getattr(getattr(exc, "response", None), "headers", None))
+        if getattr(exc, "status_code", None) == 429:
+            # The quota is shared: hold back every caller, and queue this retry behind them
+            self.rate_limiter.pause(delay)
+            return 0.0
+        return delay
+
+    def _invoke(self, kind: str, prompt_value, metrics: ScoreMetrics, timer: StageTimer, packed: int = 0):
+        estimated_tokens = self._estimated_tokens(kind, prompt_value, packed) if self.rate_limiter is not None else 0
+        for attempt in itertools.count():
+            if self.rate_limiter is not None:
+                with timer("rate_limit"):
+                    self.rate_limiter.acquire(estimated_tokens)
+            with timer("network"):
+                try:
+                    llm_result = self.bound_model(kind, packed > 0).invoke(prompt_value)
+                except Exception as exc:
+                    if attempt >= self.max_retries or not is_retryable(exc):
+                        raise
+                    metrics.retries += 1
+                    time.sleep(self._after_failure(exc, retry_delay(attempt, exc)))
+                    continue
+            self._after_call(llm_result, estimated_tokens)
+            return llm_result
+
+    async def _ainvoke(self, kind: str, prompt_value, metrics: ScoreMetrics, timer: StageTimer, packed: int = 0):
+        import asyncio
+
+        estimated_tokens = self._estimated_tokens(kind, prompt_value, packed) if self.rate_limiter is not None else 0
+        for attempt in itertools.count():
+            if self.rate_limiter is not None:
+                with timer("rate_limit"):
+                    await self.rate_limiter.aacquire(estimated_tokens)
+            with timer("network"):
+                try:
+                    llm_result = await self.bound_model(kind, packed > 0).ainvoke(prompt_value)
+                except Exception as exc:
+                    if attempt >= self.max_retries or not is_retryable(exc):
+                        raise
+                    metrics.retries += 1
+                    await asyncio.sleep(self._after_failure(exc, retry_delay(attempt, exc)))
+                    continue
+            self._after_call(llm_result, estimated_tokens)
+            return llm_result
+
+    def score(self, kind: str, human_message_input: str, refresh: bool = False) -> ScoreResult:
+        """
+        Score a detection requirement with the `kind` scorer and return its typed result.
+
+        Raises `ToolCallError` when the model's response has no well-formed tool call.
+
+        `refresh` skips the cache lookups but still stores the fresh result.
+        """
+        metrics = ScoreMetrics(kind=kind, model=self.model_id)
+        timer = StageTimer(metrics.timings_ms)
+        try:
+            human_message_input, key, args, match = self._begin(kind, human_message_input, refresh, metrics, timer)
+
+            if args is None:
+                with timer("prompt_render"):
+                    prompt_value = scorer_prompt(kind).invoke({"detection_requirement": human_message_input})
+                llm_result = self._invoke(kind, prompt_value, metrics, timer)
+                with timer("parse"):
+                    return self._parse(kind, human_message_input, llm_result, key, metrics)
+
+            with timer("parse"):
+                return self._result(kind, args, match)
+        except Exception as exc:
+            metrics.error = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            self._emit_metrics(metrics)
+
+    async def ascore(self, kind: str, human_message_input: str, refresh: bool = False) -> ScoreResult:
+        """
+        Async variant of `score` built on the model's `ainvoke`.
+
+        Cancelling the task (e.g. from asyncio.wait_for) cancels the HTTP request in flight,
+        or gives back its rate limiter reservation if it was still waiting to be sent.
+        """
+        import asyncio
+
+        metrics = ScoreMetrics(kind=kind, model=self.model_id)
+        timer = StageTimer(metrics.timings_ms)
+        try:
+            human_message_input, key, args, match = self._begin(kind, human_message_input, refresh, metrics, timer)
+
+            if args is None:
+                with timer("prompt_render"):
+                    prompt_value = scorer_prompt(kind).invoke({"detection_requirement": human_message_input})
+                llm_result = await self._ainvoke(kind, prompt_value, metrics, timer)
+                with timer("parse"):
+                    return self._parse(kind, human_message_input, llm_result, key, metrics)
+
+            with timer("parse"):
+                return self._result(kind, args, match)
+        except asyncio.CancelledError:
+            metrics.error = "CancelledError"
+            raise
+        except Exception as exc:
+            metrics.error = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            self._emit_metrics(metrics)
+
+    async def _sample(self, kind: str, human_message_input: str, prompt_value):
+        """
+        One LLM call of a consensus vote, reported in the metrics like any other call but not
+        cached. Returns the result and the tool-call arguments it was built from.
+        """
+        import asyncio
+
+        metrics = ScoreMetrics(kind=kind, model=self.model_id)
+        timer = StageTimer(metrics.timings_ms)
+        try:
+            llm_result = await self._ainvoke(kind, prompt_value, metrics, timer)
+            with timer("parse"):
+                result = self._parse(kind, human_message_input, llm_result, None, metrics, store=False)
+            return result, llm_result.tool_calls[0]["args"]
+        except asyncio.CancelledError:
+            metrics.error = "CancelledError"
+            raise
+        except Exception as exc:
+            metrics.error = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            self._emit_metrics(metrics)
+
+    async def ascore_consensus(self, kind: str, human_message_input: str, samples: int) -> ScoreResult:
+        """
+        Score up to `samples` times with concurrent LLM calls and return the modal result.
+
+        Calls are only sent while they could still change the outcome, so the vote usually ends
+        well before `samples` calls (see consensus.py); calls in flight once it is decided are
+        cancelled. The result's `consensus` gives the samples used, the agreement (the winner's
+        share of the votes) and the distribution of answers. The samples bypass the caches and
+        the pre-classifier, which is only meaningful at a non-zero temperature; the winning
+        answer is cached like a refreshed result. Raises the first error if every sample failed.
+        """
+        import asyncio
+        from threat_detection_score.consensus import Vote
+
+        if samples <= 1:
+            return await self.ascore(kind, human_message_input)
+
+        human_message_input = sanitize_input(human_message_input)
+        prompt_value = scorer_prompt(kind).invoke({"detection_requirement": human_message_input})
+        vote = Vote(samples)
+        pending = set()
+        try:
+            while not vote.decided():
+                for _ in range(vote.needed(len(pending))):
+                    pending.add(asyncio.ensure_future(self._sample(kind, human_message_input, prompt_value)))
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        vote.fail(task.exception())
+                    else:
+                        vote.add(*task.result())
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if not vote.votes:
+            raise vote.errors[0]
+        result = vote.outcome()
+        self._store_args(self._cache_key(kind, human_message_input), kind, human_message_input, vote.outcome_args())
+        return result
+
+    async def _astream_chunks(self, kind: str, prompt_value, metrics: ScoreMetrics, timer: StageTimer):
+        """Yield the response chunks of `_ainvoke`'s request; retried only until the first chunk arrives."""
+        import asyncio
+
+        estimated_tokens = self._estimated_tokens(kind, prompt_value) if self.rate_limiter is not None else 0
+        for attempt in itertools.count():
+            if self.rate_limiter is not None:
+                with timer("rate_limit"):
+                    await self.rate_limiter.aacquire(estimated_tokens)
+            chunks = self.bound_model(kind).astream(prompt_value)
+            message = None
+            try:
+                while True:
+                    # Only the waits for the model count as network time, not the consumer's
+                    with timer("network"):
+                        try:
+                            chunk = await chunks.__anext__()
+                        except StopAsyncIteration:
+                            break
+                    message = chunk if message is None else message + chunk
+                    yield chunk
+            except Exception as exc:
+                if message is not None or attempt >= self.max_retries or not is_retryable(exc):
+                    raise
+                metrics.retries += 1
+                await asyncio.sleep(self._after_failure(exc, retry_delay(attempt, exc)))
+                continue
+            self._after_call(message, estimated_tokens)
+            return
+
+    async def astream(self, kind: str, human_message_input: str, refresh: bool = False):
+        """
+        Score like `ascore`, yielding events while the model is still writing its tool call.
+
+        Each score field is yielded as {"event": "field", "field", "value"} the moment its value
+        is complete, string fields (first) as {"event": "delta", "field", "text"} pieces, and finally
+        {"event": "result", "result"} with the validated result (see streaming.py). Cached and
+        pre-classified results are yielded the same way, all at once.
+        """
+        import asyncio
+
+        metrics = ScoreMetrics(kind=kind, model=self.model_id)
+        timer = StageTimer(metrics.timings_ms)
+        started = time.perf_counter()
+        try:
+            human_message_input, key, args, match = self._begin(kind, human_message_input, refresh, metrics, timer)
+
+            if args is not None:
+                with timer("parse"):
+                    result = self._result(kind, args, match)
+                for event in argument_events(args):
+                    yield event
+                yield {"event": "result", "result": result}
+                return
+
+            with timer("prompt_render"):
+                prompt_value = scorer_prompt(kind).invoke({"detection_requirement": human_message_input})
+            parser = ArgumentStream()
+            message = None
+            async for chunk in self._astream_chunks(kind, prompt_value, metrics, timer):
+                message = chunk if message is None else message + chunk
+                for tool_call_chunk in getattr(chunk, "tool_call_chunks", None) or ():
+                    if not tool_call_chunk.get("index") and tool_call_chunk.get("args"):
+                        for event in parser.feed(tool_call_chunk["args"]):
+                            if event["event"] == "field" and metrics.time_to_first_score_ms is None:
+                                metrics.time_to_first_score_ms = round((time.perf_counter() - started) * 1000, 3)
+                            yield event
+
+            with timer("parse"):
+                result = self._parse(kind, human_message_input, message, key, metrics)
+            yield {"event": "result", "result": result}
+        except (asyncio.CancelledError, GeneratorExit):
+            metrics.error = "CancelledError"
+            raise
+        except Exception as exc:
+            metrics.error = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            self._emit_metrics(metrics)
+
+    async def astream_all(self, human_message_input: str, kinds=None, refresh: bool = False):
+        """
+        `astream` every scorer (or just `kinds`) concurrently, yielding their events as they come,
+        each with a "kind" key. A scorer that fails yields {"event": "error", "kind", "error"}.
+        """
+        import asyncio
+
+        kinds = list(kinds or SCORE_ALL_KINDS)
+        queue = asyncio.Queue()
+
+        async def _pump(kind):
+            try:
+                async for event in self.astream(kind, human_message_input, refresh):
+                    await queue.put({"kind": kind, **event})
+            except Exception as exc:
+                await queue.put({"kind": kind, "event": "error", "error": f"{type(exc).__name__}: {exc}"})
+            finally:
+                await queue.put(None)
+
+        tasks = [asyncio.ensure_future(_pump(kind)) for kind in kinds]
+        try:
+            running = len(tasks)
+            while running:
+                event = await queue.get()
+                if event is None:
+                    running -= 1
+                else:
+                    yield event
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def score_all(self, human_message_input: str, kinds=None, refresh: bool = False) -> dict:
+        """
+        Run every scorer (or just `kinds`) on the same input concurrently.
+
+        Returns one document keyed by scorer name. Wall-clock time is roughly that of the
+        slowest scorer rather than the sum of all of them.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        kinds = list(kinds or SCORE_ALL_KINDS)
+        with ThreadPoolExecutor(max_workers=len(kinds)) as executor:
+            futures = {kind: executor.submit(self.score, kind, human_message_input, refresh) for kind in kinds}
+            return {kind: future.result() for kind, future in futures.items()}
+
+    async def ascore_all(self, human_message_input: str, kinds=None, refresh: bool = False, samples: int = 1) -> dict:
+        """Async variant of `score_all` that gathers the scorers' `ainvoke` calls; `samples` as in `ascore_consensus`."""
+        import asyncio
+
+        kinds = list(kinds or SCORE_ALL_KINDS)
+        if samples > 1:
+            results = await asyncio.gather(*(self.ascore_consensus(kind, human_message_input, samples) for kind in kinds))
+        else:
+            results = await asyncio.gather(*(self.ascore(kind, human_message_input, refresh) for kind in kinds))
+        return dict(zip(kinds, results))
+
+    def _begin_many(self, kind: str, texts, refresh: bool, packed: bool):
+        """
+        Results (or exceptions) of the `texts` answered without the LLM, None for the rest, and
+        (index, sanitized input, cache key) of every one of the rest. With `packed`, they are
+        looked up among, and keyed as, answers of packed requests.
+        """
+        results, misses = [None] * len(texts), []
+        for index, human_message_input in enumerate(texts):
+            metrics = ScoreMetrics(kind=kind, model=self.model_id)
+            timer = StageTimer(metrics.timings_ms)
+            try:
+                human_message_input, key, args, match = self._begin(kind, human_message_input, refresh, metrics, timer, packed)
+                if args is None:
+                    # Reported with the pack it is sent in
+                    misses.append((index, human_message_input, key))
+                    continue
+                with timer("parse"):
+                    results[index] = self._result(kind, args, match)
+            except Exception as exc:
+                metrics.error = f"{type(exc).__name__}: {exc}"
+                results[index] = exc
+            self._emit_metrics(metrics)
+        return results, misses
+
+    def _pack_prompt(self, kind: str, pack: list, timer: StageTimer):
+        with timer("prompt_render"):
+            return packed_prompt(kind).invoke({"detection_requirement": format_packed(text for _, text, _ in pack)})
+
+    def _unpack(self, kind: str, llm_result, pack: list, metrics: ScoreMetrics) -> dict:
+        """
+        The results of a pack's response by input index; only well-formed entries are cached.
+
+        Entries that are malformed, or whose id is missing, unknown or repeated, are left out so
+        those requirements can be scored on their own.
+        """
+        from collections import Counter
+
+        for name, value in token_usage(llm_result).items():
+            setattr(metrics, name, value)
+        self._record_usage(kind, metrics)
+
+        tool_calls = getattr(llm_result, "tool_calls", None)
+        entries = (tool_calls[0].get("args") or {}).get("results") if tool_calls else None
+        if not isinstance(entries, list):
+            metrics.error = f"ToolCallError: {kind}: the model returned no packed results."
+            return {}
+
+        entries = [entry for entry in entries if isinstance(entry, dict)]
+        counts = Counter(entry.get("id") for entry in entries)
+        scorer = load_scorer(kind)
+        results = {}
+        for entry in entries:
+            item_id = entry.get("id")
+            if type(item_id) is not int or not 1 <= item_id <= len(pack) or counts[item_id] > 1:
+                continue
+            index, human_message_input, key = pack[item_id - 1]
+            args = {name: value for name, value in entry.items() if name != "id"}
+            try:
+                result = scorer.build_result(args)
+            except ToolCallError:
+                continue
+            self._store_args(key, kind, human_message_input, args, packed=True)
+            results[index] = result
+        return results
+
+    def _score_pack(self, kind: str, pack: list) -> dict:
+        metrics = ScoreMetrics(kind=kind, model=self.model_id, packed=len(pack))
+        timer = StageTimer(metrics.timings_ms)
+        try:
+            prompt_value = self._pack_prompt(kind, pack, timer)
+            llm_result = self._invoke(kind, prompt_value, metrics, timer, packed=len(pack))
+            with timer("parse"):
+                return self._unpack(kind, llm_result, pack, metrics)
+        except Exception as exc:
+            metrics.error = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            self._emit_metrics(metrics)
+
+    async def _ascore_pack(self, kind: str, pack: list) -> dict:
+        metrics = ScoreMetrics(kind=kind, model=self.model_id, packed=len(pack))
+        timer = StageTimer(metrics.timings_ms)
+        try:
+            prompt_value = self._pack_prompt(kind, pack, timer)
+            llm_result = await self._ainvoke(kind, prompt_value, metrics, timer, packed=len(pack))
+            with timer("parse"):
+                return self._unpack(kind, llm_result, pack, metrics)
+        except Exception as exc:
+            metrics.error = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            self._emit_metrics(metrics)
+
+    def score_many(self, kind: str, texts, refresh: bool = False, pack_size: int = DEFAULT_PACK_SIZE, token_budget: int = DEFAULT_PACK_TOKEN_BUDGET, workers: int = 8, return_exceptions: bool = False) -> list:
+        """
+        Score many requirements with the `kind` scorer, packing up to `pack_size` of them into
+        each LLM request so the system prompt and tool schema are sent once per pack.
+
+        Requirements answered from the caches or the pre-classifier are not sent. The rest are
+        split into packs of at most `token_budget` estimated tokens, `workers` packs at a time.
+        A requirement the packed response leaves out or answers malformed is scored on its own.
+
+        Returns the results in input order. With `return_exceptions`, the exception of a failed
+        requirement takes its place instead of being raised.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        texts = list(texts)
+        results, misses = self._begin_many(kind, texts, refresh, pack_size > 1)
+
+        def _run(pack):
+            if len(pack) > 1:
+                try:
+                    for index, result in self._score_pack(kind, pack).items():
+                        results[index] = result
+                except Exception as exc:
+                    for index, _, _ in pack:
+                        results[index] = exc
+                    return
+            # A pack of one, and whatever the packed response left out
+            for index, human_message_input, _ in pack:
+                if results[index] is None:
+                    try:
+                        results[index] = self.score(kind, human_message_input, refresh)
+                    except Exception as exc:
+                        results[index] = exc
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(_run, split_packs(misses, pack_size, token_budget)))
+        return _raise_or_return(results, return_exceptions)
+
+    async def ascore_many(self, kind: str, texts, refresh: bool = False, pack_size: int = DEFAULT_PACK_SIZE, token_budget: int = DEFAULT_PACK_TOKEN_BUDGET, workers: int = 8, return_exceptions: bool = False) -> list:
+        """Async variant of `score_many` built on the model's `ainvoke`."""
+        import asyncio
+
+        texts = list(texts)
+        results, misses = self._begin_many(kind, texts, refresh, pack_size > 1)
+        semaphore = asyncio.Semaphore(workers)
+
+        async def _run(pack):
+            async with semaphore:
+                if len(pack) > 1:
+                    try:
+                        for index, result in (await self._ascore_pack(kind, pack)).items():
+                            results[index] = result
+                    except Exception as exc:
+                        for index, _, _ in pack:
+                            results[index] = exc
+                        return
+                # A pack of one, and whatever the packed response left out
+                rest = [(index, human_message_input) for index, human_message_input, _ in pack if results[index] is None]
+                singles = await asyncio.gather(*(self.ascore(kind, text, refresh) for _, text in rest), return_exceptions=True)
+                for (index, _), result in zip(rest, singles):
+                    results[index] = result
+
+        await asyncio.gather(*(_run(pack) for pack in split_packs(misses, pack_size, token_budget)))
+        return _raise_or_return(results, return_exceptions)
+
+
+def _raise_or_return(results: list, return_exceptions: bool) -> list:
+    if not return_exceptions:
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+    return results
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+_default_cache = None
+_default_semantic_cache = None
+
+# One limiter per backend, model and endpoint, since that is what a provider quota applies to.
+_rate_limiters = {}
+
+
+def get_engine(model_name: str = "gpt-4o-mini", temperature: float = 0.0, max_retries: int = 3, cache: bool = True, base_url: str = None, semantic_threshold: float = None, requests_per_minute: float = None, tokens_per_minute: float = None, provider: str = "openai", preclassifiers: tuple = None, preclassify_threshold: float = 0.9, record: str = None, replay: str = None, replay_latency: float = None, replay_error_rate: float = 0.0) -> ScoringEngine:
+    """
+    Return the process-wide engine for this model configuration, creating it once.
+
+    With `cache` the engine uses the shared on-disk `ResultCache`. `base_url` points the
+    client at another OpenAI-compatible endpoint and `provider` selects the chat model backend
+    (see providers.PROVIDERS). A `semantic_threshold` also enables the shared `SemanticCache`
+    (requires numpy) at that cosine similarity. `requests_per_minute`
+    or `tokens_per_minute` route every call through the `RateLimiter` shared by all engines
+    of the same model and endpoint. `preclassifiers` (a tuple of rule .json and model .npz
+    paths, empty for just the built-in rules) puts a `Preclassifier` in front of the LLM.
+    `record` stores every LLM exchange in that archive file, and `replay` answers from one
+    instead of the provider, after `replay_latency` seconds (the recorded latency if None)
+    and failing a `replay_error_rate` share of calls (see replay.py); a replaying engine never
+    uses the caches.
+    """
+    global _default_cache, _default_semantic_cache
+
+    if replay is not None:
+        # Replayed answers must neither be served from nor stored as the production model's results
+        cache = False
+    key = (model_name, float(temperature), int(max_retries), bool(cache), base_url, semantic_threshold, requests_per_minute, tokens_per_minute, provider, preclassifiers, preclassify_threshold, record, replay, replay_latency, replay_error_rate)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            if cache and _default_cache is None:
+                _default_cache = ResultCache()
+            if cache and semantic_threshold is not None and _default_semantic_cache is None:
+                from threat_detection_score.semantic_cache import SemanticCache
+
+                _default_semantic_cache = SemanticCache()
+            rate_limiter = None
+            if requests_per_minute or tokens_per_minute:
+                rate_limiter = _rate_limiters.get((provider, model_name, base_url))
+                if rate_limiter is None:
+                    rate_limiter = _rate_limiters[(provider, model_name, base_url)] = RateLimiter(requests_per_minute, tokens_per_minute)
+            preclassifier = None
+            if preclassifiers is not None:
+                from threat_detection_score.preclassify import Preclassifier
+
+                preclassifier = Preclassifier.from_files(preclassifiers, preclassify_threshold)
+            model = None
+            if replay is not None or record is not None:
+                from threat_detection_score.replay import ExchangeArchive, RecordingChatModel, ReplayChatModel
+
+                if replay is not None:
+                    model = ReplayChatModel(archive=ExchangeArchive(replay), model_name=model_name, latency=replay_latency, error_rate=replay_error_rate)
+                else:
+                    inner = create_chat_model(provider, model_name, float(temperature), base_url=base_url, include_response_headers=rate_limiter is not None)
+                    model = RecordingChatModel(inner=inner, archive=ExchangeArchive(record), model_name=model_id(provider, model_name, base_url))
+            engine = _engines[key] = ScoringEngine(
+                *key[:3],
+                cache=_default_cache if cache else None,
+                base_url=base_url,
+                semantic_cache=_default_semantic_cache if cache and semantic_threshold is not None else None,
+                semantic_threshold=semantic_threshold,
+                rate_limiter=rate_limiter,
+                provider=provider,
+                preclassifier=preclassifier,
+                model=model,
+            )
+    return engine
@@ -1,37 +1,40 @@
+from itertools import islice
 import re
 import typer
 
+# Characters allowed in an input message. The hyphen is escaped: written as ".,-_" it forms a
+# ","-"_" range that also lets through "/:;<=>?@[\]^" and friends.
+ALLOWED_CHARACTERS = r"[a-zA-Z0-9\s.,\-_]"
+
+# Limit the number of violations reported
+MAX_VIOLATIONS = 10
+
+_ALLOWED_MESSAGE = re.compile(ALLOWED_CHARACTERS + "+")
+_INVALID_CHARACTER = re.compile(r"[^a-zA-Z0-9\s.,\-_]")
+
+
 def sanitize_input(input_message: str) -> str:
     # Ensure the input is a string
     if not isinstance(input_message, str):
         raise typer.BadParameter("InputMessage must be a string.")
-    
+
     if not input_message.strip():
         raise typer.BadParameter("InputMessage cannot be null, empty, or whitespace.")
-    
-    # Define a regex pattern for allowed characters
-    allowed_pattern = r"^[a-zA-Z0-9\s.,-_]+$"
-    
-    # Find invalid characters
-    invalid_characters = [
-        (char, idx) for idx, char in enumerate(input_message)
-        if not re.match(r"[a-zA-Z0-9\s.,-_]", char)
-    ]
-    
-    if invalid_characters:
-        # Limit the number of violations reported
-        max_violations = 10
-        violation_details = ", ".join(
-            f"'{char}' at position {idx}" for char, idx in invalid_characters[:max_violations]
-        )
-        additional_violations = len(invalid_characters) - max_violations
-        if additional_violations > 0:
-            violation_details += f", and {additional_violations} more..."
-        
-        raise typer.BadParameter(
-            f"InputMessage contains invalid characters: {violation_details}. "
-            "Only the following characters are allowed: " + r"[a-zA-Z0-9\s.,-_]"
-        )
-    
-    # Return the original message if valid
-    return input_message
+
+    # Fast path: one scan of the whole message in the regex engine
+    if _ALLOWED_MESSAGE.fullmatch(input_message):
+        return input_message
+
+    # Only invalid messages are scanned for violations, stopping once enough are found
+    invalid_characters = list(islice(_INVALID_CHARACTER.finditer(input_message), MAX_VIOLATIONS + 1))
+
+    violation_details = ", ".join(
+        f"'{match.group()}' at position {match.start()}" for match in invalid_characters[:MAX_VIOLATIONS]
+    )
+    if len(invalid_characters) > MAX_VIOLATIONS:
+        violation_details += ", and more"
+
+    raise typer.BadParameter(
+        f"InputMessage contains invalid characters: {violation_details}. "
+        "Only the following characters are allowed: " + ALLOWED_CHARACTERS
+    )
@@ -1,49 +1,11 @@
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
-from langchain_core.runnables import RunnablePassthrough, ConfigurableField
-from langchain_core.tools import tool
+from threat_detection_score.cli import make_app
+from threat_detection_score.results import ActiveExploitResult
 from typing import Literal
-from threat_detection_score.input_sanitizer.sanitize import sanitize_input
-import json, textwrap, typer
-
-app = typer.Typer()
-
-
-@app.command()
-def main(
-    human_message_input: str = typer.Option(
-        ...,  # This indicates the option is required
-        "--human-message-input",  # Specify the flag name
-        "-i",  # Optional shorthand flag
-        help="The input message describing the cybersecurity detection scenario.",
-        callback=sanitize_input  # Use the sanitize_input function for validation
-    ),
-    temperature: str = typer.Option(
-        0.0,  # Default value
-        "--temperature",  # Specify the flag name
-        help="The temperature of the LLM."
-    ),
-    model_name: str = typer.Option(
-        "gpt-4o-mini",  # Default value
-        "--model-name",  # Specify the flag name
-        help="The LLM model used."
-    ),
-    max_retries: str = typer.Option(
-        3,  # Default value
-        "--max-retries",  # Specify the flag name
-        help="The maximum number of retries for the LLM."
-    )
-):
-
-
-    chat_template = ChatPromptTemplate.from_messages(
-        [
-            ("system", "{system_prompt}"),
-            ("human", "{detection_requirement}"),
-        ]
-    )
-
-    system_prompt = """
+import inspect
+
+KIND = "active_exploit"
+
+SYSTEM_PROMPT = inspect.cleandoc("""
     You are an AI assuming the role of a cyber security threat analyst. Your objective is to evaluate and score cyber security threats based on specific detection requirements. An Active Exploits score should only be used in the scoring process if the detection requirement involves detecting a specific exploit. Utilize the provided scoring charts to determine the appropriate score for each scenario.
 
     **Input:**
@@ -91,42 +53,21 @@ def main(
     - Analyze the input with an understanding of cybersecurity principles and the specific context of the detection requirement.
     - Accurately apply the criteria from the tables to assess and score the threat.
     - Provide clear, concise, and actionable output that aids in decision-making regarding cybersecurity measures.
-    """
-
-    prompt = chat_template.partial(system_prompt=system_prompt)
-
-    model = ChatOpenAI(model=model_name, temperature=temperature, max_retries=max_retries)
+    """)
 
-    @tool
-    def active_exploit(active_exploit_relevance_score: Literal[0, 1, 2], active_exploit_prevalence_score: Literal[1, 2, 3], reason: str) -> None:
-        """active exploit rankings"""
-        pass
 
+def active_exploit(active_exploit_relevance_score: Literal[0, 1, 2], active_exploit_prevalence_score: Literal[1, 2, 3], reason: str) -> None:
+    """active exploit rankings"""
+    pass
 
-    tools = [active_exploit]
+TOOL = active_exploit
 
 
-    chain = (
-        prompt
-        | model.bind_tools(tools, tool_choice="active_exploit")
-    )
+def build_result(args: dict) -> ActiveExploitResult:
+    return ActiveExploitResult.from_args(args)
 
 
-    llm_result = chain.invoke({"detection_requirement": human_message_input})
-
-    active_exploit_relevance_score = llm_result.tool_calls[0]["args"]["active_exploit_relevance_score"]
-    active_exploit_prevalence_score = llm_result.tool_calls[0]["args"]["active_exploit_prevalence_score"]
-    reason = llm_result.tool_calls[0]["args"]["reason"]
-
-    result = {
-    "active_exploit_relevance_score": active_exploit_relevance_score,
-    "active_exploit_prevalence_score": active_exploit_prevalence_score,
-    "reason": "\n".join(textwrap.wrap(reason, width=80)),
-    "type": "active_exploit"
-    }
-
-    print(json.dumps(result))
+app = make_app(KIND)
 
 if __name__ == "__main__":
     app()
-
@@ -1,42 +1,11 @@
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
-from langchain_core.runnables import RunnablePassthrough, ConfigurableField
-from langchain_core.tools import tool
-from threat_detection_score.input_sanitizer.sanitize import sanitize_input
+from threat_detection_score.cli import make_app
+from threat_detection_score.results import DetectionCoverageResult
 from typing import Literal
+import inspect
 
-import json, textwrap, typer
-
-
-app = typer.Typer()
-
-@app.command()
-def main(
-    human_message_input: str = typer.Option(
-        ...,  # This indicates the option is required
-        "--human-message-input",  # Specify the flag name
-        "-i",  # Optional shorthand flag
-        help="The input message describing the cybersecurity detection scenario.",
-        callback=sanitize_input  # Use the sanitize_input function for validation
-    ),
-    temperature: str = typer.Option(
-        0.0,  # Default value
-        "--temperature",  # Specify the flag name
-        help="The temperature of the LLM."
-    ),
-    model_name: str = typer.Option(
-        "gpt-4o-mini",  # Default value
-        "--model-name",  # Specify the flag name
-        help="The LLM model used."
-    ),
-    max_retries: str = typer.Option(
-        3,  # Default value
-        "--max-retries",  # Specify the flag name
-        help="The maximum number of retries for the LLM."
-    )
-):
-
-    system_prompt = """
+KIND = "detection_coverage"
+
+SYSTEM_PROMPT = inspect.cleandoc("""
     **Objective:** 
     As a Cybersecurity Threat Analyst powered by OpenAI, your mission is to evaluate cybersecurity detection requirements based on input scenarios. 
     Your assessments will hinge on a specific scoring chart that categorizes the adequacy and necessity of cybersecurity measures. 
@@ -62,46 +31,21 @@ def main(
     3. **Evaluation Criteria:** Compare the input scenario against the chart. Consider factors such as the novelty of the threat, the current scope of detection capabilities, and the potential for updating existing mechanisms versus the need for entirely new approaches.
 
     4. **Deliver a Verdict:** Based on your analysis, assign the correct score to the input scenario. Provide reasoning for your decision, drawing parallels with the examples given in the chart when applicable. This explanation should guide users in understanding the rationale behind the score, emphasizing how it aligns with the described examples and detection requirements.
-    """
-
-    @tool
-    def detection_coverage(score: Literal[0, 1, 2], reason: str) -> None:
-        """detection coverage ranking"""
-        pass
-
-
-    chat_template = ChatPromptTemplate.from_messages(
-        [
-            ("system", "{system_prompt}"),
-            ("human", "{detection_requirement}"),
-        ]
-    )
-
-    prompt = chat_template.partial(system_prompt=system_prompt)
-
-    model = ChatOpenAI(model=model_name, temperature=temperature, max_retries=max_retries)
+    """)
 
-    tools = [detection_coverage]
 
-    chain = (
-        {"detection_requirement": RunnablePassthrough()}
-        | prompt
-        | model.bind_tools(tools, tool_choice="detection_coverage")
-    )
+def detection_coverage(score: Literal[0, 1, 2], reason: str) -> None:
+    """detection coverage ranking"""
+    pass
 
-    llm_result = chain.invoke({"detection_requirement": human_message_input})
+TOOL = detection_coverage
 
 
-    score = llm_result.tool_calls[0]["args"]["score"]
-    reason = llm_result.tool_calls[0]["args"]["reason"]
+def build_result(args: dict) -> DetectionCoverageResult:
+    return DetectionCoverageResult.from_args(args)
 
-    result = {
-    "score": score,
-    "reason": "\n".join(textwrap.wrap(reason, width=80)),
-    "type": "detection coverage"
-    }
 
-    print(json.dumps(result))
+app = make_app(KIND)
 
 if __name__ == "__main__":
-    app()
\ No newline at end of file
+    app()
@@ -0,0 +1,70 @@
+from threat_detection_score import langchain_active_exploit_openai as active_exploit_scorer
+from threat_detection_score.cli import make_app
+from threat_detection_score.results import ActiveExploitResult, ExploitAssessmentResult, ExploitEvalResult, ToolCallError
+from typing import Literal, Optional
+import inspect
+
+KIND = "exploit_assessment"
+
+SYSTEM_PROMPT = inspect.cleandoc("""
+    You are an AI assuming the role of a cyber security threat analyst.
+    Your objective is to evaluate the detection requirement in two steps and report both in a single answer.
+
+    **Step 1 - Exploit Evaluation:**
+
+    - Determine if there are any Active Exploit(s) in the detection requirement.
+    - Answer **yes** if the detection requirement involves detecting a specific exploit, otherwise answer **no**, and give the reason.
+
+    **Step 2 - Active Exploit Scoring (only when the answer to Step 1 is yes):**
+
+    - Score the active exploit relevance and prevalence following the instructions and tables below, and give a separate reason for those scores.
+    - When the answer to Step 1 is no, leave the relevance score, prevalence score and active exploit reason empty.
+
+    ---
+    """) + "\n\n" + active_exploit_scorer.SYSTEM_PROMPT
+
+
+def exploit_assessment(
+    answer: Literal["yes", "no"],
+    reason: str,
+    active_exploit_relevance_score: Optional[Literal[0, 1, 2]] = None,
+    active_exploit_prevalence_score: Optional[Literal[1, 2, 3]] = None,
+    active_exploit_reason: Optional[str] = None,
+) -> None:
+    """exploitation evaluation, with active exploit rankings when the answer is yes"""
+    pass
+
+TOOL = exploit_assessment
+
+
+def build_result(args: dict) -> ExploitAssessmentResult:
+    """
+    Split the combined tool call into the existing exploit_eval and active_exploit results.
+
+    `active_exploit` is None when the answer is "no" (or the model left the scores out), which
+    is the case where the separate active_exploit scorer would not have been run.
+    """
+    if not isinstance(args, dict):
+        raise ToolCallError(f"exploit_assessment: tool call arguments must be an object, got {type(args).__name__}.")
+
+    exploit_eval = ExploitEvalResult.from_args({name: args[name] for name in ("answer", "reason") if name in args})
+
+    active_exploit = None
+    if (
+        exploit_eval.answer == "yes"
+        and args.get("active_exploit_relevance_score") is not None
+        and args.get("active_exploit_prevalence_score") is not None
+    ):
+        active_exploit = ActiveExploitResult.from_args({
+            "active_exploit_relevance_score": args["active_exploit_relevance_score"],
+            "active_exploit_prevalence_score": args["active_exploit_prevalence_score"],
+            "reason": args.get("active_exploit_reason") or exploit_eval.reason,
+        })
+
+    return ExploitAssessmentResult(exploit_eval=exploit_eval, active_exploit=active_exploit)
+
+
+app = make_app(KIND)
+
+if __name__ == "__main__":
+    app()
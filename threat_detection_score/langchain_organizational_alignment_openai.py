@@ -1,49 +1,11 @@
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
-from langchain_core.runnables import RunnablePassthrough, ConfigurableField
-from langchain_core.tools import tool
+from threat_detection_score.cli import make_app
+from threat_detection_score.results import OrgAlignmentResult
 from typing import Literal
-from threat_detection_score.input_sanitizer.sanitize import sanitize_input
-import json, textwrap, typer
-from pprint import pprint
-
-app = typer.Typer()
-
-
-@app.command()
-def main(
-    human_message_input: str = typer.Option(
-        ...,  # This indicates the option is required
-        "--human-message-input",  # Specify the flag name
-        "-i",  # Optional shorthand flag
-        help="The input message describing the cybersecurity detection scenario.",
-        callback=sanitize_input  # Use the sanitize_input function for validation
-    ),
-    temperature: str = typer.Option(
-        0.0,  # Default value
-        "--temperature",  # Specify the flag name
-        help="The temperature of the LLM."
-    ),
-    model_name: str = typer.Option(
-        "gpt-4o-mini",  # Default value
-        "--model-name",  # Specify the flag name
-        help="The LLM model used."
-    ),
-    max_retries: str = typer.Option(
-        3,  # Default value
-        "--max-retries",  # Specify the flag name
-        help="The maximum number of retries for the LLM."
-    )
-):
-
-    chat_template = ChatPromptTemplate.from_messages(
-        [
-            ("system", "{system_prompt}"),
-            ("human", "{detection_requirement}"),
-        ]
-    )
-
-    system_prompt = """
+import inspect
+
+KIND = "org_alignment"
+
+_SYSTEM_PROMPT_TEMPLATE = inspect.cleandoc("""
     You are a cybersecurity threat analyst tasked with evaluating threats to an organization. Your goal is to determine the appropriate threat score based on specific detection requirements and organizational context. Use the following guidelines to assign the correct score to each threat:
 
     - **Score 0:** Assign this score if the threat is irrelevant to the organization. Examples include threats targeting technologies, software, or sectors not used or operated by the organization, such as malware for a different operating system, attacks on unused software, or threats specific to industries or geographies irrelevant to the organization.
@@ -65,13 +27,9 @@ def main(
 
     Analyze the detection inputs provided, considering the organization’s technology stack, industry sector, geographical location, and any specific vulnerabilities or previous threat encounters. Based on these factors and the guidelines above, assign an appropriate threat score and justify your reasoning. Consider the potential impact, the likelihood of the threat targeting the organization, and any recent trends or intelligence reports that might influence the threat level.
     {org_align_add_info}
-    """
-
+    """)
 
-    prompt = chat_template.partial(system_prompt=system_prompt)
-
-
-    add_on_info = """
+ADD_ON_INFO = inspect.cleandoc("""
     | Type                  | Value               |
     |-----------------------|---------------------|
     | technology stack      | ubuntu              |
@@ -87,37 +45,25 @@ def main(
     | industry sector       | soho                |
     | geographical location | north america       |
     | geographical location | michigan            |
-    """
-
-    prompt = prompt.partial(org_align_add_info=add_on_info)
+    """)
 
-    model = ChatOpenAI(model=model_name, temperature=temperature, max_retries=max_retries)
+# The organization profile is substituted into the prompt text up front; passing it as a
+# template partial never reached the model because partial values are not re-rendered.
+SYSTEM_PROMPT = _SYSTEM_PROMPT_TEMPLATE.format(org_align_add_info=ADD_ON_INFO)
 
-    @tool
-    def org_alingment(score: Literal[0, 1, 2, 3], reason: str) -> None:
-        """organizational alignment cyber security risk scoring"""
-        pass
 
-    tools = [org_alingment]
+def org_alingment(score: Literal[0, 1, 2, 3], reason: str) -> None:
+    """organizational alignment cyber security risk scoring"""
+    pass
 
-    chain = (
-        {"detection_requirement": RunnablePassthrough()}
-        | prompt
-        | model.bind_tools(tools, tool_choice="org_alingment")
-    )
+TOOL = org_alingment
 
-    llm_result = chain.invoke({"detection_requirement": human_message_input})
 
-    score = llm_result.tool_calls[0]["args"]["score"]
-    reason = llm_result.tool_calls[0]["args"]["reason"]
+def build_result(args: dict) -> OrgAlignmentResult:
+    return OrgAlignmentResult.from_args(args)
 
-    result = {
-    "score": score,
-    "reason": "\n".join(textwrap.wrap(reason, width=80)),
-    "type": "organizational alignment"
-    }
 
-    print(json.dumps(result))
+app = make_app(KIND)
 
 if __name__ == "__main__":
-    app()
\ No newline at end of file
+    app()
@@ -0,0 +1,81 @@
+import math
+
+# The load generator is open-loop: requests start on a fixed schedule at the target rate whether
+# or not earlier ones have finished, and each latency is measured from the request's scheduled
+# start. A backed-up system therefore shows up as growing latencies instead of as a quietly
+# lower request rate.
+
+
+def percentile(values: list, q: float):
+    """The nearest-rank `q`th percentile of sorted `values`, or None when there are none."""
+    if not values:
+        return None
+    return values[max(0, math.ceil(q / 100 * len(values)) - 1)]
+
+
+def latency_summary(latencies: list) -> dict:
+    """p50/p95/p99, mean and max of latencies in seconds, in milliseconds."""
+    values = sorted(latencies)
+    summary = {f"p{q}": percentile(values, q) for q in (50, 95, 99)}
+    summary["mean"] = sum(values) / len(values) if values else None
+    summary["max"] = values[-1] if values else None
+    return {name: None if value is None else round(value * 1000, 3) for name, value in summary.items()}
+
+
+async def run_load(engine, texts: list, kinds, qps: float, duration: float) -> dict:
+    """
+    Score `texts` in turn with every scorer in `kinds` (concurrently, as score_all does), starting
+    `qps` requests per second for `duration` seconds, and report latencies and throughput.
+    """
+    import asyncio
+
+    kinds = list(kinds)
+    loop = asyncio.get_running_loop()
+    latencies = {kind: [] for kind in kinds}
+    request_latencies = []
+    errors = {kind: {} for kind in kinds}
+
+    async def _score(kind, text, scheduled):
+        try:
+            await engine.ascore(kind, text)
+        except Exception as exc:
+            name = type(exc).__name__
+            errors[kind][name] = errors[kind].get(name, 0) + 1
+            return False
+        latencies[kind].append(loop.time() - scheduled)
+        return True
+
+    async def _request(text, scheduled):
+        succeeded = await asyncio.gather(*(_score(kind, text, scheduled) for kind in kinds))
+        if all(succeeded):
+            request_latencies.append(loop.time() - scheduled)
+
+    total = max(1, int(qps * duration))
+    tasks = []
+    started = loop.time()
+    for index in range(total):
+        scheduled = started + index / qps
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(_request(texts[index % len(texts)], scheduled)))
+    sent = loop.time() - started
+    await asyncio.gather(*tasks)
+    elapsed = loop.time() - started
+
+    return {
+        "target_qps": qps,
+        "requests": total,
+        # Below the target when this process could not start requests fast enough
+        "offered_qps": round((total - 1) / sent, 3) if sent > 0 else None,
+        "completed": len(request_latencies),
+        "failed": total - len(request_latencies),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(request_latencies) / elapsed, 3),
+        "scorer_calls_per_s": round(sum(len(values) for values in latencies.values()) / elapsed, 3),
+        "latency_ms": latency_summary(request_latencies),
+        "scorers": {
+            kind: {"completed": len(latencies[kind]), "errors": errors[kind], "latency_ms": latency_summary(latencies[kind])}
+            for kind in kinds
+        },
+    }
@@ -0,0 +1,157 @@
+from dataclasses import asdict, dataclass, field
+import json, sys, threading, time
+
+
+# Stages timed for every score call, in the order they run.
+STAGES = ("sanitize", "cache_lookup", "preclassify", "prompt_render", "rate_limit", "network", "parse")
+
+
+@dataclass
+class ScoreMetrics:
+    """Timings and token usage of one scorer call, as passed to the engine's metrics hooks."""
+
+    kind: str
+    model: str
+    cache_hit: bool = False
+    semantic_similarity: float = None
+    preclassified: bool = False
+    # Requirements carried by the request when several were packed into it
+    packed: int = 0
+    # Streaming only: from the start of the call to the first complete score field
+    time_to_first_score_ms: float = None
+    timings_ms: dict = field(default_factory=dict)
+    prompt_tokens: int = 0
+    cached_prompt_tokens: int = 0
+    completion_tokens: int = 0
+    retries: int = 0
+    error: str = None
+
+    @property
+    def total_ms(self) -> float:
+        return sum(self.timings_ms.values())
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["total_ms"] = round(self.total_ms, 3)
+        return data
+
+
+class StageTimer:
+    """Context-manager factory that records elapsed milliseconds per stage into a dict."""
+
+    def __init__(self, timings_ms: dict):
+        self.timings_ms = timings_ms
+        self._stage = None
+        self._start = None
+
+    def __call__(self, stage: str):
+        self._stage = stage
+        return self
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = (time.perf_counter() - self._start) * 1000
+        self.timings_ms[self._stage] = round(self.timings_ms.get(self._stage, 0.0) + elapsed, 3)
+        return False
+
+
+def token_usage(llm_result) -> dict:
+    """Prompt, provider-cached prompt and completion token counts from a model response."""
+    usage = getattr(llm_result, "usage_metadata", None) or {}
+    return {
+        "prompt_tokens": usage.get("input_tokens", 0),
+        "cached_prompt_tokens": (usage.get("input_token_details") or {}).get("cache_read", 0),
+        "completion_tokens": usage.get("output_tokens", 0),
+    }
+
+
+class JsonLinesExporter:
+    """Metrics hook writing one JSON line per scorer call."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stderr
+        self._lock = threading.Lock()
+
+    def __call__(self, metrics: ScoreMetrics) -> None:
+        line = json.dumps(metrics.to_dict())
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def close(self) -> None:
+        pass
+
+
+class PrometheusExporter:
+    """
+    Metrics hook aggregating calls per scorer and writing them in the Prometheus text format.
+
+    The file is written by `close` (or `write`), e.g. for the node_exporter textfile collector.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def __call__(self, metrics: ScoreMetrics) -> None:
+        with self._lock:
+            series = self._series.setdefault((metrics.kind, metrics.model), {
+                "calls": 0, "cache_hits": 0, "semantic_cache_hits": 0, "preclassified": 0, "packed_requirements": 0, "errors": 0, "retries": 0,
+                "prompt_tokens": 0, "cached_prompt_tokens": 0, "completion_tokens": 0,
+                "stage_ms": dict.fromkeys(STAGES, 0.0),
+            })
+            series["calls"] += 1
+            series["cache_hits"] += metrics.cache_hit
+            series["semantic_cache_hits"] += metrics.semantic_similarity is not None
+            series["preclassified"] += metrics.preclassified
+            series["packed_requirements"] += metrics.packed
+            series["errors"] += metrics.error is not None
+            series["retries"] += metrics.retries
+            series["prompt_tokens"] += metrics.prompt_tokens
+            series["cached_prompt_tokens"] += metrics.cached_prompt_tokens
+            series["completion_tokens"] += metrics.completion_tokens
+            for stage, elapsed in metrics.timings_ms.items():
+                series["stage_ms"][stage] = series["stage_ms"].get(stage, 0.0) + elapsed
+
+    def render(self) -> str:
+        counters = [
+            ("calls", "Scorer calls."),
+            ("cache_hits", "Scorer calls answered from the result cache."),
+            ("semantic_cache_hits", "Scorer calls answered from a near-duplicate input in the semantic cache."),
+            ("preclassified", "Scorer calls answered by the local pre-classifier."),
+            ("packed_requirements", "Requirements scored in packed multi-requirement requests."),
+            ("errors", "Scorer calls that raised."),
+            ("retries", "LLM request retries."),
+            ("prompt_tokens", "Prompt tokens sent."),
+            ("cached_prompt_tokens", "Prompt tokens served from the provider's prompt cache."),
+            ("completion_tokens", "Completion tokens received."),
+        ]
+        lines = []
+        with self._lock:
+            for name, help_text in counters:
+                metric = f"threat_detection_score_{name}_total"
+                lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+                for (kind, model), series in sorted(self._series.items()):
+                    lines.append(f'{metric}{{scorer="{kind}",model="{model}"}} {series[name]}')
+
+            metric = "threat_detection_score_stage_seconds_total"
+            lines += [f"# HELP {metric} Time spent per scorer call stage.", f"# TYPE {metric} counter"]
+            for (kind, model), series in sorted(self._series.items()):
+                for stage, elapsed in series["stage_ms"].items():
+                    lines.append(f'{metric}{{scorer="{kind}",model="{model}",stage="{stage}"}} {elapsed / 1000:.6f}')
+        return "\n".join(lines) + "\n"
+
+    def write(self) -> None:
+        text = self.render()
+        if self.path is None:
+            sys.stderr.write(text)
+            return
+        with open(self.path, "w", encoding="utf-8") as handle:
+            handle.write(text)
+
+    def close(self) -> None:
+        self.write()
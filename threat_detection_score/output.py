@@ -0,0 +1,87 @@
+from threat_detection_score.results import to_plain
+import json, sys, textwrap
+
+# json: one JSON document (a JSON array of records in --input-file mode)
+# ndjson: one JSON object per line
+# pretty: wrapped, indented text for reading in a terminal
+# msgpack: one MessagePack map per result, concatenated (requires msgpack)
+OUTPUT_FORMATS = ("json", "pretty", "ndjson", "msgpack")
+
+
+def check_output_format(output_format: str) -> None:
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format '{output_format}'. Expected one of: {', '.join(OUTPUT_FORMATS)}.")
+    if output_format == "msgpack":
+        try:
+            import msgpack  # noqa: F401
+        except ImportError:
+            raise ValueError("The msgpack output format requires msgpack: pip install threat_detection_score[msgpack]")
+
+
+def render_pretty(value, width: int = 80, indent: int = 0) -> str:
+    """Human-readable rendering: one `key: value` line per field, long text wrapped at `width`."""
+    lines = []
+    prefix = " " * indent
+    for key, item in value.items():
+        if isinstance(item, dict):
+            lines.append(f"{prefix}{key}:")
+            lines.append(render_pretty(item, width, indent + 2))
+        elif isinstance(item, list) and item and all(isinstance(entry, dict) for entry in item):
+            # e.g. a consensus distribution: one line per entry
+            lines.append(f"{prefix}{key}:")
+            lines.extend(f"{prefix}  - " + ", ".join(f"{name}: {value}" for name, value in entry.items()) for entry in item)
+        elif isinstance(item, str) and len(prefix) + len(key) + 2 + len(item) > width:
+            lines.append(f"{prefix}{key}:")
+            lines.append(textwrap.fill(item, width=width, initial_indent=prefix + "  ", subsequent_indent=prefix + "  "))
+        else:
+            lines.append(f"{prefix}{key}: {'-' if item is None else item}")
+    return "\n".join(lines)
+
+
+def format_result(result, output_format: str):
+    """Serialize one result (or dict of results) as text, or bytes for msgpack."""
+    plain = to_plain(result)
+    if output_format == "msgpack":
+        import msgpack
+
+        return msgpack.packb(plain)
+    if output_format == "pretty":
+        return render_pretty(plain) + "\n"
+    return json.dumps(plain) + "\n"
+
+
+class ResultWriter:
+    """
+    Write results to a stream in one of OUTPUT_FORMATS.
+
+    With `many`, every `write` is one record of a stream: json output becomes a JSON array
+    that is completed by `close`, and pretty records are separated by blank lines.
+    """
+
+    def __init__(self, output_format: str = "json", stream=None, many: bool = False):
+        check_output_format(output_format)
+        self.output_format = output_format
+        self.stream = stream or sys.stdout
+        self.many = many
+        self._count = 0
+
+    def _write(self, data) -> None:
+        if isinstance(data, bytes):
+            self.stream.flush()
+            getattr(self.stream, "buffer", self.stream).write(data)
+        else:
+            self.stream.write(data)
+        self.stream.flush()
+
+    def write(self, result) -> None:
+        data = format_result(result, self.output_format)
+        if self.many and self.output_format == "json":
+            data = ("[\n" if self._count == 0 else ",\n") + data.rstrip("\n")
+        elif self.many and self.output_format == "pretty" and self._count:
+            data = "\n" + data
+        self._count += 1
+        self._write(data)
+
+    def close(self) -> None:
+        if self.many and self.output_format == "json":
+            self._write("\n]\n" if self._count else "[]\n")
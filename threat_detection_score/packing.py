@@ -0,0 +1,166 @@
+from threat_detection_score.ratelimit import COMPLETION_TOKENS_ESTIMATE, estimate_tokens
+import functools, inspect, json, re
+
+# Packed mode sends several requirements in one request: the scorer's system prompt and tool
+# schema are paid for once per pack instead of once per requirement. LangChain is imported
+# inside the functions that need it.
+
+# Requirements per request and the token budget of a pack's variable part (the requirements
+# themselves plus the completion tokens expected for their entries).
+DEFAULT_PACK_SIZE = 20
+DEFAULT_PACK_TOKEN_BUDGET = 8192
+
+PACKED_TOOL_SUFFIX = "_batch"
+
+PACK_INSTRUCTIONS = inspect.cleandoc("""
+    ---
+
+    **Several detection requirements:**
+
+    - The message contains several detection requirements, each starting on its own line with its id in square brackets, e.g. [1].
+    - Evaluate every requirement on its own, exactly as if it were the only one; do not let one requirement influence another.
+    - Call the tool once, with one entry in `results` per requirement, carrying the requirement's id.
+    """)
+
+# Sanitized inputs cannot contain brackets, so an id marker at the start of a line is unambiguous
+_ITEM = re.compile(r"^\[(\d+)\] ", re.MULTILINE)
+
+
+def format_packed(texts) -> str:
+    """The human message of a pack: every requirement on its own line, prefixed with [id] from 1."""
+    return "\n\n".join(f"[{item_id}] {text}" for item_id, text in enumerate(texts, start=1))
+
+
+def split_packed(message: str) -> list:
+    """(id, text) of every requirement in a packed human message."""
+    parts = _ITEM.split(message)
+    return [(int(parts[index]), parts[index + 1].strip()) for index in range(1, len(parts) - 1, 2)]
+
+
+@functools.lru_cache(maxsize=None)
+def packed_tool(kind: str) -> dict:
+    """
+    `kind`'s tool schema wrapped in a list: {"results": [{"id", <the tool's fields>}, ...]}.
+
+    Returned in the OpenAI tool format, which bind_tools accepts as is.
+    """
+    from langchain_core.utils.function_calling import convert_to_openai_tool
+    from threat_detection_score.engine import scorer_tool
+
+    function = convert_to_openai_tool(scorer_tool(kind))["function"]
+    parameters = function["parameters"]
+    entry = {
+        "type": "object",
+        "properties": {"id": {"type": "integer", "description": "The id of the requirement"}, **parameters.get("properties", {})},
+        "required": ["id", *parameters.get("required", [])],
+    }
+    return {
+        "type": "function",
+        "function": {
+            "name": function["name"] + PACKED_TOOL_SUFFIX,
+            "description": f"{function.get('description', '')}, for each of several detection requirements",
+            "parameters": {
+                "type": "object",
+                "properties": {"results": {"type": "array", "items": entry}},
+                "required": ["results"],
+            },
+        },
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def packed_prompt(kind: str):
+    """The compiled prompt of a `kind` pack, built once per process."""
+    from threat_detection_score.engine import compile_prompt, load_scorer
+
+    return compile_prompt(load_scorer(kind).SYSTEM_PROMPT + "\n\n" + PACK_INSTRUCTIONS)
+
+
+@functools.lru_cache(maxsize=None)
+def packed_prefix(kind: str) -> str:
+    """The fixed part of every `kind` pack request: its system prompt and packed tool schema."""
+    return packed_prompt(kind).messages[0].content + json.dumps(packed_tool(kind))
+
+
+def item_tokens(text: str) -> int:
+    """Estimated tokens a requirement adds to a pack, its entry in the completion included."""
+    return estimate_tokens(text, completion_tokens=COMPLETION_TOKENS_ESTIMATE)
+
+
+def split_packs(items, pack_size: int = DEFAULT_PACK_SIZE, token_budget: int = DEFAULT_PACK_TOKEN_BUDGET):
+    """
+    Group `items` ((index, text, ...) tuples) into packs of at most `pack_size` whose
+    estimated tokens stay within `token_budget`. A requirement over the budget on its own
+    gets a pack of one.
+    """
+    pack, tokens = [], 0
+    for item in items:
+        cost = item_tokens(item[1])
+        if pack and (len(pack) >= pack_size or tokens + cost > token_budget):
+            yield pack
+            pack, tokens = [], 0
+        pack.append(item)
+        tokens += cost
+    if pack:
+        yield pack
+
+
+class Packer:
+    """
+    Collects concurrent `score` calls for one scorer into packs scored with `ascore_many`.
+
+    A pack is sent as soon as `pack_size` requirements are waiting, or `linger` seconds after
+    the first one arrived, so a trickle of requests is never held back for long.
+    """
+
+    def __init__(self, engine, kind: str, pack_size: int = DEFAULT_PACK_SIZE, token_budget: int = DEFAULT_PACK_TOKEN_BUDGET, refresh: bool = False, linger: float = 0.05):
+        self.engine = engine
+        self.kind = kind
+        self.pack_size = pack_size
+        self.token_budget = token_budget
+        self.refresh = refresh
+        self.linger = linger
+        self._waiting = []
+        self._timer = None
+        self._tasks = set()
+
+    async def score(self, human_message_input: str):
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._waiting.append((human_message_input, future))
+        if len(self._waiting) >= self.pack_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.linger, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        import asyncio
+
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        waiting, self._waiting = self._waiting, []
+        if waiting:
+            task = asyncio.ensure_future(self._run(waiting))
+            # Keep a reference until done, or the task may be garbage collected mid-flight
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, waiting) -> None:
+        try:
+            results = await self.engine.ascore_many(
+                self.kind, [text for text, _ in waiting], refresh=self.refresh,
+                pack_size=self.pack_size, token_budget=self.token_budget, return_exceptions=True,
+            )
+        except Exception as exc:
+            results = [exc] * len(waiting)
+        for (_, future), result in zip(waiting, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
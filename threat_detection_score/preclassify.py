@@ -0,0 +1,248 @@
+from threat_detection_score.store import score_fields
+import json, re
+
+# A linear model predicts the one field that carries each of these scorers' answer.
+LABEL_FIELDS = {
+    "threat_severity": "score",
+    "detection_coverage": "score",
+    "org_alignment": "score",
+    "exploit_eval": "answer",
+}
+
+_EXPLOIT_TERMS = (
+    r"\b(?:cve|exploit\w*|0-?day|zero[\s-]day|poc|proof[\s-]of[\s-]concept|rce|remote[\s-]code[\s-]execution"
+    r"|vulnerabilit\w*|vulnerable|metasploit|cobalt[\s-]strike|kev|privilege[\s-]escalation)\b"
+)
+
+# Built-in rules for the most common trivially classifiable requirements. Each rule answers
+# with complete tool-call arguments when its pattern is present (or, with "absent", missing).
+DEFAULT_RULES = [
+    {
+        "name": "no-exploit-terms",
+        "kind": "exploit_eval",
+        "absent": _EXPLOIT_TERMS,
+        "args": {"answer": "no", "reason": "The requirement names no CVE, exploit or vulnerability."},
+        "confidence": 0.95,
+    },
+    {
+        "name": "no-exploit-terms",
+        "kind": "exploit_assessment",
+        "absent": _EXPLOIT_TERMS,
+        "args": {"answer": "no", "reason": "The requirement names no CVE, exploit or vulnerability."},
+        "confidence": 0.95,
+    },
+    {
+        "name": "cve-id",
+        "kind": "exploit_eval",
+        "present": r"\bcve-\d{4}-\d{4,}\b",
+        "args": {"answer": "yes", "reason": "The requirement names a specific CVE."},
+        "confidence": 0.95,
+    },
+    {
+        "name": "av-signature",
+        "kind": "detection_coverage",
+        "present": r"^(?!.*\b(?:new|novel|update\w*|variant|zero[\s-]day|bypass\w*)\b).*\b(?:anti-?virus|av)\s+signatures?\b",
+        "args": {"score": 0, "reason": "Signature-based antivirus detection is an existing, in-depth control."},
+        "confidence": 0.9,
+    },
+]
+
+
+class Rule:
+    """A keyword/regex rule, compiled once, answering one scorer with fixed tool-call arguments."""
+
+    __slots__ = ("name", "kind", "pattern", "absent", "args", "confidence")
+
+    def __init__(self, name: str, kind: str, args: dict, confidence: float, present: str = None, absent: str = None):
+        if (present is None) == (absent is None):
+            raise ValueError(f"Rule '{name}' needs exactly one of 'present' or 'absent'.")
+        self.name = name
+        self.kind = kind
+        self.pattern = re.compile(present or absent, re.IGNORECASE | re.DOTALL)
+        self.absent = absent is not None
+        self.args = args
+        self.confidence = float(confidence)
+
+    def matches(self, text: str) -> bool:
+        return (self.pattern.search(text) is None) if self.absent else (self.pattern.search(text) is not None)
+
+
+class LinearModel:
+    """
+    Multinomial logistic regression over hashed word and character n-grams of the input.
+
+    Small enough to train with NumPy in seconds on a few thousand labelled requirements, and
+    to predict in microseconds. Saved as a .npz file.
+    """
+
+    def __init__(self, kind: str, classes: list, weights, bias, dimensions: int = 1024):
+        self.kind = kind
+        self.field = LABEL_FIELDS[kind]
+        self.classes = list(classes)
+        self.weights = weights
+        self.bias = bias
+        self.dimensions = dimensions
+
+    @staticmethod
+    def features(texts, dimensions: int):
+        from threat_detection_score.semantic_cache import HashingVectorizer, _require_numpy
+
+        np = _require_numpy()
+        vectorizer = HashingVectorizer(dimensions)
+        matrix = np.stack([vectorizer.transform(text) for text in texts]) if texts else np.zeros((0, dimensions), dtype=np.float32)
+        return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+    @classmethod
+    def train(cls, kind: str, texts: list, labels: list, dimensions: int = 1024, epochs: int = 300, learning_rate: float = 1.0, l2: float = 1e-4) -> "LinearModel":
+        from threat_detection_score.semantic_cache import _require_numpy
+
+        np = _require_numpy()
+        if kind not in LABEL_FIELDS:
+            raise ValueError(f"No linear model for '{kind}'. Expected one of: {', '.join(LABEL_FIELDS)}.")
+
+        classes = sorted(set(labels), key=str)
+        features = cls.features(texts, dimensions)
+        targets = np.zeros((len(labels), len(classes)), dtype=np.float32)
+        targets[np.arange(len(labels)), [classes.index(label) for label in labels]] = 1.0
+
+        weights = np.zeros((dimensions, len(classes)), dtype=np.float32)
+        bias = np.zeros(len(classes), dtype=np.float32)
+        for _ in range(epochs):
+            probabilities = cls._softmax(features @ weights + bias)
+            error = (probabilities - targets) / len(labels)
+            weights -= learning_rate * (features.T @ error + l2 * weights)
+            bias -= learning_rate * error.sum(axis=0)
+        return cls(kind, classes, weights, bias, dimensions)
+
+    @staticmethod
+    def _softmax(logits):
+        from threat_detection_score.semantic_cache import _require_numpy
+
+        np = _require_numpy()
+        logits = logits - logits.max(axis=-1, keepdims=True)
+        exponentials = np.exp(logits)
+        return exponentials / exponentials.sum(axis=-1, keepdims=True)
+
+    def predict(self, text: str):
+        """(label, probability) of the most likely class for `text`."""
+        probabilities = self._softmax(self.features([text], self.dimensions)[0] @ self.weights + self.bias)
+        index = int(probabilities.argmax())
+        return self.classes[index], float(probabilities[index])
+
+    def save(self, path: str) -> None:
+        from threat_detection_score.semantic_cache import _require_numpy
+
+        np = _require_numpy()
+        with open(path, "wb") as handle:
+            np.savez(handle, kind=self.kind, classes=json.dumps(self.classes), weights=self.weights, bias=self.bias, dimensions=self.dimensions)
+
+    @classmethod
+    def load(cls, path: str) -> "LinearModel":
+        from threat_detection_score.semantic_cache import _require_numpy
+
+        np = _require_numpy()
+        with np.load(path) as data:
+            return cls(str(data["kind"]), json.loads(str(data["classes"])), data["weights"], data["bias"], int(data["dimensions"]))
+
+
+class Preclassifier:
+    """
+    Local first stage in front of the LLM: answers a scorer directly when a rule or linear model
+    is at least `threshold` confident, and otherwise leaves the request to the LLM.
+
+    `classify` returns (tool-call args, details) or None. Details name the rule or model and its
+    confidence, and are attached to the result as `preclassified`.
+    """
+
+    def __init__(self, rules=None, models=(), threshold: float = 0.9):
+        self.threshold = threshold
+        self.rules = {}
+        for rule in DEFAULT_RULES if rules is None else rules:
+            rule = rule if isinstance(rule, Rule) else Rule(**rule)
+            self.rules.setdefault(rule.kind, []).append(rule)
+        self.models = {model.kind: model for model in models}
+
+    @classmethod
+    def from_files(cls, paths=(), threshold: float = 0.9) -> "Preclassifier":
+        """The built-in rules plus rules from .json files and linear models from .npz files."""
+        rules, models = list(DEFAULT_RULES), []
+        for path in paths:
+            if path.endswith(".npz"):
+                models.append(LinearModel.load(path))
+            else:
+                with open(path, encoding="utf-8") as handle:
+                    rules.extend(json.load(handle))
+        return cls(rules, models, threshold)
+
+    def classify(self, kind: str, text: str, threshold: float = None):
+        threshold = self.threshold if threshold is None else threshold
+        for rule in self.rules.get(kind, ()):
+            if rule.confidence >= threshold and rule.matches(text):
+                return dict(rule.args), {"source": "rule", "name": rule.name, "confidence": rule.confidence}
+
+        model = self.models.get(kind)
+        if model is not None:
+            label, probability = model.predict(text)
+            if probability >= threshold:
+                args = {model.field: label, "reason": f"Pre-classified by a linear model with confidence {probability:.2f}."}
+                return args, {"source": "model", "name": kind, "confidence": round(probability, 4)}
+        return None
+
+
+def read_labelled(stream, texts: dict = None):
+    """
+    Yield (text, {kind: result}) from NDJSON result lines of any scorer or score_all.
+
+    The text is the record's own `text` (as in `rescore --export` output) or, failing that,
+    `texts[id]`; records with neither, and error records, are skipped.
+    """
+    from threat_detection_score.aggregate import _sections
+
+    for line in stream:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        text = record.get("text")
+        if text is None and texts is not None:
+            text = texts.get(record.get("id"))
+        if isinstance(text, str) and "error" not in record:
+            yield text, {kind: result for kind, result in _sections(record).items() if isinstance(result, dict)}
+
+
+def evaluate(preclassifier: Preclassifier, labelled, kinds, threshold: float = None) -> dict:
+    """
+    Agreement of the pre-classifier with labelled (usually LLM-produced) results, per scorer.
+
+    `coverage` is the share of labelled records the pre-classifier answered and `agreement` the
+    share of those where its answer matches the label's score fields; `by_source` breaks both down per
+    rule or model.
+    """
+    report = {kind: {"labelled": 0, "preclassified": 0, "agreed": 0, "by_source": {}} for kind in kinds}
+    for text, results in labelled:
+        for kind in kinds:
+            label = results.get(kind)
+            if label is None and kind == "exploit_assessment":
+                # Its answer is the exploit_eval answer
+                label = results.get("exploit_eval")
+            if label is None:
+                continue
+            stats = report[kind]
+            stats["labelled"] += 1
+
+            answer = preclassifier.classify(kind, text, threshold)
+            if answer is None:
+                continue
+            args, details = answer
+            agreed = all(label.get(name) == value for name, value in score_fields(args).items())
+            stats["preclassified"] += 1
+            stats["agreed"] += agreed
+            source = stats["by_source"].setdefault(f"{details['source']}:{details['name']}", {"preclassified": 0, "agreed": 0})
+            source["preclassified"] += 1
+            source["agreed"] += agreed
+
+    for stats in report.values():
+        stats["coverage"] = round(stats["preclassified"] / stats["labelled"], 4) if stats["labelled"] else 0.0
+        stats["agreement"] = round(stats["agreed"] / stats["preclassified"], 4) if stats["preclassified"] else None
+        for source in stats["by_source"].values():
+            source["agreement"] = round(source["agreed"] / source["preclassified"], 4)
+    return report
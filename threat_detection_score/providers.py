@@ -0,0 +1,80 @@
+import os
+
+# Chat model backends, selected with --provider. Each factory takes the model name, temperature,
+# base URL and whether to expose response headers, and returns a LangChain chat model that
+# supports bind_tools with a forced tool_choice. Imports happen inside the factories.
+
+
+def _openai(model_name: str, temperature: float, base_url: str = None, include_response_headers: bool = False):
+    from langchain_openai import ChatOpenAI
+
+    # Retries are done by the engine, hence max_retries=0
+    return ChatOpenAI(
+        model=model_name,
+        temperature=temperature,
+        max_retries=0,
+        base_url=base_url,
+        include_response_headers=include_response_headers,
+        # Token usage in streamed responses too, for metrics and the rate limiter
+        stream_usage=True,
+    )
+
+
+def _openai_compatible(model_name: str, temperature: float, base_url: str = None, include_response_headers: bool = False):
+    """A local or self-hosted server speaking the OpenAI chat completions API (vLLM, llama.cpp, Ollama, ...)."""
+    from langchain_openai import ChatOpenAI
+
+    base_url = base_url or os.environ.get("OPENAI_BASE_URL")
+    if not base_url:
+        raise ValueError("The openai-compatible provider requires --base-url (or OPENAI_BASE_URL).")
+
+    return ChatOpenAI(
+        model=model_name,
+        temperature=temperature,
+        max_retries=0,
+        base_url=base_url,
+        # Local servers usually ignore the key, but the client insists on one
+        api_key=os.environ.get("OPENAI_API_KEY") or "not-needed",
+        include_response_headers=include_response_headers,
+        stream_usage=True,
+    )
+
+
+def _stub(model_name: str, temperature: float, base_url: str = None, include_response_headers: bool = False):
+    from threat_detection_score.stub import StubChatModel
+
+    return StubChatModel(model_name=model_name)
+
+
+PROVIDERS = {
+    "openai": _openai,
+    "openai-compatible": _openai_compatible,
+    "stub": _stub,
+}
+
+
+def model_id(provider: str, model_name: str, base_url: str = None) -> str:
+    """
+    The model name qualified by its provider and endpoint, as used in cache keys and fingerprints.
+
+    The same model name behind another base URL (a proxy, a local server, a fake endpoint in a
+    test) may answer differently, so its results must not be shared with the default endpoint's.
+    """
+    if base_url is None and provider in ("openai", "openai-compatible"):
+        # The client falls back to this too
+        base_url = os.environ.get("OPENAI_BASE_URL")
+    # Plain for openai's default endpoint, so results cached before providers existed stay valid
+    name = model_name if provider == "openai" else f"{provider}/{model_name}"
+    return f"{name}@{base_url.rstrip('/')}" if base_url else name
+
+
+def register_provider(name: str, factory) -> None:
+    """Make another chat model backend available as --provider `name`."""
+    PROVIDERS[name] = factory
+
+
+def create_chat_model(provider: str, model_name: str, temperature: float, base_url: str = None, include_response_headers: bool = False):
+    """Build the chat model for `provider`."""
+    if provider not in PROVIDERS:
+        raise ValueError(f"Unknown provider '{provider}'. Expected one of: {', '.join(PROVIDERS)}.")
+    return PROVIDERS[provider](model_name, temperature, base_url=base_url, include_response_headers=include_response_headers)
@@ -0,0 +1,239 @@
+import re, threading, time
+
+
+# Rough characters-per-token ratio of English text for the OpenAI tokenizers.
+CHARS_PER_TOKEN = 4
+
+# Completion tokens reserved per request before the actual usage is known.
+COMPLETION_TOKENS_ESTIMATE = 256
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_SECONDS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def estimate_tokens(*texts: str, completion_tokens: int = COMPLETION_TOKENS_ESTIMATE) -> int:
+    """Token cost of a request whose prompt is made of `texts`, without running a tokenizer."""
+    return sum(len(text) for text in texts) // CHARS_PER_TOKEN + 1 + completion_tokens
+
+
+def parse_duration(value: str):
+    """Seconds in an x-ratelimit-reset-* header value such as "1s", "6m0s" or "250ms"."""
+    parts = _DURATION_PART.findall(value or "")
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_SECONDS[unit] for amount, unit in parts)
+
+
+class _Bucket:
+    """
+    Token bucket that may go into debt.
+
+    A reservation is taken from the bucket immediately and the caller waits until the bucket
+    has refilled out of debt, so callers are served in the order they reserved.
+    """
+
+    def __init__(self, per_minute: float, burst_seconds: float):
+        self.burst_seconds = burst_seconds
+        self.per_minute = None
+        self.level = 0.0
+        self.updated = time.monotonic()
+        self.set_limit(per_minute)
+
+    @property
+    def capacity(self) -> float:
+        return self.per_minute / 60 * self.burst_seconds
+
+    def set_limit(self, per_minute) -> None:
+        first = self.per_minute is None
+        self.per_minute = float(per_minute) if per_minute else None
+        if self.per_minute is not None:
+            self.level = self.capacity if first else min(self.level, self.capacity)
+
+    def refill(self, now: float) -> None:
+        if self.per_minute is not None:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.per_minute / 60)
+        self.updated = now
+
+    def reserve(self, cost: float, now: float) -> float:
+        """Take `cost` from the bucket and return the seconds until it is out of debt."""
+        self.refill(now)
+        if self.per_minute is None:
+            return 0.0
+        self.level -= min(cost, self.capacity)
+        return max(0.0, -self.level * 60 / self.per_minute)
+
+
+class RateLimiter:
+    """
+    Process-wide requests-per-minute and tokens-per-minute scheduler for LLM calls.
+
+    Every call reserves one request and its estimated token cost before it is sent and waits
+    for its turn, first come first served; `settle` later corrects the estimate with the actual
+    token usage. Limits left as None start unlimited. Both limits adapt to the provider's
+    x-ratelimit-* response headers (never above the configured ones), and a 429 pauses every
+    caller until the provider's reset time, so retries queue up behind the calls that were
+    already waiting instead of hammering the quota on their own schedules.
+    """
+
+    def __init__(self, requests_per_minute: float = None, tokens_per_minute: float = None, burst_seconds: float = 10.0):
+        self.max_requests_per_minute = requests_per_minute
+        self.max_tokens_per_minute = tokens_per_minute
+        self._requests = _Bucket(requests_per_minute, burst_seconds)
+        self._tokens = _Bucket(tokens_per_minute, burst_seconds)
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, estimated_tokens: int) -> float:
+        """Reserve capacity for one request and return how many seconds to wait before sending it."""
+        with self._lock:
+            now = time.monotonic()
+            delay = max(self._requests.reserve(1, now), self._tokens.reserve(estimated_tokens, now))
+            return max(delay, self._paused_until - now)
+
+    def acquire(self, estimated_tokens: int) -> float:
+        """Blocking `reserve`; returns the seconds waited."""
+        delay = self.reserve(estimated_tokens)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    async def aacquire(self, estimated_tokens: int) -> float:
+        """Async `acquire`."""
+        import asyncio
+
+        delay = self.reserve(estimated_tokens)
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                # The request will never be sent: hand its place back
+                self.release(estimated_tokens)
+                raise
+        return delay
+
+    def release(self, estimated_tokens: int) -> None:
+        """Undo the reservation of a request that was cancelled before it was sent."""
+        with self._lock:
+            now = time.monotonic()
+            for bucket, cost in ((self._requests, 1), (self._tokens, estimated_tokens)):
+                bucket.refill(now)
+                if bucket.per_minute is not None:
+                    bucket.level = min(bucket.capacity, bucket.level + min(cost, bucket.capacity))
+
+    def settle(self, estimated_tokens: int, used_tokens: int) -> None:
+        """Return (or charge) the difference between a request's estimated and actual tokens."""
+        if not used_tokens:
+            return
+        with self._lock:
+            self._tokens.refill(time.monotonic())
+            if self._tokens.per_minute is not None:
+                self._tokens.level = min(self._tokens.capacity, self._tokens.level + estimated_tokens - used_tokens)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every caller for `seconds`, e.g. after a 429."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def observe_headers(self, headers) -> None:
+        """Adapt the limits and the remaining budget to x-ratelimit-* response headers."""
+        if not headers:
+            return
+        headers = {str(name).lower(): value for name, value in dict(headers).items()}
+        with self._lock:
+            now = time.monotonic()
+            for bucket, name, maximum in (
+                (self._requests, "requests", self.max_requests_per_minute),
+                (self._tokens, "tokens", self.max_tokens_per_minute),
+            ):
+                try:
+                    limit = float(headers[f"x-ratelimit-limit-{name}"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                bucket.refill(now)
+                bucket.set_limit(min(limit, maximum) if maximum else limit)
+
+                try:
+                    remaining = float(headers[f"x-ratelimit-remaining-{name}"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                bucket.level = min(bucket.level, remaining)
+                if remaining <= 0:
+                    reset = parse_duration(headers.get(f"x-ratelimit-reset-{name}"))
+                    if reset:
+                        self._paused_until = max(self._paused_until, now + reset)
+
+    def snapshot(self) -> dict:
+        """Current limits and available capacity, for logging."""
+        with self._lock:
+            now = time.monotonic()
+            self._requests.refill(now)
+            self._tokens.refill(now)
+            return {
+                "requests_per_minute": self._requests.per_minute,
+                "tokens_per_minute": self._tokens.per_minute,
+                "available_requests": round(self._requests.level, 2),
+                "available_tokens": round(self._tokens.level, 2),
+                "paused_for": round(max(0.0, self._paused_until - now), 3),
+            }
+
+
+class _SharedBucket(_Bucket):
+    """A _Bucket whose state lives in `state[offset:offset + 3]`, memory shared between processes."""
+
+    def __init__(self, per_minute: float, burst_seconds: float, state, offset: int):
+        self._state = state
+        self._offset = offset
+        super().__init__(per_minute, burst_seconds)
+
+    @property
+    def per_minute(self):
+        value = self._state[self._offset]
+        return None if value != value else value  # NaN is None
+
+    @per_minute.setter
+    def per_minute(self, value) -> None:
+        self._state[self._offset] = float("nan") if value is None else value
+
+    @property
+    def level(self) -> float:
+        return self._state[self._offset + 1]
+
+    @level.setter
+    def level(self, value: float) -> None:
+        self._state[self._offset + 1] = value
+
+    @property
+    def updated(self) -> float:
+        return self._state[self._offset + 2]
+
+    @updated.setter
+    def updated(self, value: float) -> None:
+        self._state[self._offset + 2] = value
+
+
+class SharedRateLimiter(RateLimiter):
+    """
+    A RateLimiter whose budget is shared by every process it is passed to at process start.
+
+    Bucket levels and the pause deadline live in shared memory behind a process lock, so the
+    requests and tokens per minute hold across a whole process pool rather than per process.
+    time.monotonic is system-wide, so all processes refill the buckets on the same clock.
+    """
+
+    def __init__(self, requests_per_minute: float = None, tokens_per_minute: float = None, burst_seconds: float = 10.0, context=None):
+        import multiprocessing
+
+        context = context or multiprocessing.get_context()
+        self._state = context.RawArray("d", 7)
+        super().__init__(requests_per_minute, tokens_per_minute, burst_seconds)
+        self._requests = _SharedBucket(requests_per_minute, burst_seconds, self._state, 0)
+        self._tokens = _SharedBucket(tokens_per_minute, burst_seconds, self._state, 3)
+        self._lock = context.Lock()
+
+    @property
+    def _paused_until(self) -> float:
+        return self._state[6]
+
+    @_paused_until.setter
+    def _paused_until(self, value: float) -> None:
+        self._state[6] = value
@@ -0,0 +1,228 @@
+"""
+Record and replay of chat model exchanges, for deterministic load tests without the network.
+
+``--record ARCHIVE`` wraps the provider's chat model and stores every request (the rendered
+prompt messages and the forced tool) with its response (tool calls and token usage) and how long
+it took. ``--replay ARCHIVE`` answers the same requests from the archive instead of a provider,
+after the recorded latency or a synthetic one, and fails an `error_rate` share of the calls with
+a retryable server error. The engine's retries, rate limiting, caching and concurrency run
+unchanged in both modes.
+"""
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import PrivateAttr
+from threat_detection_score.stub import message_chunks
+from typing import Optional
+import asyncio, hashlib, json, os, random, sqlite3, threading, time, zlib
+
+
+def request_key(messages, tool_choice: str) -> str:
+    """Hash of a request: the forced tool and every message's type and content."""
+    material = json.dumps([tool_choice, [[message.type, message.content] for message in messages]], ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ReplayMiss(LookupError):
+    """A replayed request that was never recorded."""
+
+
+class InjectedError(Exception):
+    """A synthetic server error; retryable like the real one, since it carries its status code."""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"Injected error (HTTP {status_code})")
+        self.status_code = status_code
+
+
+class ExchangeArchive:
+    """
+    SQLite archive of chat model exchanges, indexed by `request_key`.
+
+    Message texts are stored once each and compressed, so a system prompt shared by thousands
+    of recorded requests takes its size once; a response is a compressed JSON document.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS texts (hash TEXT PRIMARY KEY, body BLOB NOT NULL)")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS exchanges (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                tool TEXT NOT NULL,
+                messages TEXT NOT NULL,
+                response BLOB NOT NULL,
+                latency_ms REAL NOT NULL,
+                recorded REAL NOT NULL
+            )
+            """
+        )
+
+    def put(self, key: str, model: str, messages, tool: str, message: AIMessage, latency_ms: float) -> None:
+        """Store the exchange of `key`, replacing an earlier recording of the same request."""
+        texts, references = {}, []
+        for prompt_message in messages:
+            body = json.dumps(prompt_message.content, ensure_ascii=False).encode("utf-8")
+            digest = hashlib.sha256(body).hexdigest()
+            texts[digest] = zlib.compress(body)
+            references.append([prompt_message.type, digest])
+        response = {"content": message.content, "tool_calls": message.tool_calls, "usage": message.usage_metadata}
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany("INSERT OR IGNORE INTO texts (hash, body) VALUES (?, ?)", texts.items())
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO exchanges (key, model, tool, messages, response, latency_ms, recorded) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, model, tool, json.dumps(references), zlib.compress(json.dumps(response).encode("utf-8")), latency_ms, time.time()),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def get(self, key: str):
+        """(AIMessage, recorded latency in ms) of `key`, or None if it was never recorded."""
+        with self._lock:
+            row = self._conn.execute("SELECT response, latency_ms FROM exchanges WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        response = json.loads(zlib.decompress(row[0]))
+        message = AIMessage(content=response["content"], tool_calls=response["tool_calls"], usage_metadata=response["usage"])
+        return message, row[1]
+
+    def prompt(self, key: str) -> list:
+        """The recorded prompt of `key` as [(message type, content)], e.g. to inspect a recording."""
+        with self._lock:
+            row = self._conn.execute("SELECT messages FROM exchanges WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                raise KeyError(key)
+            references = json.loads(row[0])
+            bodies = dict(self._conn.execute(
+                f"SELECT hash, body FROM texts WHERE hash IN ({', '.join('?' * len(references))})", [digest for _, digest in references]
+            ).fetchall())
+        return [(message_type, json.loads(zlib.decompress(bodies[digest]))) for message_type, digest in references]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM exchanges").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class RecordingChatModel(BaseChatModel):
+    """Passes every request on to `inner` and stores the exchange in `archive`."""
+
+    inner: BaseChatModel
+    archive: ExchangeArchive
+    model_name: str = "recording"
+
+    @property
+    def _llm_type(self) -> str:
+        return "threat-detection-score-recorder"
+
+    def bind_tools(self, tools, tool_choice=None, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], tool_choice=tool_choice, **kwargs)
+
+    def _record(self, messages, tool_choice: str, message, started: float) -> None:
+        latency_ms = (time.perf_counter() - started) * 1000
+        self.archive.put(request_key(messages, tool_choice), self.model_name, messages, tool_choice, message, round(latency_ms, 3))
+
+    def _generate(self, messages, stop=None, run_manager=None, tools=(), tool_choice=None, **kwargs):
+        started = time.perf_counter()
+        message = self.inner.bind_tools(tools, tool_choice=tool_choice).invoke(messages)
+        self._record(messages, tool_choice, message, started)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, tools=(), tool_choice=None, **kwargs):
+        started = time.perf_counter()
+        message = await self.inner.bind_tools(tools, tool_choice=tool_choice).ainvoke(messages)
+        self._record(messages, tool_choice, message, started)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(self, messages, stop=None, run_manager=None, tools=(), tool_choice=None, **kwargs):
+        started = time.perf_counter()
+        message = None
+        async for chunk in self.inner.bind_tools(tools, tool_choice=tool_choice).astream(messages):
+            message = chunk if message is None else message + chunk
+            yield ChatGenerationChunk(message=chunk)
+        if message is not None:
+            self._record(messages, tool_choice, message, started)
+
+
+class ReplayChatModel(BaseChatModel):
+    """
+    Answers requests from `archive` without any network access.
+
+    Each call waits `latency` seconds, or the recorded latency when it is None, varied by up to
+    `jitter` (a fraction) either way. An `error_rate` share of calls then raise an
+    `InjectedError` with `error_status` instead of answering; a request missing from the
+    archive raises `ReplayMiss`. `seed` makes the jitter and errors reproducible.
+    """
+
+    archive: ExchangeArchive
+    model_name: str = "replay"
+    latency: Optional[float] = None
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 503
+    chunk_size: int = 16
+    seed: Optional[int] = None
+
+    _random: random.Random = PrivateAttr()
+
+    def model_post_init(self, context) -> None:
+        super().model_post_init(context)
+        self._random = random.Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "threat-detection-score-replay"
+
+    def bind_tools(self, tools, tool_choice=None, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], tool_choice=tool_choice, **kwargs)
+
+    def _lookup(self, messages, tool_choice: str):
+        """(message, seconds to wait, error to raise after waiting or None)."""
+        recorded = self.archive.get(request_key(messages, tool_choice))
+        if recorded is None:
+            raise ReplayMiss(f"No recorded response for this {tool_choice} request in {self.archive.path}.")
+        message, latency_ms = recorded
+        delay = latency_ms / 1000 if self.latency is None else self.latency
+        if self.jitter:
+            delay *= 1 + self.jitter * (2 * self._random.random() - 1)
+        error = InjectedError(self.error_status) if self.error_rate and self._random.random() < self.error_rate else None
+        return message, max(delay, 0.0), error
+
+    def _generate(self, messages, stop=None, run_manager=None, tools=(), tool_choice=None, **kwargs):
+        message, delay, error = self._lookup(messages, tool_choice)
+        time.sleep(delay)
+        if error is not None:
+            raise error
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, tools=(), tool_choice=None, **kwargs):
+        message, delay, error = self._lookup(messages, tool_choice)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(self, messages, stop=None, run_manager=None, tools=(), tool_choice=None, **kwargs):
+        # The whole latency is spent before the first chunk, as with a slow time to first token
+        message, delay, error = self._lookup(messages, tool_choice)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        for chunk in message_chunks(message, self.chunk_size):
+            yield chunk
@@ -0,0 +1,152 @@
+from dataclasses import dataclass, field, fields
+from typing import ClassVar, Literal, Optional, get_args, get_origin, get_type_hints
+import types, typing
+
+
+class ToolCallError(ValueError):
+    """The model's response did not contain a well-formed call of the scorer's tool."""
+
+
+@dataclass(slots=True)
+class ScoreResult:
+    """
+    Base of the typed scorer results.
+
+    `reason` is kept exactly as the model wrote it; line wrapping is left to the `pretty`
+    output format. `cache_hit` is set when the result was reused from a similar earlier input,
+    `preclassified` when the local pre-classifier answered instead of the LLM, and `consensus`
+    when the result is the majority of several samples.
+    """
+
+    TYPE: ClassVar[str] = None
+
+    cache_hit: Optional[dict] = field(default=None, kw_only=True)
+    preclassified: Optional[dict] = field(default=None, kw_only=True)
+    consensus: Optional[dict] = field(default=None, kw_only=True)
+
+    @classmethod
+    def from_args(cls, args: dict) -> "ScoreResult":
+        """Validate a tool call's arguments against the result's fields and build the result."""
+        if not isinstance(args, dict):
+            raise ToolCallError(f"{cls.TYPE}: tool call arguments must be an object, got {type(args).__name__}.")
+
+        values = {}
+        for name, annotation in _field_types(cls):
+            if name not in args:
+                if _is_optional(annotation):
+                    values[name] = None
+                    continue
+                raise ToolCallError(f"{cls.TYPE}: tool call is missing '{name}'.")
+            value = args[name]
+            if not _matches(value, annotation):
+                raise ToolCallError(f"{cls.TYPE}: tool call has an invalid '{name}': {value!r}.")
+            values[name] = value
+        return cls(**values)
+
+    def to_dict(self) -> dict:
+        data = {}
+        for item in fields(self):
+            if item.name not in _METADATA_FIELDS:
+                value = getattr(self, item.name)
+                data[item.name] = value.to_dict() if isinstance(value, ScoreResult) else value
+        data["type"] = self.TYPE
+        if self.cache_hit is not None:
+            data["cache_hit"] = self.cache_hit
+        if self.preclassified is not None:
+            data["preclassified"] = self.preclassified
+        if self.consensus is not None:
+            data["consensus"] = self.consensus
+        return data
+
+
+# Set by the engine rather than the model, so not part of a tool call
+_METADATA_FIELDS = ("cache_hit", "preclassified", "consensus")
+
+_FIELD_TYPES = {}
+
+
+def _field_types(cls) -> list:
+    """(name, annotation) of the fields a tool call must provide, resolved once per class."""
+    resolved = _FIELD_TYPES.get(cls)
+    if resolved is None:
+        hints = get_type_hints(cls)
+        resolved = _FIELD_TYPES[cls] = [(item.name, hints[item.name]) for item in fields(cls) if item.name not in _METADATA_FIELDS]
+    return resolved
+
+
+def _is_optional(annotation) -> bool:
+    return get_origin(annotation) in (typing.Union, types.UnionType) and type(None) in get_args(annotation)
+
+
+def _matches(value, annotation) -> bool:
+    origin = get_origin(annotation)
+    if origin is Literal:
+        # bool is an int subclass, so True must not pass for 1
+        return not isinstance(value, bool) and value in get_args(annotation)
+    if origin in (typing.Union, types.UnionType):
+        return any(_matches(value, option) for option in get_args(annotation))
+    if annotation is type(None):
+        return value is None
+    return isinstance(value, annotation)
+
+
+@dataclass(slots=True)
+class ThreatSeverityResult(ScoreResult):
+    TYPE: ClassVar[str] = "threat severity"
+
+    score: Literal[1, 2, 3]
+    reason: str
+
+
+@dataclass(slots=True)
+class DetectionCoverageResult(ScoreResult):
+    TYPE: ClassVar[str] = "detection coverage"
+
+    score: Literal[0, 1, 2]
+    reason: str
+
+
+@dataclass(slots=True)
+class OrgAlignmentResult(ScoreResult):
+    TYPE: ClassVar[str] = "organizational alignment"
+
+    score: Literal[0, 1, 2, 3]
+    reason: str
+
+
+@dataclass(slots=True)
+class ExploitEvalResult(ScoreResult):
+    TYPE: ClassVar[str] = "exploit_eval"
+
+    answer: Literal["yes", "no"]
+    reason: str
+
+
+@dataclass(slots=True)
+class ActiveExploitResult(ScoreResult):
+    TYPE: ClassVar[str] = "active_exploit"
+
+    active_exploit_relevance_score: Literal[0, 1, 2]
+    active_exploit_prevalence_score: Literal[1, 2, 3]
+    reason: str
+
+
+@dataclass(slots=True)
+class ExploitAssessmentResult(ScoreResult):
+    """exploit_eval and active_exploit answered in one call; `active_exploit` is None for a "no"."""
+
+    TYPE: ClassVar[str] = "exploit_assessment"
+
+    exploit_eval: ExploitEvalResult
+    active_exploit: Optional[ActiveExploitResult]
+
+
+def to_plain(value):
+    """Convert results, and dicts or lists of them, into JSON-serializable values."""
+    if isinstance(value, ScoreResult):
+        return value.to_dict()
+    if isinstance(value, dict):
+        return {key: to_plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_plain(item) for item in value]
+    return value
@@ -0,0 +1,44 @@
+import random
+
+
+# HTTP statuses worth retrying, matching the OpenAI client's own policy.
+RETRYABLE_STATUS_CODES = (408, 409, 429)
+
+
+def is_retryable(exc: Exception) -> bool:
+    """True for connection failures, timeouts, rate limits and server errors."""
+    status_code = getattr(exc, "status_code", None)
+    if status_code is not None:
+        return status_code in RETRYABLE_STATUS_CODES or status_code >= 500
+
+    # openai.APIConnectionError and APITimeoutError carry no status code; langchain_openai
+    # re-raises them as subclasses, hence the check along the MRO
+    return any(cls.__name__ in ("APIConnectionError", "APITimeoutError") for cls in type(exc).__mro__)
+
+
+def retry_after(exc: Exception):
+    """Seconds the server asked us to wait via Retry-After headers, if any."""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms is not None:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    value = headers.get("retry-after")
+    if value is not None:
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    return None
+
+
+def retry_delay(attempt: int, exc: Exception, initial: float = 0.5, maximum: float = 8.0) -> float:
+    """Delay before retry number `attempt` (0-based): Retry-After if given, else jittered backoff."""
+    delay = retry_after(exc)
+    if delay is not None and 0 < delay <= 60:
+        return delay
+    return min(initial * 2 ** attempt, maximum) * (1 - 0.25 * random.random())
@@ -0,0 +1,305 @@
+from threat_detection_score.cache import DEFAULT_CACHE_PATH
+import bisect, json, os, re, sqlite3, threading, time, zlib
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+# Words that say nothing about what a requirement detects
+_STOP_WORDS = frozenset(
+    "a an and any are as at be being by detect detecting detection for from in into is of on or over "
+    "that the their this to under used using via when where which with".split()
+)
+
+# Security vocabulary that is often reworded; each word is replaced by the first of its group
+_SYNONYMS = {
+    synonym: group.split()[0]
+    for group in (
+        "foreign overseas external outside",
+        "login logon logins logons signin signins sign-in sign-ins",
+        "administrator admin admins administrators",
+        "email mail mails emails",
+        "office o365",
+        "executable binary binaries",
+    )
+    for synonym in group.split()
+}
+
+_SUFFIXES = ("ations", "ation", "ions", "ion", "ing", "ers", "er", "ed", "es", "s")
+
+# Measured with benchmarks/bench_semantic.py, see SemanticCache
+DEFAULT_THRESHOLD = 0.85
+
+
+def _require_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("The semantic cache requires numpy: pip install threat_detection_score[semantic]")
+    return numpy
+
+
+def text_features(text: str) -> list:
+    """Word unigrams, word bigrams and padded character trigrams of the case-folded text."""
+    words = _WORD.findall(text.casefold())
+    features = list(words)
+    features += [f"{first} {second}" for first, second in zip(words, words[1:])]
+    for word in words:
+        padded = f"#{word}#"
+        features += [padded[index:index + 3] for index in range(len(padded) - 2)]
+    return features
+
+
+def _stem(word: str) -> str:
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[:-len(suffix)]
+    return word
+
+
+def paraphrase_features(text: str) -> list:
+    """
+    Content words (stop words dropped, synonyms merged, suffixes stripped) and their padded
+    character 3- and 4-grams, so reordered, re-inflected and partly reworded text overlaps.
+    """
+    words = [_SYNONYMS.get(word, word) for word in re.findall(r"[a-z0-9]+(?:-ins?)?", text.casefold())]
+    words = [_stem(word) for word in words if word not in _STOP_WORDS]
+    features = list(words)
+    for word in words:
+        padded = f"#{word}#"
+        for size in (3, 4):
+            features += [padded[index:index + size] for index in range(max(1, len(padded) - size + 1))]
+    return features
+
+
+class HashingVectorizer:
+    """Stateless term-frequency vectorizer hashing `features` of a text into a fixed number of dimensions."""
+
+    def __init__(self, dimensions: int = 1024, features=text_features):
+        self.dimensions = dimensions
+        self.features = features
+
+    def sparse(self, text: str):
+        """(indices, sublinear term frequencies) of the dimensions `text` uses."""
+        np = _require_numpy()
+        hashed = np.asarray([zlib.crc32(feature.encode("utf-8")) % self.dimensions for feature in self.features(text)], dtype=np.int64)
+        indices, counts = np.unique(hashed, return_counts=True)
+        # Sublinear term frequency, so a repeated word does not dominate the vector
+        return indices, np.log1p(counts).astype(np.float32)
+
+    def transform(self, text: str):
+        np = _require_numpy()
+        indices, values = self.sparse(text)
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        vector[indices] = values
+        return vector
+
+
+class _ScopeIndex:
+    """
+    In-memory TF-IDF nearest-neighbour index over the entries of one scorer scope, oldest first.
+
+    Term frequencies are kept sparse, per entry; only the IDF-weighted, L2-normalized rows used
+    for queries are a dense matrix, which grows by doubling so an add is amortized O(1). The
+    weighted rows are rebuilt only after the index has grown by `reweight_growth` since the last
+    rebuild; entries added in between are weighted with the current IDF.
+    """
+
+    def __init__(self, vectorizer: HashingVectorizer, reweight_growth: float = 0.1):
+        np = _require_numpy()
+        self.vectorizer = vectorizer
+        self.reweight_growth = reweight_growth
+
+        self.texts, self.args, self.created = [], [], []
+        self._rows = []
+        self._weighted = np.zeros((0, vectorizer.dimensions), dtype=np.float32)
+        self._document_frequency = np.zeros(vectorizer.dimensions, dtype=np.float32)
+        self._idf = np.ones(vectorizer.dimensions, dtype=np.float32)
+        self._weighted_size = 0
+
+    def __len__(self):
+        return len(self.texts)
+
+    def _normalize(self, matrix):
+        np = _require_numpy()
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+    def _weigh(self, row):
+        np = _require_numpy()
+        indices, values = row
+        vector = np.zeros(self.vectorizer.dimensions, dtype=np.float32)
+        vector[indices] = values * self._idf[indices]
+        return self._normalize(vector)
+
+    def _reweight(self):
+        np = _require_numpy()
+        size = len(self.texts)
+        self._idf = (np.log((1 + size) / (1 + self._document_frequency)) + 1).astype(np.float32)
+        self._weighted[:size] = 0
+        if size:
+            lengths = [len(indices) for indices, _ in self._rows]
+            rows = np.repeat(np.arange(size), lengths)
+            columns = np.concatenate([indices for indices, _ in self._rows])
+            values = np.concatenate([values for _, values in self._rows])
+            self._weighted[rows, columns] = values * self._idf[columns]
+            self._weighted[:size] = self._normalize(self._weighted[:size])
+        self._weighted_size = size
+
+    def add(self, text: str, args: dict, created: float) -> None:
+        np = _require_numpy()
+        row = self.vectorizer.sparse(text)
+
+        size = len(self.texts)
+        if size == self._weighted.shape[0]:
+            grown = np.zeros((max(64, size * 2), self.vectorizer.dimensions), dtype=np.float32)
+            grown[:size] = self._weighted[:size]
+            self._weighted = grown
+        self._rows.append(row)
+        self._document_frequency[row[0]] += 1
+        self.texts.append(text)
+        self.args.append(args)
+        self.created.append(created)
+
+        if size + 1 > self._weighted_size * (1 + self.reweight_growth):
+            self._reweight()
+        else:
+            self._weighted[size] = self._weigh(row)
+
+    def drop_oldest(self, count: int) -> None:
+        """Remove the `count` oldest entries."""
+        count = min(count, len(self.texts))
+        for indices, _ in self._rows[:count]:
+            self._document_frequency[indices] -= 1
+        del self._rows[:count], self.texts[:count], self.args[:count], self.created[:count]
+        self._reweight()
+
+    def drop_created_before(self, oldest: float) -> None:
+        """Remove the entries created before `oldest`, which are a prefix since entries are added in order."""
+        count = bisect.bisect_left(self.created, oldest)
+        if count:
+            self.drop_oldest(count)
+
+    def nearest(self, text: str):
+        """Return (index, cosine similarity) of the closest entry, or (None, 0.0) if empty."""
+        np = _require_numpy()
+        if not self.texts:
+            return None, 0.0
+
+        query = self._weigh(self.vectorizer.sparse(text))
+        similarities = self._weighted[:len(self.texts)] @ query
+        index = int(np.argmax(similarities))
+        return index, float(similarities[index])
+
+
+class SemanticCache:
+    """
+    Near-duplicate cache: returns a prior score when a new input is similar enough to a scored one.
+
+    Inputs are embedded locally (hashed TF-IDF over content words and their character 3- and
+    4-grams, see `paraphrase_features`; CPU only, no network) and compared by cosine similarity
+    against the earlier inputs of the same scope, i.e. the same scorer, system prompt, tool,
+    model and temperature. Entries persist in SQLite next to the exact-match result cache and
+    are loaded into a NumPy index per scope on first use; a scope keeps its newest
+    `max_entries`, and entries older than `ttl` seconds are never matched.
+
+    The default `threshold` comes from benchmarks/bench_semantic.py: it is the lowest value at
+    which none of the labelled pairs that differ in meaning (often by a single word, such as
+    ProxyShell and ProxyLogon) match, while paraphrases such as "RDP brute force from foreign
+    IP" and "brute-force RDP logins from overseas" still do. Paraphrases sharing few words stay
+    below it, since a lexical similarity cannot tell them from different requirements. The IDF
+    weights come from the scope's own entries, so while a scope holds only a handful of them,
+    similarities are lower and fewer paraphrases match.
+    """
+
+    def __init__(self, path: str = None, threshold: float = DEFAULT_THRESHOLD, ttl: float = 30 * 24 * 3600, max_entries: int = 50_000, dimensions: int = 2048):
+        _require_numpy()
+        self.path = path or os.environ.get("THREAT_DETECTION_SCORE_CACHE", DEFAULT_CACHE_PATH)
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.vectorizer = HashingVectorizer(dimensions, paraphrase_features)
+
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._indexes = {}
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS semantic_entries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                scope TEXT NOT NULL,
+                text TEXT NOT NULL,
+                args TEXT NOT NULL,
+                created REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS semantic_entries_scope ON semantic_entries (scope, created)")
+
+    def _index(self, scope: str) -> _ScopeIndex:
+        index = self._indexes.get(scope)
+        if index is None:
+            index = self._indexes[scope] = _ScopeIndex(self.vectorizer)
+            oldest = time.time() - self.ttl if self.ttl is not None else 0
+            rows = self._conn.execute(
+                "SELECT text, args, created FROM semantic_entries WHERE scope = ? AND created >= ? ORDER BY created DESC, id DESC LIMIT ?",
+                (scope, oldest, self.max_entries),
+            ).fetchall()
+            for text, args, created in reversed(rows):
+                index.add(text, json.loads(args), created)
+        elif self.ttl is not None:
+            # A long-running process must not keep matching entries that expired since loading
+            index.drop_created_before(time.time() - self.ttl)
+        return index
+
+    def lookup(self, scope: str, text: str, threshold: float = None):
+        """
+        Return (args, similarity, matched_text) for the most similar earlier input of `scope`
+        when the similarity reaches `threshold` (default: the cache's), otherwise None.
+        """
+        threshold = self.threshold if threshold is None else threshold
+        with self._lock:
+            index = self._index(scope)
+            position, similarity = index.nearest(text)
+            if position is None or similarity < threshold:
+                return None
+            return index.args[position], similarity, index.texts[position]
+
+    def add(self, scope: str, text: str, args: dict) -> None:
+        """Store an entry; a scope at `max_entries` first evicts its oldest tenth, in memory and on disk."""
+        with self._lock:
+            index = self._index(scope)
+            if len(index) >= self.max_entries:
+                # A tenth at a time, so the index is rebuilt once per max_entries / 10 adds
+                evicted = max(1, self.max_entries // 10)
+                index.drop_oldest(evicted)
+                # Keep on disk exactly the entries still in memory, the newest ones
+                self._conn.execute(
+                    """
+                    DELETE FROM semantic_entries WHERE scope = ? AND id NOT IN (
+                        SELECT id FROM semantic_entries WHERE scope = ? ORDER BY created DESC, id DESC LIMIT ?
+                    )
+                    """,
+                    (scope, scope, len(index)),
+                )
+            now = time.time()
+            index.add(text, args, now)
+            self._conn.execute(
+                "INSERT INTO semantic_entries (scope, text, args, created) VALUES (?, ?, ?, ?)",
+                (scope, text, json.dumps(args), now),
+            )
+
+    def purge_expired(self) -> int:
+        """Delete entries older than the TTL from disk and return how many were removed."""
+        if self.ttl is None:
+            return 0
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM semantic_entries WHERE created < ?", (time.time() - self.ttl,))
+            self._indexes.clear()
+        return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
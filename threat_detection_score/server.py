@@ -0,0 +1,159 @@
+from threat_detection_score.cache import normalize_input
+from threat_detection_score.engine import SCORE_ALL_KINDS, SCORER_MODULES
+from threat_detection_score.input_sanitizer.sanitize import sanitize_input
+from threat_detection_score.results import to_plain
+import asyncio, json, typer
+
+
+class ServerBusy(Exception):
+    """Raised when a scorer's wait queue is full."""
+
+
+class ScoringServer:
+    """
+    Minimal ASGI application exposing the scorers of one shared `ScoringEngine` over HTTP/JSON.
+
+    Routes:
+
+    - ``GET /health``: liveness plus per-scorer in-flight and queued counts.
+    - ``POST /score/{kind}``: body ``{"text": "..."}``, returns that scorer's result.
+    - ``POST /score_all``: body ``{"text": "..."}``, returns every scorer's result.
+
+    Concurrent requests for the same scorer and normalized text share one upstream call. Each
+    scorer runs at most `max_concurrency` LLM calls at once; once `max_queue` more are waiting,
+    further requests are rejected with 503 so callers back off instead of piling up.
+    """
+
+    def __init__(self, engine, max_concurrency: int = 8, max_queue: int = 64):
+        self.engine = engine
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+
+        self._semaphores = {}
+        self._queued = {kind: 0 for kind in SCORER_MODULES}
+        self._running = {kind: 0 for kind in SCORER_MODULES}
+        self._inflight = {}
+
+    async def score(self, kind: str, human_message_input: str, refresh: bool = False) -> dict:
+        """Score through the coalescing and concurrency limits; usable without HTTP."""
+        key = (kind, normalize_input(human_message_input), refresh)
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._limited_score(kind, human_message_input, refresh))
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        # Shield so one disconnecting client does not cancel the call other waiters share.
+        return await asyncio.shield(future)
+
+    async def _limited_score(self, kind: str, human_message_input: str, refresh: bool) -> dict:
+        if self._queued[kind] >= self.max_queue:
+            raise ServerBusy(f"Too many pending '{kind}' requests.")
+
+        semaphore = self._semaphores.get(kind)
+        if semaphore is None:
+            semaphore = self._semaphores[kind] = asyncio.Semaphore(self.max_concurrency)
+
+        self._queued[kind] += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self._queued[kind] -= 1
+
+        self._running[kind] += 1
+        try:
+            return await self.engine.ascore(kind, human_message_input, refresh=refresh)
+        finally:
+            self._running[kind] -= 1
+            semaphore.release()
+
+    async def score_all(self, human_message_input: str, refresh: bool = False) -> dict:
+        kinds = list(SCORE_ALL_KINDS)
+        results = await asyncio.gather(*(self.score(kind, human_message_input, refresh) for kind in kinds))
+        return dict(zip(kinds, results))
+
+    def health(self) -> dict:
+        return {
+            "status": "ok",
+            "model": self.engine.model_name,
+            "scorers": {
+                kind: {"running": self._running[kind], "queued": self._queued[kind]}
+                for kind in SCORER_MODULES
+            },
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        status, payload, headers = await self._route(scope, receive)
+        body = json.dumps(payload).encode("utf-8")
+
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())] + headers,
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _route(self, scope, receive):
+        method, path = scope["method"], scope["path"].rstrip("/")
+
+        if path == "/health":
+            if method != "GET":
+                return 405, {"error": "Method not allowed."}, []
+            return 200, self.health(), []
+
+        if path == "/score_all":
+            kind = None
+        elif path.startswith("/score/"):
+            kind = path[len("/score/"):]
+            if kind not in SCORER_MODULES:
+                return 404, {"error": f"Unknown scorer '{kind}'."}, []
+        else:
+            return 404, {"error": "Not found."}, []
+
+        if method != "POST":
+            return 405, {"error": "Method not allowed."}, []
+
+        try:
+            request = json.loads(await self._read_body(receive) or b"{}")
+            human_message_input = sanitize_input(request.get("text"))
+            refresh = bool(request.get("refresh", False))
+        except (ValueError, AttributeError) as exc:
+            return 400, {"error": f"Request body must be a JSON object: {exc}"}, []
+        except typer.BadParameter as exc:
+            return 400, {"error": str(exc)}, []
+
+        try:
+            if kind is None:
+                result = await self.score_all(human_message_input, refresh)
+            else:
+                result = await self.score(kind, human_message_input, refresh)
+        except ServerBusy as exc:
+            return 503, {"error": str(exc)}, [(b"retry-after", b"1")]
+        except Exception as exc:
+            return 502, {"error": f"{type(exc).__name__}: {exc}"}, []
+
+        return 200, to_plain(result), []
+
+    @staticmethod
+    async def _read_body(receive) -> bytes:
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body", False):
+                return body
@@ -0,0 +1,228 @@
+from threat_detection_score.cache import DEFAULT_CACHE_PATH
+import hashlib, json, os, sqlite3, threading, time
+
+
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(DEFAULT_CACHE_PATH), "scores.sqlite3")
+
+
+def scorer_fingerprint(kind: str, model_id: str, temperature: float, packed: bool = False) -> str:
+    """
+    Version of a scorer's output: its system prompt, tool schema, model and temperature.
+
+    `model_id` is the provider-qualified model name (providers.model_id). With `packed`, the
+    version of scores answered in packed requests, whose prompt and tool differ.
+
+    A stored score whose fingerprint differs from the current one is stale.
+    """
+    from threat_detection_score.engine import scorer_prefix
+    from threat_detection_score.packing import packed_prefix
+
+    prefix = packed_prefix(kind) if packed else scorer_prefix(kind)
+    material = json.dumps([kind, prefix, model_id, float(temperature)], ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()[:16]
+
+
+def score_fields(result: dict) -> dict:
+    """
+    The fields of a stored result that carry scores, i.e. everything but prose and metadata,
+    at every level: the nested results of exploit_assessment have reasons of their own.
+    """
+    return {
+        name: score_fields(value) if isinstance(value, dict) else value
+        for name, value in result.items()
+        if name not in ("reason", "type", "cache_hit", "preclassified", "consensus")
+    }
+
+
+class ScoreStore:
+    """
+    Versioned SQLite store of a requirements corpus and its latest score per scorer.
+
+    Every score is saved with the fingerprint it was produced under, and committed on its own,
+    so a re-scoring run interrupted at any point resumes with just the records still stale.
+    When a re-score changes a record's score fields, the old and new values are kept in
+    `changes` under the new fingerprint.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.environ.get("THREAT_DETECTION_SCORE_STORE", DEFAULT_STORE_PATH)
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS requirements (
+                id TEXT PRIMARY KEY,
+                text TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS scores (
+                id TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                result TEXT NOT NULL,
+                updated REAL NOT NULL,
+                PRIMARY KEY (id, kind)
+            );
+            CREATE TABLE IF NOT EXISTS changes (
+                id TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                old_fingerprint TEXT NOT NULL,
+                old_result TEXT NOT NULL,
+                new_result TEXT NOT NULL,
+                changed REAL NOT NULL,
+                PRIMARY KEY (id, kind, fingerprint)
+            );
+            """
+        )
+
+    def add_requirements(self, records) -> int:
+        """
+        Insert or update (id, text) records and return how many were new or changed.
+
+        A requirement whose text changed loses its stored scores, so every scorer treats it as stale.
+        """
+        changed = 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for record_id, text in records:
+                    key = json.dumps(record_id)
+                    row = self._conn.execute("SELECT text FROM requirements WHERE id = ?", (key,)).fetchone()
+                    if row is not None and row[0] == text:
+                        continue
+                    self._conn.execute("INSERT OR REPLACE INTO requirements (id, text) VALUES (?, ?)", (key, text))
+                    self._conn.execute("DELETE FROM scores WHERE id = ?", (key,))
+                    changed += 1
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return changed
+
+    def count_stale(self, kind: str, fingerprint: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                """
+                SELECT COUNT(*) FROM requirements r
+                LEFT JOIN scores s ON s.id = r.id AND s.kind = ?
+                WHERE s.fingerprint IS NULL OR s.fingerprint != ?
+                """,
+                (kind, fingerprint),
+            ).fetchone()[0]
+
+    def stale(self, kind: str, fingerprint: str, page_size: int = 500):
+        """Yield (id, text) of requirements with no `kind` score under `fingerprint`, a page at a time."""
+        last = ""
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    """
+                    SELECT r.id, r.text FROM requirements r
+                    LEFT JOIN scores s ON s.id = r.id AND s.kind = ?
+                    WHERE r.id > ? AND (s.fingerprint IS NULL OR s.fingerprint != ?)
+                    ORDER BY r.id LIMIT ?
+                    """,
+                    (kind, last, fingerprint, page_size),
+                ).fetchall()
+            if not rows:
+                return
+            for key, text in rows:
+                yield json.loads(key), text
+            last = rows[-1][0]
+
+    def save(self, record_id, kind: str, fingerprint: str, result: dict):
+        """
+        Store `result` as the current `kind` score of `record_id`.
+
+        Returns a change dict (id, kind, old and new score fields) when it replaces a score from
+        another fingerprint with different score fields, otherwise None.
+        """
+        key = json.dumps(record_id)
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                previous = self._conn.execute(
+                    "SELECT fingerprint, result FROM scores WHERE id = ? AND kind = ?", (key, kind)
+                ).fetchone()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO scores (id, kind, fingerprint, result, updated) VALUES (?, ?, ?, ?, ?)",
+                    (key, kind, fingerprint, json.dumps(result), now),
+                )
+
+                change = None
+                if previous is not None and previous[0] != fingerprint:
+                    old_result = json.loads(previous[1])
+                    if score_fields(old_result) != score_fields(result):
+                        change = {"id": record_id, "kind": kind, "old": score_fields(old_result), "new": score_fields(result)}
+                        self._conn.execute(
+                            "INSERT OR REPLACE INTO changes VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            (key, kind, fingerprint, previous[0], previous[1], json.dumps(result), now),
+                        )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return change
+
+    def changes(self, kind: str, fingerprint: str):
+        """Yield the score changes recorded when moving `kind` to `fingerprint`, across resumed runs."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, old_result, new_result FROM changes WHERE kind = ? AND fingerprint = ? ORDER BY id",
+                (kind, fingerprint),
+            ).fetchall()
+        for key, old_result, new_result in rows:
+            yield {"id": json.loads(key), "kind": kind, "old": score_fields(json.loads(old_result)), "new": score_fields(json.loads(new_result))}
+
+    def export(self, kinds):
+        """Yield one {"id", "text", <kind>: result, ...} record per requirement, in the score_all layout."""
+        kinds = list(kinds)
+        with self._lock:
+            requirements = self._conn.execute("SELECT id, text FROM requirements ORDER BY id").fetchall()
+        for key, text in requirements:
+            with self._lock:
+                rows = self._conn.execute("SELECT kind, result FROM scores WHERE id = ?", (key,)).fetchall()
+            results = {kind: json.loads(result) for kind, result in rows if kind in kinds}
+            yield {"id": json.loads(key), "text": text, **{kind: results.get(kind) for kind in kinds}}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def rescore(engine, store: ScoreStore, kinds, workers: int = 8, on_change=None) -> dict:
+    """
+    Re-score, with `engine`, every stored requirement whose `kinds` scores are missing or stale.
+
+    Records stream from the store a page at a time and at most `workers` are scored at once.
+    `on_change` is called with each change dict as it happens. Returns per-scorer counts.
+    """
+    import asyncio
+    from threat_detection_score.batch import score_records
+
+    async def _run():
+        summary = {}
+        for kind in kinds:
+            fingerprint = scorer_fingerprint(kind, engine.model_id, engine.temperature)
+            stats = summary[kind] = {"fingerprint": fingerprint, "stale": store.count_stale(kind, fingerprint), "rescored": 0, "changed": 0, "errors": 0}
+
+            async for result in score_records(lambda text, kind=kind: engine.ascore(kind, text), store.stale(kind, fingerprint), workers=workers):
+                record_id = result.pop("id")
+                if "error" in result:
+                    # Left stale, so the next run retries it
+                    stats["errors"] += 1
+                    continue
+                change = store.save(record_id, kind, fingerprint, result)
+                stats["rescored"] += 1
+                if change is not None:
+                    stats["changed"] += 1
+                    if on_change is not None:
+                        on_change(change)
+        return summary
+
+    return asyncio.run(_run())
@@ -0,0 +1,160 @@
+import json, re
+
+# Streaming mode parses a scorer's tool-call arguments while the model is still generating them.
+# The arguments are a flat JSON object whose score fields come before the reason in every tool
+# schema, so a score can be shown as soon as its digits are complete, long before the reason is.
+#
+# Events are plain dicts:
+#   {"event": "field", "field": "score", "value": 2}      a score field is complete
+#   {"event": "delta", "field": "reason", "text": "..."}  more of a string field
+#   {"event": "result", "result": <ScoreResult>}          the validated result, always last
+# A string score field, such as exploit_eval's answer, arrives as deltas and then as a field
+# event with the whole value; a reason only ever as deltas.
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+_SCALAR_END = re.compile(r"[\s,}]")
+
+
+class ArgumentStream:
+    """
+    Incremental parser of a flat JSON object arriving in arbitrary chunks.
+
+    `feed` returns the events completed by each chunk. Nested values or malformed input stop
+    the events (the final result is still built from the complete arguments), never raise.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._state = "start"
+        self._field = None
+        # The decoded pieces of the string value being streamed
+        self._parts = []
+        self.failed = False
+
+    def feed(self, chunk: str) -> list:
+        if self.failed or self._state == "done":
+            return []
+        self._buffer += chunk
+        events = []
+        try:
+            while self._buffer and self._step(events):
+                pass
+        except ValueError:
+            self.failed = True
+        return events
+
+    def _step(self, events: list) -> bool:
+        """Consume one token from the buffer; False when more input is needed."""
+        buffer = self._buffer
+        if self._state != "string":
+            stripped = buffer.lstrip()
+            if not stripped:
+                self._buffer = ""
+                return False
+            buffer = self._buffer = stripped
+
+        if self._state == "start":
+            if buffer[0] != "{":
+                raise ValueError("not an object")
+            self._buffer, self._state = buffer[1:], "key"
+        elif self._state == "key":
+            if buffer[0] == "}":
+                self._buffer, self._state = "", "done"
+                return False
+            if buffer[0] == ",":
+                self._buffer = buffer[1:]
+                return True
+            end = _string_end(buffer)
+            if end is None:
+                return False
+            self._field = json.loads(buffer[:end + 1])
+            self._buffer, self._state = buffer[end + 1:], "colon"
+        elif self._state == "colon":
+            if buffer[0] != ":":
+                raise ValueError("expected ':'")
+            self._buffer, self._state = buffer[1:], "value"
+        elif self._state == "value":
+            if buffer[0] == '"':
+                self._buffer, self._state, self._parts = buffer[1:], "string", []
+            elif buffer[0] in "[{":
+                raise ValueError("nested values are not streamed")
+            else:
+                match = _SCALAR_END.search(buffer)
+                if match is None:
+                    return False
+                events.append({"event": "field", "field": self._field, "value": json.loads(buffer[:match.start()])})
+                self._buffer, self._state = buffer[match.start():], "key"
+        elif self._state == "string":
+            text, consumed, closed = _decode_partial(buffer)
+            if text:
+                events.append({"event": "delta", "field": self._field, "text": text})
+                self._parts.append(text)
+            self._buffer = buffer[consumed:]
+            if not closed:
+                return False
+            if not is_prose(self._field):
+                events.append({"event": "field", "field": self._field, "value": "".join(self._parts)})
+            self._state = "key"
+        return True
+
+
+def is_prose(field: str) -> bool:
+    """True for the free-text fields (reason, active_exploit_reason), which carry no score."""
+    return field.endswith("reason")
+
+
+def _string_end(buffer: str):
+    """Index of the quote closing the string starting at buffer[0], or None if it has not arrived."""
+    index = 1
+    while index < len(buffer):
+        if buffer[index] == "\\":
+            index += 2
+            continue
+        if buffer[index] == '"':
+            return index
+        index += 1
+    return None
+
+
+def _decode_partial(buffer: str):
+    """(decoded text, characters consumed, string closed) for the body of a string being streamed."""
+    parts, index = [], 0
+    while index < len(buffer):
+        character = buffer[index]
+        if character == '"':
+            return "".join(parts), index + 1, True
+        if character != "\\":
+            end = index + 1
+            while end < len(buffer) and buffer[end] not in '"\\':
+                end += 1
+            parts.append(buffer[index:end])
+            index = end
+            continue
+        # An escape split across chunks waits for the rest
+        if index + 1 >= len(buffer):
+            break
+        if buffer[index + 1] == "u":
+            # A high surrogate is decoded together with the low surrogate that follows it
+            length = 12 if buffer[index + 2:index + 3].lower() == "d" and buffer[index + 3:index + 4].lower() in "89ab" else 6
+            if index + length > len(buffer):
+                break
+            parts.append(json.loads(f'"{buffer[index:index + length]}"'))
+            index += length
+        else:
+            if buffer[index + 1] not in _ESCAPES:
+                raise ValueError("bad escape")
+            parts.append(_ESCAPES[buffer[index + 1]])
+            index += 2
+    return "".join(parts), index, False
+
+
+def argument_events(args: dict) -> list:
+    """The events of complete arguments, e.g. of a cached result, in the same form as streamed ones."""
+    events = []
+    for name, value in args.items():
+        if isinstance(value, str):
+            events.append({"event": "delta", "field": name, "text": value})
+            if is_prose(name):
+                continue
+        events.append({"event": "field", "field": name, "value": value})
+    return events
@@ -0,0 +1,128 @@
+"""
+Deterministic offline chat model behind ``--provider stub``.
+
+The stub answers every request with a call to the forced tool. Its arguments are derived from
+the tool's JSON schema and a hash of the input text, so every scorer runs end to end without
+network access and the same input always gets the same scores. `latency` adds a sleep per call
+to model a round trip; token usage is estimated from the message lengths. Packed requests get
+one entry per requirement, each with the arguments that requirement would get on its own.
+Streamed responses deliver the arguments' JSON a few characters per chunk, `chunk_latency`
+apart, like a real model generating them.
+"""
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from threat_detection_score.ratelimit import CHARS_PER_TOKEN
+import asyncio, hashlib, json, time
+
+
+def stub_value(schema: dict, choice: int):
+    """A value satisfying a (simple) JSON schema, picked by `choice` where there is a choice."""
+    if "anyOf" in schema:
+        return stub_value(next(option for option in schema["anyOf"] if option.get("type") != "null"), choice)
+    if "enum" in schema:
+        return schema["enum"][choice % len(schema["enum"])]
+    if schema.get("type") == "integer":
+        return choice
+    if schema.get("type") == "array":
+        return []
+    return "Deterministic stub reason; no language model was called for this result."
+
+
+def _stub_args(tool_name: str, properties: dict, text: str) -> dict:
+    digest = hashlib.sha256(f"{tool_name}\0{text}".encode("utf-8")).digest()
+    return {name: stub_value(schema, digest[index % len(digest)]) for index, (name, schema) in enumerate(properties.items())}
+
+
+def stub_args(tool: dict, text: str) -> dict:
+    """Tool-call arguments for `tool`, the same for every call with the same `text`."""
+    from threat_detection_score.packing import PACKED_TOOL_SUFFIX, split_packed
+
+    name = tool["function"]["name"]
+    properties = tool["function"]["parameters"].get("properties", {})
+    if not name.endswith(PACKED_TOOL_SUFFIX):
+        return _stub_args(name, properties, text)
+
+    entry = dict(properties["results"]["items"]["properties"])
+    entry.pop("id")
+    name = name[: -len(PACKED_TOOL_SUFFIX)]
+    return {"results": [{"id": item_id, **_stub_args(name, entry, item)} for item_id, item in split_packed(text)]}
+
+
+def message_chunks(message: AIMessage, chunk_size: int = 4):
+    """`message`'s tool call as streamed chunks: the arguments' JSON in pieces, usage on the last one."""
+    if not message.tool_calls:
+        # e.g. a recorded response without a tool call, replayed as it was
+        yield ChatGenerationChunk(message=AIMessageChunk(content=message.content, usage_metadata=message.usage_metadata))
+        return
+    tool_call = message.tool_calls[0]
+    arguments = json.dumps(tool_call["args"])
+    pieces = [arguments[start:start + chunk_size] for start in range(0, len(arguments), chunk_size)] or [""]
+    for index, piece in enumerate(pieces):
+        first = index == 0
+        chunk = AIMessageChunk(
+            content="",
+            tool_call_chunks=[{"name": tool_call["name"] if first else None, "args": piece, "id": tool_call.get("id") if first else None, "index": 0}],
+            usage_metadata=message.usage_metadata if index == len(pieces) - 1 else None,
+        )
+        yield ChatGenerationChunk(message=chunk)
+
+
+class StubChatModel(BaseChatModel):
+    model_name: str = "stub"
+    latency: float = 0.0
+    chunk_latency: float = 0.0
+    chunk_size: int = 4
+    completion_tokens: int = 60
+
+    @property
+    def _llm_type(self) -> str:
+        return "threat-detection-score-stub"
+
+    def bind_tools(self, tools, tool_choice=None, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], tool_choice=tool_choice, **kwargs)
+
+    def _respond(self, messages, tools, tool_choice) -> ChatResult:
+        tool = next(tool for tool in tools if tool["function"]["name"] == tool_choice)
+        text = messages[-1].content if messages else ""
+        prompt_tokens = sum(len(message.content) for message in messages) // CHARS_PER_TOKEN
+        message = AIMessage(
+            content="",
+            tool_calls=[{"name": tool_choice, "args": stub_args(tool, text), "id": "call_stub"}],
+            usage_metadata={
+                "input_tokens": prompt_tokens,
+                "output_tokens": self.completion_tokens,
+                "total_tokens": prompt_tokens + self.completion_tokens,
+            },
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, tools=(), tool_choice=None, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        return self._respond(messages, tools, tool_choice)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, tools=(), tool_choice=None, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._respond(messages, tools, tool_choice)
+
+    def _chunks(self, messages, tools, tool_choice):
+        return message_chunks(self._respond(messages, tools, tool_choice).generations[0].message, self.chunk_size)
+
+    def _stream(self, messages, stop=None, run_manager=None, tools=(), tool_choice=None, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        for chunk in self._chunks(messages, tools, tool_choice):
+            yield chunk
+            if self.chunk_latency:
+                time.sleep(self.chunk_latency)
+
+    async def _astream(self, messages, stop=None, run_manager=None, tools=(), tool_choice=None, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        for chunk in self._chunks(messages, tools, tool_choice):
+            yield chunk
+            if self.chunk_latency:
+                await asyncio.sleep(self.chunk_latency)
@@ -1,49 +1,11 @@
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
-from langchain_core.runnables import RunnablePassthrough, ConfigurableField
-from langchain_core.tools import tool
-from threat_detection_score.input_sanitizer.sanitize import sanitize_input
+from threat_detection_score.cli import make_app
+from threat_detection_score.results import ThreatSeverityResult
 from typing import Literal
-import json, textwrap, typer
-
-
-app = typer.Typer()
-
-
-@app.command()
-def main(
-    human_message_input: str = typer.Option(
-        ...,  # This indicates the option is required
-        "--human-message-input",  # Specify the flag name
-        "-i",  # Optional shorthand flag
-        help="The input message describing the cybersecurity detection scenario.",
-        callback=sanitize_input  # Use the sanitize_input function for validation
-    ),
-    temperature: str = typer.Option(
-        0.0,  # Default value
-        "--temperature",  # Specify the flag name
-        help="The temperature of the LLM."
-    ),
-    model_name: str = typer.Option(
-        "gpt-4o-mini",  # Default value
-        "--model-name",  # Specify the flag name
-        help="The LLM model used."
-    ),
-    max_retries: str = typer.Option(
-        3,  # Default value
-        "--max-retries",  # Specify the flag name
-        help="The maximum number of retries for the LLM."
-    )
-):
-
-    chat_template = ChatPromptTemplate.from_messages(
-        [
-            ("system", "{system_prompt}"),
-            ("human", "{detection_requirement}"),
-        ]
-    )
-
-    system_prompt = """
+import inspect
+
+KIND = "threat_severity"
+
+SYSTEM_PROMPT = inspect.cleandoc("""
     **Prompt for Cyber Security Threat Analyst AI:**
 
     You are an AI cyber security threat analyst. Your primary function is to analyze security alerts and determine their severity based on the detection requirements provided. Using the following scoring chart, evaluate the input detection and assign the correct score. Your analysis will directly impact our organization's response to potential threats.
@@ -66,38 +28,21 @@ def main(
 
     Your analysis should output the assigned score along with a succinct explanation for your decision, guided by the scoring chart's examples and definitions.
 
-    """
-
-    prompt = chat_template.partial(system_prompt=system_prompt)
-
-    model = ChatOpenAI(model=model_name, temperature=temperature, max_retries=max_retries)
-
-    @tool
-    def threat_severity(score: Literal[1, 2, 3], reason: str) -> None:
-        """threat severity ranking"""
-        pass
+    """)
 
-    tools = [threat_severity]
 
-    chain = (
-        {"detection_requirement": RunnablePassthrough()}
-        | prompt
-        | model.bind_tools(tools, tool_choice="threat_severity")
-    ).with_config(configurable={"llm_temperature": temperature, "llm_model":model_name, "llm_max_retries": max_retries})
+def threat_severity(score: Literal[1, 2, 3], reason: str) -> None:
+    """threat severity ranking"""
+    pass
 
+TOOL = threat_severity
 
-    llm_result = chain.invoke({"detection_requirement": human_message_input})
 
-    score = llm_result.tool_calls[0]["args"]["score"]
-    reason = llm_result.tool_calls[0]["args"]["reason"]
+def build_result(args: dict) -> ThreatSeverityResult:
+    return ThreatSeverityResult.from_args(args)
 
-    result = {
-    "score": score,
-    "reason": "\n".join(textwrap.wrap(reason, width=80)),
-    "type": "threat severity"
-    }
 
-    print(json.dumps(result))
+app = make_app(KIND)
 
 if __name__ == "__main__":
-    app()
\ No newline at end of file
+    app()
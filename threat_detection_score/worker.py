@@ -0,0 +1,522 @@
+from threat_detection_score.batch import error_record
+from threat_detection_score.cache import normalize_input
+from threat_detection_score.results import to_plain
+from collections import deque
+import heapq, itertools, json, os, sqlite3, sys, threading, time
+
+# The worker scores a continuous feed of requirements. Items are read from a queue (a SQLite
+# database, a spool directory or stdin) into an in-memory backlog ordered by priority, then by
+# arrival. An item whose normalized text is waiting, being scored or was scored within the
+# dedupe window shares that result instead of calling the LLM again. The backlog is drained in
+# micro-batches, optionally scored as packed requests per scorer, with a bounded number of batches in
+# flight, so bursts queue up instead of turning into bursts of LLM calls. An item is acknowledged
+# to its queue only after its result is in the sink: delivery is at least once.
+
+
+class WorkItem:
+    __slots__ = ("id", "text", "priority", "token", "duplicates", "started")
+
+    def __init__(self, record_id, text, priority=0, token=None):
+        self.id = record_id
+        # An exception in place of the text for a malformed record, as in batch.read_records
+        self.text = text
+        self.priority = priority
+        # What the queue needs to acknowledge the item
+        self.token = token
+        # Items with the same normalized text, completed with this one
+        self.duplicates = []
+        self.started = False
+
+
+def parse_item(line, default_id, token=None, default_priority: float = 0) -> WorkItem:
+    """A WorkItem from one JSONL line: {"text" (or "human_message_input"), "id"?, "priority"?}."""
+    try:
+        record = json.loads(line)
+        text = record.get("text", record.get("human_message_input"))
+        priority = record.get("priority", default_priority)
+        record_id = record.get("id", default_id)
+    except (ValueError, AttributeError) as exc:
+        return WorkItem(default_id, ValueError(f"Record {default_id} is not a JSON object: {exc}"), token=token)
+    if isinstance(priority, bool) or not isinstance(priority, (int, float)):
+        return WorkItem(record_id, ValueError(f"Record {record_id} has a non-numeric priority: {priority!r}."), token=token)
+    return WorkItem(record_id, text, priority, token)
+
+
+class SqliteQueue:
+    """
+    A durable queue in a SQLite database, shared by any number of producers and workers.
+
+    `poll` claims the waiting items with the highest priority; an item whose claim is older than
+    `lease` seconds (its worker died) is handed out again. `ack` deletes items, and `close`
+    gives back the claims of items that were not acknowledged.
+    """
+
+    def __init__(self, path: str, lease: float = 300.0):
+        self.path = path
+        self.lease = lease
+        self.exhausted = False
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._claimed = set()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS queue (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                id TEXT,
+                text TEXT NOT NULL,
+                priority REAL NOT NULL DEFAULT 0,
+                enqueued REAL NOT NULL,
+                claimed REAL
+            );
+            CREATE INDEX IF NOT EXISTS queue_order ON queue (priority DESC, seq);
+            """
+        )
+
+    def put(self, records) -> int:
+        """Enqueue (id, text, priority) records in one transaction; an id of None becomes the queue sequence number."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                count = 0
+                for record_id, text, priority in records:
+                    self._conn.execute(
+                        "INSERT INTO queue (id, text, priority, enqueued) VALUES (?, ?, ?, ?)",
+                        (None if record_id is None else json.dumps(record_id), text, priority, now),
+                    )
+                    count += 1
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return count
+
+    def poll(self, limit: int) -> list:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT seq, id, text, priority FROM queue WHERE claimed IS NULL OR claimed < ? ORDER BY priority DESC, seq LIMIT ?",
+                    (now - self.lease, limit),
+                ).fetchall()
+                self._conn.executemany("UPDATE queue SET claimed = ? WHERE seq = ?", [(now, row[0]) for row in rows])
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._claimed.update(row[0] for row in rows)
+        return [WorkItem(seq if record_id is None else json.loads(record_id), text, priority, seq) for seq, record_id, text, priority in rows]
+
+    def ack(self, items) -> None:
+        sequence_numbers = [item.token for item in items]
+        with self._lock:
+            self._conn.executemany("DELETE FROM queue WHERE seq = ?", [(seq,) for seq in sequence_numbers])
+            self._claimed.difference_update(sequence_numbers)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM queue").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.executemany("UPDATE queue SET claimed = NULL WHERE seq = ?", [(seq,) for seq in self._claimed])
+            self._conn.close()
+
+
+class SpoolQueue:
+    """
+    A directory producers drop JSONL files into, one record per line.
+
+    A producer writes each file under a name not ending in .jsonl and renames it when complete.
+    The worker claims files oldest first by moving them to `.processing/`, and deletes a file
+    once all its records are acknowledged. Files a crashed worker left in `.processing/` are
+    read again by the next one, so one worker per spool directory.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.processing = os.path.join(directory, ".processing")
+        self.exhausted = False
+        os.makedirs(self.processing, exist_ok=True)
+        self._files = deque(sorted(os.path.join(self.processing, name) for name in os.listdir(self.processing) if name.endswith(".jsonl")))
+        self._current = None
+        # Claimed file -> [records not yet acknowledged, fully read]
+        self._outstanding = {}
+
+    def _claim(self) -> None:
+        entries = [entry for entry in os.scandir(self.directory) if entry.is_file() and entry.name.endswith(".jsonl")]
+        for entry in sorted(entries, key=lambda entry: (entry.stat().st_mtime, entry.name)):
+            # Unique in .processing/ even if a file of the same name is dropped again
+            target = os.path.join(self.processing, f"{time.time_ns()}-{entry.name}")
+            try:
+                os.rename(entry.path, target)
+            except FileNotFoundError:
+                continue
+            self._files.append(target)
+
+    def poll(self, limit: int) -> list:
+        items = []
+        while len(items) < limit:
+            if self._current is None:
+                if not self._files:
+                    self._claim()
+                if not self._files:
+                    break
+                path = self._files.popleft()
+                self._current = [path, open(path, encoding="utf-8"), 0]
+                self._outstanding[path] = [0, False]
+            path, handle, line_number = self._current
+            line = handle.readline()
+            if not line:
+                handle.close()
+                self._current = None
+                self._outstanding[path][1] = True
+                self._finish(path)
+                continue
+            self._current[2] = line_number = line_number + 1
+            if line.strip():
+                # The file's name as dropped, without the claim prefix
+                name = os.path.basename(path).split("-", 1)[1]
+                items.append(parse_item(line, f"{name}:{line_number}", token=path))
+                self._outstanding[path][0] += 1
+        return items
+
+    def put(self, records) -> int:
+        """Drop (id, text, priority) records into the directory as one file, the way a producer should."""
+        name = f"{time.time_ns()}-{os.getpid()}"
+        partial = os.path.join(self.directory, f".{name}.part")
+        count = 0
+        with open(partial, "w", encoding="utf-8") as handle:
+            for record_id, text, priority in records:
+                handle.write(json.dumps({"id": record_id, "text": text, "priority": priority}) + "\n")
+                count += 1
+        os.rename(partial, os.path.join(self.directory, f"{name}.jsonl"))
+        return count
+
+    def _finish(self, path: str) -> None:
+        pending, read = self._outstanding[path]
+        if read and not pending:
+            os.remove(path)
+            del self._outstanding[path]
+
+    def ack(self, items) -> None:
+        for item in items:
+            self._outstanding[item.token][0] -= 1
+            self._finish(item.token)
+
+    def close(self) -> None:
+        if self._current is not None:
+            self._current[1].close()
+
+
+class StdinQueue:
+    """JSONL records from stdin, read by a thread; not durable, and finished at end of input."""
+
+    def __init__(self, stream=None, maxsize: int = 1000):
+        import queue
+
+        self._lines = queue.Queue(maxsize=maxsize)
+        self._ended = False
+        self.exhausted = False
+        self._thread = threading.Thread(target=self._read, args=(stream or sys.stdin,), daemon=True)
+        self._thread.start()
+
+    def _read(self, stream) -> None:
+        for line_number, line in enumerate(stream, start=1):
+            if line.strip():
+                self._lines.put((line_number, line))
+        self._lines.put(None)
+
+    def poll(self, limit: int) -> list:
+        import queue
+
+        items = []
+        while len(items) < limit and not self._ended:
+            try:
+                entry = self._lines.get_nowait()
+            except queue.Empty:
+                break
+            if entry is None:
+                self._ended = True
+            else:
+                items.append(parse_item(entry[1], entry[0]))
+        self.exhausted = self._ended
+        return items
+
+    def ack(self, items) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def open_queue(spec: str):
+    """The queue named by `spec`: "-" for stdin, "sqlite:PATH" or "spool:DIRECTORY"."""
+    if spec == "-":
+        return StdinQueue()
+    scheme, _, path = spec.partition(":")
+    if scheme == "sqlite" and path:
+        return SqliteQueue(path)
+    if scheme == "spool" and path:
+        return SpoolQueue(path)
+    raise ValueError(f"Unknown queue '{spec}'. Expected -, sqlite:PATH or spool:DIRECTORY.")
+
+
+class NdjsonSink:
+    """Results as NDJSON lines, flushed one batch at a time, in the layout of --input-file output."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, records) -> None:
+        for record in records:
+            self.stream.write(json.dumps(record) + "\n")
+        self.stream.flush()
+
+    def close(self) -> None:
+        if self.stream is not sys.stdout:
+            self.stream.close()
+
+
+class StoreSink:
+    """
+    Results saved as the current scores of a `ScoreStore`, next to their requirement texts.
+    With `packed`, they are fingerprinted as answers of packed requests.
+    """
+
+    def __init__(self, store, engine, kinds, packed: bool = False):
+        from threat_detection_score.store import scorer_fingerprint
+
+        self.store = store
+        self.kinds = list(kinds)
+        self.fingerprints = {kind: scorer_fingerprint(kind, engine.model_id, engine.temperature, packed) for kind in self.kinds}
+
+    def write(self, records) -> None:
+        # Error records are left out: their requirements stay stale for the next rescore
+        records = [record for record in records if "error" not in record]
+        self.store.add_requirements((record["id"], record["text"]) for record in records)
+        for record in records:
+            for kind in self.kinds:
+                result = record[kind] if len(self.kinds) > 1 else {name: value for name, value in record.items() if name not in ("id", "text", "duplicate_of")}
+                self.store.save(record["id"], kind, self.fingerprints[kind], result)
+
+    def close(self) -> None:
+        self.store.close()
+
+
+def open_sink(spec: str, engine, kinds, packed: bool = False):
+    """The sink named by `spec`: "-" for stdout, "store:PATH" for a ScoreStore, else an NDJSON file appended to."""
+    if spec == "-":
+        return NdjsonSink(sys.stdout)
+    if spec.startswith("store:"):
+        from threat_detection_score.store import ScoreStore
+
+        return StoreSink(ScoreStore(spec[len("store:"):]), engine, kinds, packed)
+    return NdjsonSink(open(spec, "a", encoding="utf-8"))
+
+
+class Worker:
+    """
+    Scores the items of `queue` with `kinds` and writes their results to `sink`.
+
+    At most `max_backlog` items are held in memory; the rest wait in the queue. Batches of up to
+    `batch_size` items leave the backlog once it holds that many, once the queue has nothing
+    more, or `linger` seconds after the oldest waiting item arrived; `workers` batches are
+    scored at a time, their requirements `pack` to an LLM request per scorer when `pack` is over
+    1 (see packing.py), otherwise one request each. Duplicates are matched by normalized text until `dedupe_window` seconds
+    after their original was scored. With `drain`, the worker stops once the queue is empty.
+    """
+
+    def __init__(self, engine, queue, sink, kinds, batch_size: int = 20, pack: int = 1, token_budget: int = None, workers: int = 4, linger: float = 0.2, dedupe_window: float = 600.0, max_backlog: int = 1000, poll_interval: float = 0.5, drain: bool = False):
+        from threat_detection_score.packing import DEFAULT_PACK_TOKEN_BUDGET
+
+        self.engine = engine
+        self.queue = queue
+        self.sink = sink
+        self.kinds = list(kinds)
+        self.batch_size = batch_size
+        self.pack = pack
+        self.token_budget = token_budget or DEFAULT_PACK_TOKEN_BUDGET
+        self.workers = workers
+        self.linger = linger
+        self.dedupe_window = dedupe_window
+        self.max_backlog = max_backlog
+        self.poll_interval = poll_interval
+        self.drain = drain
+        self.stats = {"received": 0, "duplicates": 0, "scored": 0, "errors": 0, "batches": 0}
+
+        # Heap of (-priority, arrival, item); an item may appear twice after a priority raise
+        self._backlog = []
+        self._backlog_size = 0
+        self._arrivals = itertools.count()
+        self._waiting_since = None
+        self._running = set()
+        # Normalized text -> [original item, its record once scored, expiry]
+        self._recent = {}
+        self._expiry = deque()
+
+    @staticmethod
+    def _key(item: WorkItem):
+        return normalize_input(item.text) if isinstance(item.text, str) else None
+
+    def _admit(self, item: WorkItem):
+        """Take a polled item into the backlog or onto its original; returns its record if it is complete already."""
+        self.stats["received"] += 1
+        key = self._key(item)
+        if key is None:
+            # Nothing to score or deduplicate
+            return error_record(item.id, item.text if isinstance(item.text, Exception) else ValueError(f"Record {item.id} has no text."))
+
+        entry = self._recent.get(key)
+        if entry is not None:
+            original, record, _ = entry
+            self.stats["duplicates"] += 1
+            if record is not None:
+                return self._duplicate_record(item, original, record)
+            original.duplicates.append(item)
+            if item.priority > original.priority and not original.started:
+                original.priority = item.priority
+                heapq.heappush(self._backlog, (-item.priority, next(self._arrivals), original))
+            return None
+
+        self._recent[key] = [item, None, None]
+        heapq.heappush(self._backlog, (-item.priority, next(self._arrivals), item))
+        self._backlog_size += 1
+        if self._waiting_since is None:
+            self._waiting_since = time.monotonic()
+        return None
+
+    def _pop_batch(self) -> list:
+        batch = []
+        while self._backlog and len(batch) < self.batch_size:
+            _, _, item = heapq.heappop(self._backlog)
+            if not item.started:
+                item.started = True
+                batch.append(item)
+        self._backlog_size -= len(batch)
+        self._waiting_since = time.monotonic() if self._backlog_size else None
+        return batch
+
+    @staticmethod
+    def _duplicate_record(item: WorkItem, original: WorkItem, record: dict) -> dict:
+        duplicate = {**record, "id": item.id, "duplicate_of": original.id}
+        if "text" in record:
+            # Its own text, which may differ from the original's in case and whitespace
+            duplicate["text"] = item.text
+        return duplicate
+
+    async def _score(self, kind: str, texts: list) -> list:
+        import asyncio
+
+        if self.pack > 1:
+            return await self.engine.ascore_many(kind, texts, pack_size=self.pack, token_budget=self.token_budget, return_exceptions=True)
+        return await asyncio.gather(*(self.engine.ascore(kind, text) for text in texts), return_exceptions=True)
+
+    async def _score_batch(self, batch: list) -> None:
+        import asyncio
+
+        texts = [item.text for item in batch]
+        by_kind = await asyncio.gather(*(self._score(kind, texts) for kind in self.kinds))
+        records, done = [], []
+        expires = time.monotonic() + self.dedupe_window
+        for index, item in enumerate(batch):
+            results = [results[index] for results in by_kind]
+            failure = next((result for result in results if isinstance(result, BaseException)), None)
+            key = self._key(item)
+            if failure is not None:
+                record = error_record(item.id, failure)
+                # Errors are not reused: the next duplicate is scored afresh
+                del self._recent[key]
+            else:
+                plain = to_plain(results[0]) if len(self.kinds) == 1 else {kind: to_plain(result) for kind, result in zip(self.kinds, results)}
+                record = {"id": item.id, "text": item.text, **plain}
+                self._recent[key][1:] = [record, expires]
+                self._expiry.append((expires, key))
+            records.append(record)
+            records.extend(self._duplicate_record(duplicate, item, record) for duplicate in item.duplicates)
+            done.append(item)
+            done.extend(item.duplicates)
+        self._complete(records, done)
+
+    def _complete(self, records: list, items: list) -> None:
+        """Write records to the sink, then acknowledge their items."""
+        if not records:
+            return
+        self.sink.write(records)
+        for record in records:
+            self.stats["errors" if "error" in record else "scored"] += 1
+        self.queue.ack(items)
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        while self._expiry and self._expiry[0][0] <= now:
+            _, key = self._expiry.popleft()
+            entry = self._recent.get(key)
+            # Unless the text was scored again since, after an error, with a later expiry
+            if entry is not None and entry[2] is not None and entry[2] <= now:
+                del self._recent[key]
+
+    def _dispatch(self, queue_idle: bool) -> None:
+        import asyncio
+
+        while self._backlog_size and len(self._running) < self.workers:
+            lingered = self._waiting_since is not None and time.monotonic() - self._waiting_since >= self.linger
+            if not (self._backlog_size >= self.batch_size or queue_idle or lingered):
+                break
+            batch = self._pop_batch()
+            self.stats["batches"] += 1
+            task = asyncio.ensure_future(self._score_batch(batch))
+            self._running.add(task)
+            task.add_done_callback(self._batch_done)
+
+    def _batch_done(self, task) -> None:
+        self._running.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            # A sink or queue failure: stop rather than lose track of what was written
+            self._failure = task.exception()
+        self._wake.set()
+
+    async def run(self) -> dict:
+        """Run until the queue is finished (stdin, or any queue with `drain`) or the task is cancelled; returns the stats."""
+        import asyncio
+
+        self._wake = asyncio.Event()
+        self._failure = None
+        try:
+            while self._failure is None:
+                self._expire()
+                room = self.max_backlog - self._backlog_size
+                polled = self.queue.poll(room) if room > 0 else []
+                records, done = [], []
+                for item in polled:
+                    record = self._admit(item)
+                    if record is not None:
+                        records.append(record)
+                        done.append(item)
+                self._complete(records, done)
+                self._dispatch(queue_idle=len(polled) < room)
+
+                if not polled and not self._backlog_size and not self._running and (self.queue.exhausted or self.drain):
+                    break
+                if polled and len(polled) == room:
+                    # Possibly more waiting in the queue
+                    await asyncio.sleep(0)
+                    continue
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.linger if self._backlog_size else self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+            if self._failure is not None:
+                raise self._failure
+        finally:
+            for task in self._running:
+                task.cancel()
+            self.queue.close()
+            self.sink.close()
+        return self.stats